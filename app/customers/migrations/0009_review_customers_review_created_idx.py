@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0008_remove_cartitem_price"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["created_at", "id"], name="customers_review_created_idx"),
+        ),
+    ]
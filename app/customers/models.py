@@ -53,6 +53,9 @@ class Review(models.Model):
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="customers_review_created_idx")]
+
     def __str__(self):
         return f"Review by {self.user.username} for {self.product.name}"
 
@@ -0,0 +1,4 @@
+from app.customers.models import Customer, Address, Wishlist, WishlistItem, Review, CartItem
+from app.utils.signals import connect_cache_invalidation
+
+connect_cache_invalidation(Customer, Address, Wishlist, WishlistItem, Review, CartItem)
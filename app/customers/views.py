@@ -299,6 +299,8 @@ class ReviewViewSet(BaseViewSet):
     list_schema = ReviewListSchema
     cache_key_retrieve = CacheKeys.REVIEW_DETAILS_BY_PK
     cache_key_list = CacheKeys.REVIEW_LIST
+    keyset_ordering = "-created_at"
+    approximate_count = True
 
     @extend_schema(
         description="Create a new Review",
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
+from app.utils.pagination import ApproximateCountPaginator
 from .enums import OrderStatus
 from .models import Order, OrderItem
 
@@ -22,6 +23,9 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    # Planner estimates instead of COUNT(*) on the changelist, see ApproximateCountPaginator.
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
     list_display = (
     'id', 'user', 'status_display', 'payment_status_display', 'total_amount', 'created_at', 'invoice_link')
     list_filter = ('status', 'payment_status', 'created_at')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.orders"
+
+    def ready(self):
+        import app.orders.signals  # noqa: F401
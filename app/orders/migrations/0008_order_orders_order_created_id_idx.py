@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_alter_order_user"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at", "id"], name="orders_order_created_id_idx"),
+        ),
+    ]
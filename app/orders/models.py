@@ -20,6 +20,9 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["created_at", "id"], name="orders_order_created_id_idx")]
+
     def __str__(self):
         return f"Order {self.id} ({self.status})"
 
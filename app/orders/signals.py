@@ -0,0 +1,4 @@
+from app.orders.models import Order, OrderItem
+from app.utils.signals import connect_cache_invalidation
+
+connect_cache_invalidation(Order, OrderItem)
@@ -1,15 +1,13 @@
-import boto3
-from botocore.exceptions import NoCredentialsError
 from django.http import HttpResponseRedirect, HttpResponse
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 from rest_framework.decorators import action
 
-from config import settings
 from .models import Order
 from app.orders.controllers import OrderController, OrderItemController
 from app.orders.serializers import OrderSerializer, OrderItemSerializer
 from app.orders.schemas import OrderCreateSchema, OrderUpdateSchema, OrderListSchema, OrderItemCreateSchema, \
     OrderItemUpdateSchema, OrderItemListSchema
+from app.utils.backends import BackendError, get_file_url_backend
 from app.utils.constants import CacheKeys
 from app.utils.views import BaseViewSet
 
@@ -22,6 +20,8 @@ class OrderViewSet(BaseViewSet):
     list_schema = OrderListSchema
     cache_key_retrieve = CacheKeys.ORDER_DETAILS_BY_PK
     cache_key_list = CacheKeys.ORDER_LIST
+    keyset_ordering = "-created_at"
+    approximate_count = True
 
     @extend_schema(
         description="Create a new Order",
@@ -90,17 +90,10 @@ class OrderViewSet(BaseViewSet):
         # Assume invoice_file is a FileField storing the file in S3
         invoice_file_path = order.invoice_file.name
 
-        s3_client = boto3.client('s3', aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                                 region_name=settings.AWS_S3_REGION_NAME)
-
         try:
-            signed_url = s3_client.generate_presigned_url('get_object',
-                                                          Params={'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                                                                  'Key': invoice_file_path},
-                                                          ExpiresIn=3600)
+            signed_url = get_file_url_backend().get_url(invoice_file_path, expires_in=3600)
             return HttpResponseRedirect(signed_url)
-        except NoCredentialsError:
+        except BackendError:
             return HttpResponse("Error generating Invoice URL", status=500)
 
 
@@ -112,6 +105,7 @@ class OrderItemViewSet(BaseViewSet):
     list_schema = OrderItemListSchema
     cache_key_retrieve = CacheKeys.ORDER_ITEM_DETAILS_BY_PK
     cache_key_list = CacheKeys.ORDER_ITEM_LIST
+    keyset_ordering = "-id"
 
     @extend_schema(
         description="Create a new OrderItem",
@@ -0,0 +1,4 @@
+from app.payments.models import Payment, Return, Refund, ReturnItem
+from app.utils.signals import connect_cache_invalidation
+
+connect_cache_invalidation(Payment, Return, Refund, ReturnItem)
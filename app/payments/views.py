@@ -1,9 +1,7 @@
 import json
 
-import razorpay
 from django.conf import settings
 from django.db import transaction
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from rest_framework import status, viewsets
@@ -18,7 +16,10 @@ from app.payments.schemas import PaymentCreateSchema, PaymentUpdateSchema, Payme
     ReturnItemCreateSchema, ReturnItemUpdateSchema, ReturnItemListSchema
 from app.payments.serializers import PaymentSerializer, ReturnSerializer, RefundSerializer, ReturnItemSerializer
 from app.shippings.models import PincodeAvailability, ShippingRate
+from app.utils.backends import get_payment_client
 from app.utils.constants import CacheKeys
+from app.utils.renderers import ORJSONResponse
+from app.utils.signals import invalidate_bulk_created
 from app.customers.models import CartItem, Address
 from app.orders.models import Order, OrderItem
 from app.utils.views import BaseViewSet
@@ -26,14 +27,16 @@ from app.payments.tasks import generate_and_store_invoice_pdf
 
 
 class RazorpayViewSet(viewsets.ViewSet):
-    client = razorpay.Client(auth=(settings.RAZOR_KEY_ID, settings.RAZOR_KEY_SECRET))
+    @property
+    def client(self):
+        return get_payment_client()
 
     @action(detail=False, methods=['post'], url_path='create-order')
     def create_order(self, request, *args, **kwargs):
         user = request.user
         shipping_address_id = request.data.get('shipping_address_id', None)
         billing_address_id = request.data.get('billing_address_id', None)
-        cart_items = user.cart_items.all()
+        cart_items = user.cart_items.select_related('product_variant')
         total_amount = sum(item.product_variant.buying_price * item.quantity for item in cart_items)
         shipping_address = Address.objects.get(pk=shipping_address_id)
 
@@ -42,16 +45,19 @@ class RazorpayViewSet(viewsets.ViewSet):
                 order = Order.objects.create(
                     user=user,
                     total_amount=total_amount,
-                    shipping_address=shipping_address_id,
-                    billing_address=billing_address_id
+                    shipping_address_id=shipping_address_id,
+                    billing_address_id=billing_address_id
                 )
-                for cart_item in cart_items:
-                    OrderItem.objects.create(
+                order_items = OrderItem.objects.bulk_create(
+                    OrderItem(
                         order=order,
                         product_variant=cart_item.product_variant,
                         quantity=cart_item.quantity,
                         price=cart_item.product_variant.buying_price * cart_item.quantity
                     )
+                    for cart_item in cart_items
+                )
+                invalidate_bulk_created(OrderItem, order_items)
                 payment_data = {
                     'amount': int(total_amount * 100),
                     'currency': 'INR',
@@ -66,7 +72,7 @@ class RazorpayViewSet(viewsets.ViewSet):
                 scheme = request.scheme
                 full_url = f'{scheme}://{domain}'
 
-                return JsonResponse({
+                return ORJSONResponse({
                     'callback_url': f'{full_url}/hht/api/payments/handle-payment/',
                     "razorpay_key": settings.RAZOR_KEY_ID,
                     "order_id": orderData['id']
@@ -74,7 +80,7 @@ class RazorpayViewSet(viewsets.ViewSet):
 
         except Exception as e:
             print(str(e))
-            return JsonResponse({'error': 'An error occurred. Please try again.'}, status=500)
+            return ORJSONResponse({'error': 'An error occurred. Please try again.'}, status=500)
 
     @action(detail=False, methods=['post'], url_path='checkout')
     def checkout(self, request, *args, **kwargs):
@@ -92,28 +98,31 @@ class RazorpayViewSet(viewsets.ViewSet):
                 except ShippingRate.DoesNotExist:
                     return Response({'error': 'Shipping information not available for this pincode'},
                                     status=status.HTTP_404_NOT_FOUND)
-        cart_items = CartItem.objects.filter(user=request.user)
+        controller = CartItemController()
+        # Loaded once with the serializer's joins and prefetches, the total and the count reuse the same rows.
+        cart_items = list(controller.optimize_queryset(CartItem.objects.filter(user=request.user),
+                                                       CartItemSerializer))
         # total_amount = sum(item.price * item.quantity for item in cart_items)
         total_amount = sum(item.product_variant.buying_price * item.quantity for item in cart_items)
 
-        cart_count = cart_items.count()
+        cart_count = len(cart_items)
 
         context = {
             'cart_count': cart_count,
-            'cart_items': CartItemController().serialize_queryset(cart_items, serializer_override=CartItemSerializer),
+            'cart_items': controller.serialize_queryset(cart_items, serializer_override=CartItemSerializer),
             'total_amount': total_amount,
             'shipping_charges': shipping_rate.rate if shipping_rate else None
         }
-        return JsonResponse(data=context, status=200)
+        return ORJSONResponse(data=context, status=200)
 
     @action(detail=False, methods=['post'], url_path='handle-payment')
     def handle_payment(self, request, *args, **kwargs):
         data = json.loads(request.body)
         if "razorpay_signature" not in data:
-            return JsonResponse({'message': 'Invalid payment data'}, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse({'message': 'Invalid payment data'}, status=status.HTTP_400_BAD_REQUEST)
 
         if not self.verify_signature(data):
-            return JsonResponse({'message': 'Payment signature verification failed'},
+            return ORJSONResponse({'message': 'Payment signature verification failed'},
                                 status=status.HTTP_400_BAD_REQUEST)
 
         # Continue with processing payment since signature verification was successful
@@ -143,25 +152,25 @@ class RazorpayViewSet(viewsets.ViewSet):
                                                                                               razorpay_payment_id,
                                                                                               user):
                     # self.update_order_on_success(order, razorpay_payment_id, razorpay_signature_id, user)
-                    return JsonResponse({'message': 'Payment successful'}, status=status.HTTP_200_OK)
+                    return ORJSONResponse({'message': 'Payment successful'}, status=status.HTTP_200_OK)
                 else:
                     self.update_order_on_failure(order, razorpay_payment_id)
-                    return JsonResponse({'message': 'Payment failed'}, status=status.HTTP_400_BAD_REQUEST)
+                    return ORJSONResponse({'message': 'Payment failed'}, status=status.HTTP_400_BAD_REQUEST)
             else:
                 if self.update_order_and_generate_invoice(razorpay_order_id,
                                                           razorpay_signature_id,
                                                           razorpay_payment_id,
                                                           user):
                     # self.update_order_on_success(order, razorpay_payment_id, razorpay_signature_id, user)
-                    return JsonResponse({'message': 'Payment successful'}, status=status.HTTP_200_OK)
+                    return ORJSONResponse({'message': 'Payment successful'}, status=status.HTTP_200_OK)
                 else:
                     self.update_order_on_failure(order, razorpay_payment_id)
-                    return JsonResponse({'message': 'Payment failed'}, status=status.HTTP_400_BAD_REQUEST)
+                    return ORJSONResponse({'message': 'Payment failed'}, status=status.HTTP_400_BAD_REQUEST)
 
         except Order.DoesNotExist:
-            return JsonResponse({'message': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+            return ORJSONResponse({'message': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            return JsonResponse({'message': 'Server error, please try again later'},
+            return ORJSONResponse({'message': 'Server error, please try again later'},
                                 status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def update_order_and_generate_invoice(self, razorpay_order_id, razorpay_signature_id, razorpay_payment_id, user):
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from app.products.models import Category, Collection, Supplier, Tag, Coupon, Product, ProductVariant, ProductImage, \
     Attribute, AttributeValue
+from app.utils.pagination import ApproximateCountPaginator
 
 
 class ProductImageInline(admin.TabularInline):
@@ -54,6 +55,9 @@ class CouponAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
+    # Planner estimates instead of COUNT(*) on the changelist, see ApproximateCountPaginator.
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
     list_display = ('name', 'slug', 'collection', 'published', 'created_at')
     list_filter = ('published', 'collection')
     search_fields = ('name', 'slug')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.products"
+
+    def ready(self):
+        import app.products.signals  # noqa: F401
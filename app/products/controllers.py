@@ -1,18 +1,94 @@
-from django.db import models
-from django.db.models import Q
+from decimal import Decimal
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db import connection, models
+from django.db.models import Count, F, Func, Q
 from psycopg import IntegrityError
 
 from app.customers.models import CartItem
 from app.products.models import Category, Collection, Supplier, Tag, Coupon, Product, ProductVariant, ProductImage, \
     Attribute, AttributeValue
+from app.products.search import AUTOCOMPLETE_MIN_LENGTH, build_search_query, get_closest, get_search_rank
 from app.utils.controllers import Controller
 from app.utils.helpers import get_serialized_exception
 
+# Each link of a published product to an active category counts for that category and all its ancestors, listed
+# in its path; a product linked to several categories of a subtree counts once for its root.
+NAVIGATION_SQL = """
+SELECT 'category', category.id, category.name, category.parent_id, coalesce(counts.product_count, 0)
+FROM {category} category LEFT JOIN (
+    SELECT ancestor.id, count(DISTINCT link.product_id) AS product_count
+    FROM {link} link
+    JOIN {product} product ON product.id = link.product_id AND product.published
+    JOIN {category} linked ON linked.id = link.category_id AND linked.active
+    CROSS JOIN unnest(linked.path) AS ancestor (id)
+    GROUP BY ancestor.id
+) counts ON counts.id = category.id
+WHERE category.active
+UNION ALL
+SELECT 'collection', collection.id, collection.name, NULL, count(product.id) FILTER (WHERE product.published)
+FROM {collection} collection LEFT JOIN {product} product ON product.collection_id = collection.id
+WHERE collection.active
+GROUP BY collection.id
+"""
+# Upper bounds of the price facet buckets, the last bucket has none.
+PRICE_FACET_BOUNDS = (Decimal(500), Decimal(1000), Decimal(2500), Decimal(5000), Decimal(10000))
+
 
 class CategoryController(Controller):
     def __init__(self):
         super().__init__(model=Category)
 
+    def create(self, parent=None, **kwargs):
+        return super().create(parent_id=parent, **kwargs)
+
+    def edit(self, instance_id, parent=None, **kwargs):
+        # Moving a category rewrites the paths of its whole subtree, see Category.save().
+        return super().edit(instance_id, parent_id=parent, **kwargs)
+
+    def filter(self, ancestor=None, **filters):
+        errors, queryset = super().filter(**filters)
+        if ancestor is not None:
+            # The whole subtree in one indexed query, parents before their children.
+            queryset = queryset.filter(path__contains=[ancestor]).order_by('path')
+        return errors, queryset
+
+    def get_navigation(self):
+        """
+        The active category tree and the active collections, each with its number of published products (a
+        category's including those of its subcategories), from one query.
+        """
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(NAVIGATION_SQL.format(
+                category=quote(Category._meta.db_table), collection=quote(Collection._meta.db_table),
+                product=quote(Product._meta.db_table), link=quote(Product.categories.through._meta.db_table),
+            ))
+            rows = cursor.fetchall()
+
+        nodes, collection_nodes = {}, []
+        for kind, pk, name, parent_id, product_count in rows:
+            node = {'id': pk, 'name': name, 'product_count': product_count}
+            if kind == 'collection':
+                collection_nodes.append(node)
+            else:
+                node['sub_categories'] = []
+                nodes[pk] = (parent_id, node)
+        roots = []
+        for parent_id, node in nodes.values():
+            if parent_id is None:
+                roots.append(node)
+            elif parent_id in nodes:
+                nodes[parent_id][1]['sub_categories'].append(node)
+            # else: under an inactive category, hidden with it.
+
+        def by_name(node):
+            return node['name'].lower()
+
+        for _, node in nodes.values():
+            node['sub_categories'].sort(key=by_name)
+        return {'categories': sorted(roots, key=by_name), 'collections': sorted(collection_nodes, key=by_name)}
+
 
 class CollectionController(Controller):
     def __init__(self):
@@ -39,6 +115,7 @@ class ProductController(Controller):
         super().__init__(model=Product)
 
     def filter(self,
+               q,
                slug,
                name,
                sku,
@@ -50,37 +127,112 @@ class ProductController(Controller):
                tag_id,
                supplier_id,
                coupon_id,
-               ordering):
+               ordering,
+               facets=False):
         try:
-            queries = Q()
-
-            if slug:
-                queries &= Q(slug=slug)
-            if name:
-                queries &= Q(name__icontains=name)
-            if sku:
-                queries &= Q(sku=sku)
-            if min_price:
-                queries &= Q(sale_price__gte=min_price)
-            if max_price:
-                queries &= Q(sale_price__lte=max_price)
-            if published is not None:
-                queries &= Q(published=published)
-            if collection_id:
-                queries &= Q(collection_id=collection_id)
-            if category_id:
-                queries &= Q(categories__id__in=category_id)
-            if tag_id:
-                queries &= Q(tags__id__in=tag_id)
-            if supplier_id:
-                queries &= Q(suppliers__id__in=supplier_id)
-            if coupon_id:
-                queries &= Q(coupons__id__in=coupon_id)
-
-            return None, self.model.objects.filter(queries).distinct().order_by(ordering)
+            conditions = self.get_conditions(q, slug, name, sku, min_price, max_price, published, collection_id,
+                                             category_id, tag_id, supplier_id, coupon_id)
+            queryset = self.model.objects.all()
+            search_query = build_search_query(q)
+            if search_query is not None:
+                queryset = queryset.annotate(search_rank=get_search_rank(search_query))
+                order_by = (ordering,) if ordering else ('-search_rank', 'name')
+            else:
+                order_by = (ordering or 'name',)
+
+            return None, queryset.filter(*conditions.values()).order_by(*order_by)
         except Exception as e:
             return get_serialized_exception(e)
 
+    def get_conditions(self, q, slug, name, sku, min_price, max_price, published, collection_id, category_id,
+                       tag_id, supplier_id, coupon_id, **kwargs):
+        """
+        The ``Q`` of each filter that is set, keyed by the facet it narrows (or by the parameter). M2M filters and
+        search go through the product's search document, a one-to-one join that cannot repeat a product.
+        """
+        conditions = {}
+        search_query = build_search_query(q)
+        if search_query is not None:
+            conditions['q'] = Q(search_document__search_vector=search_query)
+        if slug:
+            conditions['slug'] = Q(slug=slug)
+        if name:
+            conditions['name'] = Q(name__icontains=name)
+        if sku:
+            conditions['sku'] = Q(sku=sku)
+        price = Q()
+        if min_price:
+            price &= Q(sale_price__gte=min_price)
+        if max_price:
+            price &= Q(sale_price__lte=max_price)
+        if price:
+            conditions['price'] = price
+        if published is not None:
+            conditions['published'] = Q(published=published)
+        if collection_id:
+            conditions['collection'] = Q(collection_id=collection_id)
+        if category_id:
+            # Products of the categories and of all their subcategories.
+            subtree = Category.objects.filter(path__overlap=category_id).values('pk')
+            conditions['category'] = Q(search_document__category_ids__overlap=ArraySubquery(subtree))
+        if tag_id:
+            conditions['tag'] = Q(search_document__tag_ids__overlap=tag_id)
+        if supplier_id:
+            conditions['supplier'] = Q(search_document__supplier_ids__overlap=supplier_id)
+        if coupon_id:
+            conditions['coupon'] = Q(search_document__coupon_ids__overlap=coupon_id)
+        return conditions
+
+    def get_facet_counts(self, **filters):
+        """
+        Products per category, tag, supplier, collection and price bucket, one GROUP BY (or aggregate) query each,
+        and one for the category names.
+        A facet is counted with every filter but its own applied, so the other values of a facet already filtered
+        on keep their counts and can be added to the selection.
+        """
+        conditions = self.get_conditions(**filters)
+
+        def get_matching(facet):
+            return self.model.objects.filter(*(condition for key, condition in conditions.items() if key != facet))
+
+        # Like the category filter, a category counts the products of its whole subtree: each link counts for every
+        # category in the linked one's path, a product linked to several categories of a subtree once.
+        rows = self.model.categories.through.objects \
+            .filter(product_id__in=get_matching('category').values('pk')) \
+            .annotate(ancestor_id=Func(F('category__path'), function='unnest', output_field=models.IntegerField())) \
+            .values('ancestor_id').annotate(count=Count('product_id', distinct=True))
+        counts = {row['ancestor_id']: row['count'] for row in rows}
+        names = dict(Category.objects.filter(pk__in=counts).values_list('pk', 'name'))
+        facets = {'category': sorted(
+            ({'id': pk, 'name': names[pk], 'count': count} for pk, count in counts.items()),
+            key=lambda row: (-row['count'], row['name']),
+        )}
+        for facet, relation in (('tag', 'tags'), ('supplier', 'suppliers')):
+            field = self.model._meta.get_field(relation)
+            target = field.m2m_reverse_field_name()
+            rows = field.remote_field.through.objects \
+                .filter(**{f'{field.m2m_field_name()}__in': get_matching(facet).values('pk')}) \
+                .values(f'{target}_id', f'{target}__name').annotate(count=Count('*')) \
+                .order_by('-count', f'{target}__name')
+            facets[facet] = [
+                {'id': row[f'{target}_id'], 'name': row[f'{target}__name'], 'count': row['count']} for row in rows
+            ]
+        rows = get_matching('collection').values('collection_id', 'collection__name').annotate(count=Count('pk')) \
+            .order_by('-count', 'collection__name')
+        facets['collection'] = [
+            {'id': row['collection_id'], 'name': row['collection__name'], 'count': row['count']} for row in rows
+        ]
+        bounds = (Decimal(0),) + PRICE_FACET_BOUNDS + (None,)
+        buckets = list(zip(bounds, bounds[1:]))
+        counts = get_matching('price').aggregate(**{
+            f'price_{index}': Count('pk', filter=Q(sale_price__gte=low, **({'sale_price__lt': high} if high else {})))
+            for index, (low, high) in enumerate(buckets)
+        })
+        facets['price'] = [
+            {'min': low, 'max': high, 'count': counts[f'price_{index}']} for index, (low, high) in enumerate(buckets)
+        ]
+        return facets
+
     def get_product_by_slug(self, slug):
         product = self.get_valid_qs().filter(slug=slug).first()
         if product:
@@ -91,6 +243,31 @@ class ProductController(Controller):
     def get_valid_qs(self):
         return self.model.objects.filter(published=True)
 
+    @staticmethod
+    def get_thumbnail_url(product):
+        document = getattr(product, 'search_document', None)
+        return document.thumbnail.url if document is not None and document.thumbnail else None
+
+    def autocomplete(self, q, limit):
+        """Closest published product names, with a thumbnail, and category and tag names for a search box."""
+        if q is None or len(q) < AUTOCOMPLETE_MIN_LENGTH:
+            return {"products": [], "categories": [], "tags": []}
+        products = get_closest(
+            self.model.objects.filter(published=True).select_related('search_document')
+            .only('name', 'slug', 'search_document__thumbnail'), q, limit
+        )
+        return {
+            "products": [
+                {"name": product.name, "slug": product.slug, "thumbnail": self.get_thumbnail_url(product)}
+                for product in products
+            ],
+            "categories": [
+                {"id": category.pk, "name": category.name}
+                for category in get_closest(Category.objects.filter(active=True).only('name'), q, limit)
+            ],
+            "tags": [{"id": tag.pk, "name": tag.name} for tag in get_closest(Tag.objects.only('name'), q, limit)],
+        }
+
 
 class ProductVariantController(Controller):
     def __init__(self):
@@ -137,8 +314,8 @@ class ProductVariantController(Controller):
     def decrease_cart_item(self, pk, user):
         try:
             product_variant: ProductVariant = self.model.objects.get(pk=pk)
-            cart_item = CartItem.objects.get_or_create(user=user,
-                                                       product_variant=product_variant)
+            cart_item, item_created = CartItem.objects.get_or_create(user=user,
+                                                                     product_variant=product_variant)
 
             if cart_item.quantity > 1:
                 cart_item.quantity -= 1
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.utils.seeding import SeedPlan, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, deterministic synthetic dataset (catalogue, users, carts, orders, payments and "
+        "shipments) for load testing. E.g. --products 250000 --users 200000 --workers 8 makes about 10M rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42, help="Same seed, same rows.")
+        parser.add_argument("--products", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=10000)
+        defaults = SeedPlan._field_defaults
+        parser.add_argument("--variants-per-product", type=int, default=defaults["variants_per_product"])
+        parser.add_argument("--orders-per-user", type=int, default=defaults["orders_per_user"])
+        parser.add_argument("--categories", type=int, default=defaults["categories"])
+        parser.add_argument("--workers", type=int, default=1, help="Processes inserting chunks in parallel.")
+        parser.add_argument("--chunk-size", type=int, default=defaults["chunk_size"],
+                            help="Products or users per chunk; each chunk is one transaction.")
+        parser.add_argument("--batch-size", type=int, default=defaults["batch_size"], help="Rows per INSERT.")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers and --chunk-size must be at least 1.")
+        plan = SeedPlan(
+            seed=options["seed"],
+            products=options["products"],
+            users=options["users"],
+            variants_per_product=options["variants_per_product"],
+            orders_per_user=options["orders_per_user"],
+            categories=options["categories"],
+            chunk_size=options["chunk_size"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Seeding about {plan.get_row_count()} rows with {options['workers']} worker(s)")
+        count = seed(plan, workers=options["workers"], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Inserted {count} rows"))
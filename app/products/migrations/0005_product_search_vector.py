@@ -0,0 +1,46 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:03
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# The search vector as app/products/search.py built it when this migration was written, frozen here so later
+# changes to that module cannot change what this migration writes.
+FILL_SEARCH_VECTORS = """
+UPDATE products_product product SET search_vector =
+    setweight(to_tsvector('english', coalesce(product.name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(product.short_description, '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(tag.name, ' ') FROM products_product_tags link
+        JOIN products_tag tag ON tag.id = link.tag_id WHERE link.product_id = product.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(category.name, ' ') FROM products_product_categories link
+        JOIN products_category category ON category.id = link.category_id WHERE link.product_id = product.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english', coalesce(product.description, '')), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_alter_product_coupons_alter_product_suppliers_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Filled before the index is built, one bulk build is much cheaper than as many index updates.
+        migrations.RunSQL(FILL_SEARCH_VECTORS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="products_product_search_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:07
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="category",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"], name="products_category_name_trgm", opclasses=["gist_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"], name="products_product_name_trgm", opclasses=["gist_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=["name"], name="products_tag_name_trgm", opclasses=["gist_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:15
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The documents as app/products/search.py computed them when this migration was written, frozen here so later
+# changes to that module cannot change what this migration writes. The search vector is the product's own, which
+# 0005 filled and the signals kept current until it is removed below.
+FILL_SEARCH_DOCUMENTS = """
+INSERT INTO products_productsearchdocument (
+    product_id, category_ids, tag_ids, supplier_ids, coupon_ids, min_price, max_price, stock, thumbnail,
+    rating_count, rating_average, search_vector
+)
+SELECT
+    product.id,
+    ARRAY(SELECT category_id FROM products_product_categories WHERE product_id = product.id ORDER BY category_id),
+    ARRAY(SELECT tag_id FROM products_product_tags WHERE product_id = product.id ORDER BY tag_id),
+    ARRAY(SELECT supplier_id FROM products_product_suppliers WHERE product_id = product.id ORDER BY supplier_id),
+    ARRAY(SELECT coupon_id FROM products_product_coupons WHERE product_id = product.id ORDER BY coupon_id),
+    (SELECT min(sale_price) FROM products_productvariant WHERE product_id = product.id AND published),
+    (SELECT max(sale_price) FROM products_productvariant WHERE product_id = product.id AND published),
+    coalesce((
+        SELECT sum(stock_quantity) FROM products_productvariant WHERE product_id = product.id AND published
+    ), 0),
+    (
+        SELECT image FROM products_productimage
+        WHERE product_id = product.id AND image <> '' AND image IS NOT NULL
+        ORDER BY is_thumbnail DESC, is_primary DESC, id LIMIT 1
+    ),
+    (SELECT count(*) FROM customers_review WHERE product_id = product.id),
+    (SELECT avg(rating) FROM customers_review WHERE product_id = product.id),
+    product.search_vector
+FROM products_product product
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0009_review_customers_review_created_idx"),
+        ("products", "0006_trigram_name_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSearchDocument",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "category_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(), default=list, size=None
+                    ),
+                ),
+                (
+                    "tag_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(), default=list, size=None
+                    ),
+                ),
+                (
+                    "supplier_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(), default=list, size=None
+                    ),
+                ),
+                (
+                    "coupon_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(), default=list, size=None
+                    ),
+                ),
+                ("min_price", models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ("max_price", models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ("stock", models.IntegerField(default=0)),
+                ("thumbnail", models.ImageField(blank=True, null=True, upload_to="merchandise/product_images/")),
+                ("rating_count", models.IntegerField(default=0)),
+                ("rating_average", models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ("search_vector", django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        # Filled before the indexes are built, like 0005.
+        migrations.RunSQL(FILL_SEARCH_DOCUMENTS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="productsearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["category_ids"], name="products_doc_category_ids_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productsearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["tag_ids"], name="products_doc_tag_ids_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productsearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["supplier_ids"], name="products_doc_supplier_ids_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productsearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["coupon_ids"], name="products_doc_coupon_ids_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productsearchdocument",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["search_vector"], name="products_doc_search_idx"),
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_product_search_idx",
+        ),
+        migrations.RemoveField(
+            model_name="product",
+            name="search_vector",
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.10 on 2026-10-18 19:19
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+FILL_PATHS = """
+WITH RECURSIVE tree (id, path) AS (
+    SELECT id, ARRAY[id] FROM products_category WHERE parent_id IS NULL
+    UNION ALL
+    SELECT category.id, tree.path || category.id
+    FROM products_category category JOIN tree ON category.parent_id = tree.id
+)
+UPDATE products_category SET path = tree.path, depth = cardinality(tree.path) - 1 FROM tree
+WHERE products_category.id = tree.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(), default=list, editable=False, size=None
+            ),
+        ),
+        # Paths of the categories reachable from a root; a parent cycle, which nothing used to prevent, is left
+        # with an empty path.
+        migrations.RunSQL(FILL_PATHS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="category",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["path"], name="products_category_path_idx"),
+        ),
+    ]
@@ -1,7 +1,14 @@
-from django.db import models
+from functools import partial
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
 from django.utils.text import slugify
 
 from app.products.enums import DiscountType
+from app.utils.cache import build_tag, get_namespace
+from app.utils.signals import invalidate
 
 
 class Category(models.Model):
@@ -12,12 +19,76 @@ class Category(models.Model):
     image = models.ImageField(upload_to='merchandise/category_images/', blank=True, null=True)
     placeholder = models.ImageField(upload_to='merchandise/category_placeholders/', blank=True, null=True)
     active = models.BooleanField(default=True)
+    # Materialized path: the IDs of the ancestors, root first, then of the category itself. A subtree is every
+    # category whose path contains the root's ID. Maintained by save() and, when a parent is deleted, by
+    # app/products/signals.py.
+    path = ArrayField(models.IntegerField(), default=list, editable=False)
+    depth = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            GistIndex(fields=["name"], name="products_category_name_trgm", opclasses=["gist_trgm_ops"]),
+            GinIndex(fields=["path"], name="products_category_path_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Saves, then sets the path if the category is new, or moves its subtree along if its parent changed."""
+        saved = bool(self.path) and self.path[-1] == self.pk
+        if saved:
+            # The path is only written by the UPDATEs below, so an instance loaded before a move of one of its
+            # ancestors cannot write its old path back.
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs["update_fields"] = [name for name in update_fields if name not in ("path", "depth")]
+        if saved and (self.path[-2] if len(self.path) > 1 else None) == self.parent_id:
+            return super().save(*args, **kwargs)
+        parent_path = []
+        if self.parent_id is not None:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list("path", flat=True).get()
+            if self.pk is not None and self.pk in parent_path:
+                raise ValueError("A category cannot be moved under itself or one of its subcategories")
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            new_path = parent_path + [self.pk]
+            if saved:
+                old_path = Category.objects.select_for_update().filter(pk=self.pk).values_list("path", flat=True) \
+                    .get()
+                # The UPDATE sends no signal, evict the cached rows of the subtree here.
+                evict_categories(replace_path_prefix(self.pk, old_path, new_path))
+            else:
+                Category.objects.filter(pk=self.pk).update(path=new_path, depth=len(new_path) - 1)
+            self.path, self.depth = new_path, len(new_path) - 1
+
+
+def replace_path_prefix(category_id, old_prefix, new_prefix):
+    """
+    Rewrite the start of the path of every category in the subtree of ``category_id`` from ``old_prefix`` (the
+    path of ``category_id``) to ``new_prefix``, with one UPDATE. Returns the IDs of the rewritten categories.
+    """
+    table = Category._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {connection.ops.quote_name(table)} SET path = %s::integer[] || path[%s:], depth = depth + %s "
+            f"WHERE path @> ARRAY[%s] RETURNING id",
+            [new_prefix, len(old_prefix) + 1, len(new_prefix) - len(old_prefix), category_id],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def evict_categories(category_ids):
+    """
+    Once the transaction commits, evict the cached rows of categories whose paths were rewritten without a signal,
+    the category lists, and the product lists, whose category filter and facets follow the paths.
+    """
+    tags = {build_tag(Category, pk) for pk in category_ids}
+    transaction.on_commit(partial(invalidate, [get_namespace(Category), get_namespace(Product)], tags))
+
 
 class Collection(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -52,6 +123,11 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     icon = models.ImageField(upload_to='merchandise/tag_icons/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            GistIndex(fields=["name"], name="products_tag_name_trgm", opclasses=["gist_trgm_ops"]),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -87,6 +163,12 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Autocomplete, see app/products/search.py.
+            GistIndex(fields=["name"], name="products_product_name_trgm", opclasses=["gist_trgm_ops"]),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -96,6 +178,39 @@ class Product(models.Model):
         return self.name
 
 
+class ProductSearchDocument(models.Model):
+    """
+    One row per product with what listing and search filter on, so they need no join that repeats a product:
+    its category, tag, supplier and coupon IDs, published variants' price range and stock, thumbnail, ratings
+    and search vector. Maintained by app/products/signals.py, see app/products/search.py.
+    """
+    product = models.OneToOneField("products.Product", on_delete=models.CASCADE, primary_key=True,
+                                   related_name='search_document')
+    category_ids = ArrayField(models.IntegerField(), default=list)
+    tag_ids = ArrayField(models.IntegerField(), default=list)
+    supplier_ids = ArrayField(models.IntegerField(), default=list)
+    coupon_ids = ArrayField(models.IntegerField(), default=list)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    stock = models.IntegerField(default=0)
+    thumbnail = models.ImageField(upload_to='merchandise/product_images/', blank=True, null=True)
+    rating_count = models.IntegerField(default=0)
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["category_ids"], name="products_doc_category_ids_idx"),
+            GinIndex(fields=["tag_ids"], name="products_doc_tag_ids_idx"),
+            GinIndex(fields=["supplier_ids"], name="products_doc_supplier_ids_idx"),
+            GinIndex(fields=["coupon_ids"], name="products_doc_coupon_ids_idx"),
+            GinIndex(fields=["search_vector"], name="products_doc_search_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} search document"
+
+
 class ProductVariant(models.Model):
     product = models.ForeignKey("products.Product", on_delete=models.CASCADE, related_name='variants')
     attribute_values = models.ManyToManyField("products.AttributeValue", related_name='products')
@@ -2,9 +2,10 @@ from datetime import datetime
 from typing import List, Optional, Union
 
 from _decimal import Decimal
-from pydantic.v1 import BaseModel, condecimal, validator
+from pydantic.v1 import BaseModel, condecimal, conint, validator
 
 from app.products.enums import DiscountType
+from app.products.search import normalize_search_text
 from app.utils.helpers import allow_string_rep_of_enum, convert_to_list, convert_to_decimal
 
 
@@ -26,6 +27,8 @@ class CategoryListSchema(BaseModel):
     parent: Optional[int]
     name: Optional[str]
     active: Optional[bool]
+    # The category and all its subcategories, in tree order.
+    ancestor: Optional[int]
 
 
 class CollectionCreateSchema(BaseModel):
@@ -165,6 +168,7 @@ class ProductUpdateSchema(BaseModel):
 
 
 class ProductListSchema(BaseModel):
+    q: Optional[str]
     slug: Optional[str]
     name: Optional[str]
     sku: Optional[str]
@@ -176,11 +180,22 @@ class ProductListSchema(BaseModel):
     tag_id: Optional[Union[int, List[int]]]
     supplier_id: Optional[Union[int, List[int]]]
     coupon_id: Optional[Union[int, List[int]]]
-    ordering: Optional[str] = "name"
+    # Defaults to relevance with ``q``, else to "name".
+    ordering: Optional[str]
+    # Add the product counts per category, tag, supplier, collection and price bucket to the page.
+    facets: Optional[bool] = False
 
     _validate_int_to_list = validator("category_id", "tag_id", "supplier_id", "coupon_id",
                                       allow_reuse=True,
                                       pre=True)(convert_to_list)
+    _normalize_q = validator("q", allow_reuse=True)(normalize_search_text)
+
+
+class ProductAutocompleteSchema(BaseModel):
+    q: Optional[str]
+    limit: Optional[conint(ge=1, le=20)] = 8
+
+    _normalize_q = validator("q", allow_reuse=True)(normalize_search_text)
 
 
 class ProductVariantCreateSchema(BaseModel):
@@ -0,0 +1,171 @@
+"""
+Product search and the ``ProductSearchDocument`` read model behind the product list.
+
+A product's document holds its category, tag, supplier and coupon IDs as GIN-indexed arrays, the price range and
+stock of its published variants, thumbnail, ratings and a stored ``tsvector`` of the name (weight A), short
+description, tag and category names (B) and description (C). :func:`refresh_search_documents` recomputes documents
+with one ``INSERT ... SELECT ... ON CONFLICT`` statement; the signals in ``app/products/signals.py`` call it whenever
+one of those inputs changes.
+"""
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Avg, Count, F, FloatField, Func, Max, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+SEARCH_CONFIG = "english"
+# Shorter prefixes have no trigram to look up, they are answered from the autocomplete cache or not at all.
+AUTOCOMPLETE_MIN_LENGTH = 2
+# Matches further than this (1 - word similarity) are not suggested.
+AUTOCOMPLETE_MAX_DISTANCE = 0.7
+
+re_search_term = re.compile(r"\w+")
+
+
+def _get_names(model, related_query_name):
+    """Subquery of the space separated names of ``model`` rows linked to the outer product."""
+    return Subquery(
+        model.objects.filter(**{related_query_name: OuterRef("pk")}).order_by()
+        .values(related_query_name).annotate(names=StringAgg("name", " ")).values("names")
+    )
+
+
+def build_search_vector(product_model):
+    """Takes the model as an argument so migrations can pass their historical one."""
+    tag = product_model._meta.get_field("tags")
+    category = product_model._meta.get_field("categories")
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("short_description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(_get_names(tag.related_model, tag.related_query_name()), weight="B", config=SEARCH_CONFIG)
+        + SearchVector(_get_names(category.related_model, category.related_query_name()), weight="B",
+                       config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def _get_ids(product_model, relation):
+    """Array subquery of the IDs linked to the outer product through the M2M ``relation``."""
+    field = product_model._meta.get_field(relation)
+    return ArraySubquery(
+        field.remote_field.through.objects.filter(**{field.m2m_field_name(): OuterRef("pk")})
+        .order_by(f"{field.m2m_reverse_field_name()}_id").values(f"{field.m2m_reverse_field_name()}_id")
+    )
+
+
+def _get_aggregate(product_model, related_name, aggregate, **filters):
+    """Subquery of ``aggregate`` over the rows of the reverse relation ``related_name`` of the outer product."""
+    related = product_model._meta.get_field(related_name)
+    return Subquery(
+        related.related_model.objects.filter(**{related.field.name: OuterRef("pk")}, **filters).order_by()
+        .values(related.field.name).annotate(value=aggregate).values("value")
+    )
+
+
+def build_document_columns(product_model):
+    """
+    ``{document field: expression}`` computing a product's document from its row. Takes the model as an argument
+    so migrations can pass their historical one.
+    """
+    images = product_model._meta.get_field("images").related_model
+    return {
+        "product": F("pk"),
+        "category_ids": _get_ids(product_model, "categories"),
+        "tag_ids": _get_ids(product_model, "tags"),
+        "supplier_ids": _get_ids(product_model, "suppliers"),
+        "coupon_ids": _get_ids(product_model, "coupons"),
+        "min_price": _get_aggregate(product_model, "variants", Min("sale_price"), published=True),
+        "max_price": _get_aggregate(product_model, "variants", Max("sale_price"), published=True),
+        "stock": Coalesce(_get_aggregate(product_model, "variants", Sum("stock_quantity"), published=True), 0),
+        "thumbnail": Subquery(
+            images.objects.filter(product=OuterRef("pk")).exclude(image="").exclude(image=None)
+            .order_by("-is_thumbnail", "-is_primary", "pk").values("image")[:1]
+        ),
+        "rating_count": Coalesce(_get_aggregate(product_model, "reviews", Count("*")), 0),
+        "rating_average": _get_aggregate(product_model, "reviews", Avg("rating")),
+        "search_vector": build_search_vector(product_model),
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_refresh_sql(product_model, using):
+    """
+    The upsert of the documents of the products whose IDs a subquery selects, as ``(sql before the subquery, sql
+    after it, params)``. Compiling the dozen subqueries takes longer than running them for a product, so it is
+    done once per model.
+    """
+    document_model = product_model._meta.get_field("search_document").related_model
+    columns = build_document_columns(product_model)
+    # Every column as an annotation, in order, so the SELECT lines up with the INSERT column list.
+    select = product_model._default_manager.using(using).order_by() \
+        .annotate(**{f"document_{name}": value for name, value in columns.items()}) \
+        .values(*(f"document_{name}" for name in columns))
+    sql, params = select.query.get_compiler(using=using).as_sql()
+    quote = connections[using].ops.quote_name
+    names = [quote(document_model._meta.get_field(name).column) for name in columns]
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in names[1:])
+    return (
+        f"INSERT INTO {quote(document_model._meta.db_table)} ({', '.join(names)}) {sql} "
+        f"WHERE {quote(product_model._meta.db_table)}.{quote(product_model._meta.pk.column)} IN (",
+        f") ON CONFLICT ({names[0]}) DO UPDATE SET {updates}",
+        params,
+    )
+
+
+def refresh_search_documents(queryset):
+    """Create or recompute the documents of the products in ``queryset``. Returns the number of rows written."""
+    try:
+        ids_sql, ids_params = queryset.order_by().values("pk").query.get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return 0
+    head, tail, params = _get_refresh_sql(queryset.model, queryset.db)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(head + ids_sql + tail, (*params, *ids_params))
+        return cursor.rowcount
+
+
+def normalize_search_text(text):
+    """Lower-cased words of ``text``, so "Silk  Saree" and "silk saree" share a cache key. ``None`` for no words."""
+    return " ".join(re_search_term.findall(text or "")).lower() or None
+
+
+def build_search_query(text):
+    """
+    ``SearchQuery`` matching all the words of ``text``, the last one as a prefix since it is usually still being
+    typed. Only word characters are kept, so the raw query cannot carry tsquery operators. ``None`` for no words.
+    """
+    terms = re_search_term.findall(text or "")
+    if not terms:
+        return None
+    return SearchQuery(" & ".join(terms[:-1] + [f"{terms[-1]}:*"]), search_type="raw", config=SEARCH_CONFIG)
+
+
+def get_search_rank(query):
+    return SearchRank(F("search_document__search_vector"), query)
+
+
+class WordDistance(Func):
+    """
+    ``column <->> 'text'``: one minus the similarity of ``text`` to the closest part of ``column``. Written with the
+    column first, which is the form a ``gist_trgm_ops`` index can return in order (a KNN scan stopping at LIMIT).
+    """
+    function = ""
+    arg_joiner = " <->> "
+    output_field = FloatField()
+
+    def __init__(self, expression, text, **extra):
+        super().__init__(expression, Value(text), **extra)
+
+
+def get_closest(queryset, text, limit, field="name"):
+    """
+    The ``limit`` rows of ``queryset`` whose ``field`` best matches ``text``, as a prefix or with typos, closest
+    first. Rows are read in index order, so the cost does not grow with the number of rows that match.
+    """
+    rows = queryset.annotate(distance=WordDistance(field, text)).order_by("distance")[:limit]
+    return [row for row in rows if row.distance <= AUTOCOMPLETE_MAX_DISTANCE]
@@ -0,0 +1,136 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+
+from app.customers.models import Review
+from app.products.models import Category, Collection, Supplier, Tag, Coupon, Product, ProductVariant, ProductImage, \
+    Attribute, AttributeValue, evict_categories, replace_path_prefix
+from app.products.search import refresh_search_documents
+from app.utils.cache import get_namespace
+from app.utils.constants import CacheKeys
+from app.utils.signals import connect_cache_invalidation, invalidate
+
+connect_cache_invalidation(Category, Collection, Supplier, Tag, Coupon, Product, ProductVariant, ProductImage,
+                           Attribute, AttributeValue)
+
+SEARCHED_FIELDS = {"name", "short_description", "description"}
+# The M2M relation of the product to each model whose IDs its document holds.
+DOCUMENT_RELATIONS = {Category: "categories", Tag: "tags", Supplier: "suppliers", Coupon: "coupons"}
+NAVIGATION_FIELDS = {"published", "collection", "collection_id"}
+
+
+def refresh_documents(pks):
+    """
+    Refresh the documents of existing ones among products ``pks``. A product's document is deleted before its
+    variants, images and reviews when it is, so refreshing from their ``post_delete`` must not recreate it.
+    """
+    if pks:
+        return refresh_search_documents(Product.objects.filter(pk__in=pks, search_document__isnull=False))
+    return 0
+
+
+def update_product_document(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCHED_FIELDS & set(update_fields):
+        return
+    refresh_search_documents(Product.objects.filter(pk=instance.pk))
+
+
+def update_related_documents(sender, instance, update_fields=None, **kwargs):
+    """A tag or category was renamed, refresh the products it is linked to."""
+    if update_fields is not None and "name" not in update_fields:
+        return
+    field = "tags" if sender is Tag else "categories"
+    if refresh_search_documents(Product.objects.filter(**{field: instance})):
+        # Cached searches for the new name did not contain these products, drop them with the product lists.
+        transaction.on_commit(partial(invalidate, [get_namespace(Product)], set()))
+
+
+def update_linked_documents(sender, instance, action, reverse, pk_set, **kwargs):
+    """Categories, tags, suppliers or coupons were added to or removed from products."""
+    if action == "pre_clear" and reverse:
+        # ``pk_set`` is empty on clear, remember the products before the links are gone.
+        instance._document_product_pks = list(
+            sender.objects.filter(**{instance._meta.model_name: instance.pk}).values_list("product_id", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        pks = [instance.pk]
+    elif action == "post_clear":
+        pks = instance.__dict__.pop("_document_product_pks", [])
+    else:
+        pks = pk_set
+    refresh_documents(pks)
+
+
+def remember_unlinked_products(sender, instance, **kwargs):
+    """A category, tag, supplier or coupon is being deleted, remember its products before the links cascade."""
+    through = Product._meta.get_field(DOCUMENT_RELATIONS[sender]).remote_field.through
+    instance._document_product_pks = list(
+        through.objects.filter(**{instance._meta.model_name: instance.pk}).values_list("product_id", flat=True)
+    )
+
+
+def update_unlinked_documents(sender, instance, **kwargs):
+    """Drop the deleted category, tag, supplier or coupon from its products' documents."""
+    if refresh_documents(instance.__dict__.pop("_document_product_pks", [])):
+        # Cached lists filtered on it still held these products.
+        transaction.on_commit(partial(invalidate, [get_namespace(Product)], set()))
+
+
+def update_parent_document(sender, instance, **kwargs):
+    """A variant (price range, stock), product image (thumbnail) or review (ratings) changed."""
+    if instance.product_id is not None:
+        refresh_documents([instance.product_id])
+
+
+def remember_navigation_fields(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and not NAVIGATION_FIELDS & set(update_fields)):
+        return
+    instance._navigation_fields = Product.objects.filter(pk=instance.pk).values_list("published", "collection_id") \
+        .first()
+
+
+def invalidate_navigation(sender, instance, created=False, **kwargs):
+    """
+    The navigation counts published products per category and collection. Deleting one cascades its category
+    links without ``m2m_changed``, publishing or moving one to another collection changes no category or
+    collection, so evict the cached navigation through its own tag.
+    """
+    previous = instance.__dict__.pop("_navigation_fields", None)
+    if kwargs.get("signal") is post_delete or created:
+        changed = instance.published
+    else:
+        changed = previous is not None and previous != (instance.published, instance.collection_id)
+    if changed:
+        transaction.on_commit(partial(invalidate, [], {CacheKeys.CATEGORY_NAVIGATION.value}))
+
+
+def reroot_subcategories(sender, instance, **kwargs):
+    """The children of a deleted category lost their parent, they become roots of their subtrees."""
+    if instance.path:
+        evict_categories(replace_path_prefix(instance.pk, instance.path, []))
+
+
+post_delete.connect(reroot_subcategories, sender=Category, dispatch_uid="category_path")
+post_save.connect(update_product_document, sender=Product, dispatch_uid="product_search_document")
+pre_save.connect(remember_navigation_fields, sender=Product, dispatch_uid="category_navigation")
+for signal in (post_save, post_delete):
+    signal.connect(invalidate_navigation, sender=Product, dispatch_uid="category_navigation")
+for model in (Tag, Category):
+    post_save.connect(update_related_documents, sender=model,
+                      dispatch_uid=f"product_search_document:{model.__name__}")
+for through in (Product.categories.through, Product.tags.through, Product.suppliers.through,
+                Product.coupons.through):
+    m2m_changed.connect(update_linked_documents, sender=through,
+                        dispatch_uid=f"product_search_document:{through.__name__}")
+for model in DOCUMENT_RELATIONS:
+    pre_delete.connect(remember_unlinked_products, sender=model,
+                       dispatch_uid=f"product_search_document:{model.__name__}")
+    post_delete.connect(update_unlinked_documents, sender=model,
+                        dispatch_uid=f"product_search_document:{model.__name__}")
+for model in (ProductVariant, ProductImage, Review):
+    for signal in (post_save, post_delete):
+        signal.connect(update_parent_document, sender=model, dispatch_uid=f"product_search_document:{model.__name__}")
@@ -0,0 +1,63 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient
+
+from app.products.models import Category, Collection, Product, Tag
+from app.utils.local_cache import local_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def pg_trgm():
+    """The word distance operator and the GiST indexes come from the pg_trgm extension, migration 0006 needs it."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            pytest.skip("the pg_trgm extension is not installed")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def products():
+    collection = Collection.objects.create(name="Handloom")
+    silk = Product.objects.create(name="Kanchi silk saree", slug="kanchi-silk-saree", short_description="Pure silk",
+                                  published=True, collection=collection)
+    cotton = Product.objects.create(name="Cotton dhoti", slug="cotton-dhoti", short_description="Soft cotton",
+                                    published=True, collection=collection)
+    return silk, cotton
+
+
+def autocomplete(q, **params):
+    response = APIClient().get("/hht/api/products/autocomplete/", {"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_autocomplete_prefix_and_typos(products):
+    Category.objects.create(name="Sarees")
+    Tag.objects.create(name="silk")
+    result = autocomplete("Kanchi")
+    assert [product["slug"] for product in result["products"]] == ["kanchi-silk-saree"]
+    assert result["products"][0]["thumbnail"] is None
+    assert [product["slug"] for product in autocomplete("kanchee")["products"]][:1] == ["kanchi-silk-saree"]
+    assert [category["name"] for category in autocomplete("sare")["categories"]] == ["Sarees"]
+    assert [tag["name"] for tag in autocomplete("silk")["tags"]] == ["silk"]
+
+
+def test_autocomplete_short_or_unpublished(products):
+    silk, cotton = products
+    assert autocomplete("k") == {"products": [], "categories": [], "tags": []}
+    silk.published = False
+    silk.save()
+    assert autocomplete("kanchi")["products"] == []
+    assert [product["slug"] for product in autocomplete("cotton", limit=1)["products"]] == ["cotton-dhoti"]
@@ -0,0 +1,116 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from app.products.controllers import CategoryController
+from app.products.models import Category, Collection, Product
+from app.utils.local_cache import local_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def tree():
+    men = Category.objects.create(name="Men")
+    footwear = Category.objects.create(name="Footwear", parent=men)
+    sandals = Category.objects.create(name="Sandals", parent=footwear)
+    women = Category.objects.create(name="Women")
+    return men, footwear, sandals, women
+
+
+def get_paths():
+    return {category.name: (category.path, category.depth) for category in Category.objects.all()}
+
+
+def test_paths_follow_moves_and_deletes(tree):
+    men, footwear, sandals, women = tree
+    assert get_paths() == {"Men": ([men.pk], 0), "Footwear": ([men.pk, footwear.pk], 1),
+                           "Sandals": ([men.pk, footwear.pk, sandals.pk], 2), "Women": ([women.pk], 0)}
+
+    errors, _ = CategoryController().edit(footwear.pk, parent=women.pk)
+    assert errors is None
+    assert get_paths()["Sandals"] == ([women.pk, footwear.pk, sandals.pk], 2)
+
+    with pytest.raises(ValueError):
+        women.parent = sandals
+        women.save()
+
+    women.refresh_from_db()
+    women.delete()
+    assert get_paths() == {"Men": ([men.pk], 0), "Footwear": ([footwear.pk], 0),
+                           "Sandals": ([footwear.pk, sandals.pk], 1)}
+
+
+def test_subtree_and_descendant_filters(tree):
+    men, footwear, sandals, women = tree
+    collection = Collection.objects.create(name="Handloom")
+    for slug, category in (("kolhapuri", sandals), ("dhoti", men), ("saree", women)):
+        Product.objects.create(name=slug, slug=slug, short_description="x", published=True,
+                               collection=collection).categories.add(category)
+    client = APIClient()
+
+    response = client.get("/hht/api/categories/", {"ancestor": men.pk})
+    assert [category["name"] for category in response.json()["results"]] == ["Men", "Footwear", "Sandals"]
+    response = client.get("/hht/api/products/", {"category_id": footwear.pk})
+    assert [product["slug"] for product in response.json()["results"]] == ["kolhapuri"]
+    response = client.get("/hht/api/products/", {"category_id": [men.pk, women.pk]})
+    assert [product["slug"] for product in response.json()["results"]] == ["dhoti", "kolhapuri", "saree"]
+
+    # A category's facet count is the result count of filtering on it.
+    response = client.get("/hht/api/products/", {"category_id": footwear.pk, "facets": "true"})
+    counts = {row["name"]: row["count"] for row in response.json()["facets"]["category"]}
+    assert counts == {"Men": 2, "Footwear": 1, "Sandals": 1, "Women": 1}
+
+
+def test_move_evicts_cached_subtree(tree, django_capture_on_commit_callbacks):
+    men, footwear, sandals, women = tree
+    client = APIClient()
+    assert client.get(f"/hht/api/categories/{sandals.pk}/").json()["depth"] == 2
+    assert len(client.get("/hht/api/categories/", {"ancestor": men.pk}).json()["results"]) == 3
+
+    with django_capture_on_commit_callbacks(execute=True):
+        footwear.parent = None
+        footwear.save()
+    body = client.get(f"/hht/api/categories/{sandals.pk}/").json()
+    assert (body["path"], body["depth"]) == ([footwear.pk, sandals.pk], 1)
+    assert [row["name"] for row in client.get("/hht/api/categories/", {"ancestor": men.pk}).json()["results"]] == \
+        ["Men"]
+
+
+def test_move_evicts_cached_product_lists(tree, django_capture_on_commit_callbacks):
+    men, footwear, sandals, women = tree
+    Product.objects.create(name="kolhapuri", slug="kolhapuri", short_description="x", published=True,
+                           collection=Collection.objects.create(name="Handloom")).categories.add(sandals)
+    client = APIClient()
+    params = {"category_id": women.pk}
+    assert client.get("/hht/api/products/", params).json()["results"] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        footwear.parent = women
+        footwear.save()
+    response = client.get("/hht/api/products/", params)
+    assert [product["slug"] for product in response.json()["results"]] == ["kolhapuri"]
+
+
+def test_stale_instance_does_not_undo_a_move(tree):
+    men, footwear, sandals, women = tree
+    stale = Category.objects.get(pk=sandals.pk)
+    footwear.parent = women
+    footwear.save()
+
+    stale.description = "Open toe"
+    stale.save()
+    assert get_paths()["Sandals"] == ([women.pk, footwear.pk, sandals.pk], 2)
+    # Moving the stale instance starts from the path in the database.
+    stale.parent = men
+    stale.save()
+    assert get_paths()["Sandals"] == ([men.pk, sandals.pk], 1)
@@ -0,0 +1,102 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from app.products.models import Category, Collection, Product, Supplier, Tag
+from app.utils.local_cache import local_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def catalogue():
+    handloom, silk = Collection.objects.create(name="Handloom"), Collection.objects.create(name="Silk")
+    sarees, dhotis = Category.objects.create(name="Sarees"), Category.objects.create(name="Dhotis")
+    festive = Tag.objects.create(name="Festive")
+    weavers = Supplier.objects.create(name="Weavers")
+    rows = [
+        ("kanchi-saree", silk, [sarees], [festive], Decimal("12000")),
+        ("cotton-saree", handloom, [sarees], [], Decimal("900")),
+        ("cotton-dhoti", handloom, [dhotis, sarees], [festive], Decimal("450")),
+        ("silk-dhoti", silk, [dhotis], [], Decimal("2600")),
+    ]
+    for slug, collection, categories, tags, price in rows:
+        product = Product.objects.create(name=slug.replace("-", " "), slug=slug, short_description="x",
+                                         sale_price=price, published=True, collection=collection)
+        product.categories.add(*categories)
+        product.tags.add(*tags)
+        product.suppliers.add(weavers)
+    Product.objects.create(name="Draft", slug="draft", short_description="x", sale_price=Decimal("100"),
+                           collection=silk).categories.add(sarees)
+    return sarees, dhotis, festive
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+def get_facets(**params):
+    response = APIClient().get("/hht/api/products/", {"facets": "true", **params})
+    assert response.status_code == 200
+    body = response.json()
+    return body, {facet: {row["name"] if "name" in row else row["min"]: row["count"] for row in rows}
+                  for facet, rows in body["facets"].items()}
+
+
+def test_facet_counts(catalogue):
+    body, facets = get_facets()
+    assert body["count"] == 4
+    assert facets["category"] == {"Sarees": 3, "Dhotis": 2}
+    assert facets["tag"] == {"Festive": 2}
+    assert facets["supplier"] == {"Weavers": 4}
+    assert facets["collection"] == {"Handloom": 2, "Silk": 2}
+    assert list(facets["price"].values()) == [1, 1, 0, 1, 0, 1]
+    assert "facets" not in APIClient().get("/hht/api/products/").json()
+
+
+def test_facet_is_counted_without_its_own_filter(catalogue):
+    sarees, dhotis, festive = catalogue
+    body, facets = get_facets(category_id=sarees.pk, max_price="1000")
+    assert sorted(product["slug"] for product in body["results"]) == ["cotton-dhoti", "cotton-saree"]
+    # Dhotis can still be added to the selection, prices outside the range still show.
+    assert facets["category"] == {"Sarees": 2, "Dhotis": 1}
+    assert list(facets["price"].values()) == [1, 1, 0, 0, 0, 1]
+    assert facets["collection"] == {"Handloom": 2}
+    assert facets["tag"] == {"Festive": 1}
+
+
+def test_renamed_facet_value_evicts_the_page(catalogue, django_capture_on_commit_callbacks):
+    sarees, dhotis, festive = catalogue
+    APIClient().get("/hht/api/products/", {"facets": "true"})
+    with django_capture_on_commit_callbacks(execute=True):
+        festive.name = "Wedding"
+        festive.save()
+    response = APIClient().get("/hht/api/products/", {"facets": "true"})
+    assert [row["name"] for row in response.json()["facets"]["tag"]] == ["Wedding"]
+
+
+def test_counts_follow_product_writes(catalogue, django_capture_on_commit_callbacks):
+    sarees, dhotis, festive = catalogue
+    assert get_facets()[1]["category"] == {"Sarees": 3, "Dhotis": 2}
+    with django_capture_on_commit_callbacks(execute=True):
+        Product.objects.get(slug="kanchi-saree").delete()
+        draft = Product.objects.get(slug="draft")
+        draft.categories.add(dhotis)
+        draft.published = True
+        draft.save()
+    assert get_facets()[1]["category"] == {"Sarees": 3, "Dhotis": 3}
+
+
+def test_streamed_page_keeps_its_facets(catalogue):
+    response = APIClient().get("/hht/api/products/", {"facets": "true", "page": "all"})
+    body = json.loads(b"".join(response.streaming_content))
+    assert len(body["results"]) == body["count"] == 4
+    assert {row["name"]: row["count"] for row in body["facets"]["category"]} == {"Sarees": 3, "Dhotis": 2}
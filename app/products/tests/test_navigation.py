@@ -0,0 +1,101 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app.products.models import Category, Collection, Product
+from app.utils.local_cache import local_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def catalogue():
+    handloom = Collection.objects.create(name="Handloom")
+    Collection.objects.create(name="Archive", active=False)
+    men = Category.objects.create(name="Men")
+    footwear = Category.objects.create(name="Footwear", parent=men)
+    sandals = Category.objects.create(name="Sandals", parent=footwear)
+    hidden = Category.objects.create(name="Hidden", parent=men, active=False)
+    Category.objects.create(name="Under hidden", parent=hidden)
+    women = Category.objects.create(name="Women")
+    products = {}
+    for slug, categories, published in (("kolhapuri", [sandals, footwear], True), ("dhoti", [men], True),
+                                        ("draft", [men], False), ("saree", [women], True)):
+        products[slug] = Product.objects.create(name=slug, slug=slug, short_description="x", published=published,
+                                                collection=handloom)
+        products[slug].categories.add(*categories)
+    return men, women, products
+
+
+def get_navigation(max_queries=None):
+    with CaptureQueriesContext(connection) as context:
+        response = APIClient().get("/hht/api/categories/navigation/")
+    assert response.status_code == 200
+    if max_queries is not None:
+        # The request's own SAVEPOINT and RELEASE aside.
+        queries = [query["sql"] for query in context.captured_queries if "SAVEPOINT" not in query["sql"]]
+        assert len(queries) <= max_queries, queries
+    return response.json()
+
+
+def flatten(nodes):
+    return [(node["name"], node["product_count"], flatten(node["sub_categories"])) for node in nodes]
+
+
+def test_tree_with_product_counts(catalogue):
+    navigation = get_navigation(max_queries=1)
+    assert flatten(navigation["categories"]) == [
+        ("Men", 2, [("Footwear", 1, [("Sandals", 1, [])])]),
+        ("Women", 1, []),
+    ]
+    assert [(node["name"], node["product_count"]) for node in navigation["collections"]] == [("Handloom", 3)]
+
+
+def test_cached_until_a_category_changes(catalogue, django_capture_on_commit_callbacks):
+    men, women, products = catalogue
+    get_navigation()
+    with django_capture_on_commit_callbacks(execute=True):
+        products["dhoti"].name = "Cotton dhoti"
+        products["dhoti"].save()
+    get_navigation(max_queries=0)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        products["saree"].categories.add(men)
+    assert flatten(get_navigation()["categories"])[0][:2] == ("Men", 3)
+    with django_capture_on_commit_callbacks(execute=True):
+        women.name = "Ladies"
+        women.save()
+    assert [node["name"] for node in get_navigation()["categories"]] == ["Ladies", "Men"]
+
+
+def test_product_count_follows_publishing_and_deletes(catalogue, django_capture_on_commit_callbacks):
+    men, women, products = catalogue
+    silk = Collection.objects.create(name="Silk")
+    get_navigation()
+    with django_capture_on_commit_callbacks(execute=True):
+        products["kolhapuri"].collection = silk
+        products["kolhapuri"].save()
+    assert [(node["name"], node["product_count"]) for node in get_navigation()["collections"]] == \
+        [("Handloom", 2), ("Silk", 1)]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        products["saree"].published = False
+        products["saree"].save()
+    navigation = get_navigation()
+    assert flatten(navigation["categories"])[1] == ("Women", 0, [])
+    assert [node["product_count"] for node in navigation["collections"]] == [1, 1]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        products["dhoti"].delete()
+    assert flatten(get_navigation()["categories"])[0][:2] == ("Men", 1)
@@ -0,0 +1,128 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from app.customers.models import Review
+from app.products.models import Category, Collection, Product, ProductImage, ProductSearchDocument, \
+    ProductVariant, Supplier, Tag
+from app.users.tests.factories import UserFactory
+from app.utils.local_cache import local_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def products():
+    collection = Collection.objects.create(name="Handloom")
+    silk = Product.objects.create(name="Kanchi silk saree", slug="kanchi-silk-saree", short_description="Pure silk",
+                                  published=True, collection=collection)
+    cotton = Product.objects.create(name="Cotton dhoti", slug="cotton-dhoti", short_description="Soft cotton",
+                                    description="Pairs well with a silk shawl", published=True, collection=collection)
+    towel = Product.objects.create(name="Bath towel", slug="bath-towel", short_description="Terry",
+                                   published=True, collection=collection)
+    return silk, cotton, towel
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+def search(q, **params):
+    response = APIClient().get("/hht/api/products/", {"q": q, **params})
+    assert response.status_code == 200
+    return [product["slug"] for product in response.json()["results"]]
+
+
+def test_results_are_ranked(products):
+    # A match in the name outranks one in the description.
+    assert search("silk") == ["kanchi-silk-saree", "cotton-dhoti"]
+    assert search("silk", ordering="name") == ["cotton-dhoti", "kanchi-silk-saree"]
+
+
+def test_last_word_is_a_prefix(products):
+    assert search("cotton dho") == ["cotton-dhoti"]
+    assert search("sare") == ["kanchi-silk-saree"]
+    assert search("cot towel") == []
+
+
+def test_search_vector_follows_tags_and_categories(products, django_capture_on_commit_callbacks):
+    silk, cotton, towel = products
+    assert search("wedding") == search("bathroom") == search("festive") == search("bamboo") == []
+    with django_capture_on_commit_callbacks(execute=True):
+        tag = Tag.objects.create(name="wedding")
+        towel.tags.add(tag)
+        category = Category.objects.create(name="Bathroom")
+        category.products.add(towel)
+    assert search("wedding") == search("bathroom") == ["bath-towel"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tag.name = "festive"
+        tag.save()
+    assert search("wedding") == [] and search("festive") == ["bath-towel"]
+    with django_capture_on_commit_callbacks(execute=True):
+        category.products.clear()
+    assert search("bathroom") == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        towel.description = "Quick dry bamboo"
+        towel.save()
+    assert search("bamboo") == ["bath-towel"]
+
+
+def test_deleted_links_leave_the_documents(products, django_capture_on_commit_callbacks):
+    silk, cotton, towel = products
+    tag, supplier = Tag.objects.create(name="wedding"), Supplier.objects.create(name="Weavers")
+    silk.tags.add(tag)
+    silk.suppliers.add(supplier)
+    category = Category.objects.create(name="Bathroom")
+    category.products.add(towel)
+    assert search("wedding") == ["kanchi-silk-saree"] and search("bathroom") == ["bath-towel"]
+    supplier_id = supplier.pk
+    assert search("", supplier_id=supplier_id) == ["kanchi-silk-saree"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for row in (tag, supplier, category):
+            row.delete()
+    assert search("wedding") == search("bathroom") == search("", supplier_id=supplier_id) == []
+    assert list(ProductSearchDocument.objects.filter(product__in=products)
+                .values_list("tag_ids", "supplier_ids", "category_ids")) == [([], [], [])] * 3
+
+
+def test_query_operators_are_ignored(products):
+    assert search("silk | !towel") == search("silk towel") == []
+    assert len(search("!!")) == 3
+
+
+def test_search_document_follows_variants_images_and_reviews(products):
+    silk, cotton, towel = products
+    supplier = Supplier.objects.create(name="Weavers")
+    silk.suppliers.add(supplier)
+    for price, stock, published in (("1200", 3, True), ("900", 2, True), ("100", 50, False)):
+        ProductVariant.objects.create(product=silk, name=price, sale_price=Decimal(price), stock_quantity=stock,
+                                      published=published)
+    ProductImage.objects.create(product=silk, image="merchandise/product_images/back.jpg")
+    ProductImage.objects.create(product=silk, image="merchandise/product_images/front.jpg", is_thumbnail=True)
+    user = UserFactory()
+    Review.objects.create(user=user, product=silk, rating=5)
+    review = Review.objects.create(user=user, product=silk, rating=2)
+
+    document = ProductSearchDocument.objects.get(product=silk)
+    assert document.supplier_ids == [supplier.pk]
+    assert (document.min_price, document.max_price, document.stock) == (Decimal("900"), Decimal("1200"), 5)
+    assert document.thumbnail.name == "merchandise/product_images/front.jpg"
+    assert (document.rating_count, document.rating_average) == (2, Decimal("3.5"))
+
+    review.delete()
+    silk.variants.filter(sale_price=Decimal("900")).delete()
+    document.refresh_from_db()
+    assert (document.rating_count, document.min_price, document.stock) == (1, Decimal("1200"), 3)
+
+    silk.delete()
+    assert not ProductSearchDocument.objects.filter(product_id=silk.pk).exists()
@@ -1,5 +1,3 @@
-from django.core.cache import cache
-from django.http import JsonResponse
 from rest_framework import viewsets, status
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiResponse
 from rest_framework.decorators import action
@@ -7,7 +5,7 @@ from rest_framework.response import Response
 
 from .controllers import CategoryController, CollectionController, SupplierController, TagController, CouponController, \
     ProductController, ProductVariantController, ProductImageController, AttributeValueController, AttributeController
-from .models import ProductImage
+from .models import Category, Collection, ProductImage, Supplier, Tag
 from .serializers import CategorySerializer, CollectionSerializer, SupplierSerializer, TagSerializer, CouponSerializer, \
     ProductSerializer, ProductVariantSerializer, ProductImageSerializer, AttributeValueSerializer, AttributeSerializer
 from .schemas import CategoryCreateSchema, CategoryUpdateSchema, CategoryListSchema, CollectionCreateSchema, \
@@ -16,10 +14,17 @@ from .schemas import CategoryCreateSchema, CategoryUpdateSchema, CategoryListSch
     ProductCreateSchema, ProductUpdateSchema, ProductListSchema, ProductVariantCreateSchema, ProductVariantUpdateSchema, \
     ProductVariantListSchema, ProductImageCreateSchema, ProductImageUpdateSchema, ProductImageListSchema, \
     AttributeValueCreateSchema, AttributeValueUpdateSchema, AttributeValueListSchema, AttributeCreateSchema, \
-    AttributeUpdateSchema, AttributeListSchema
+    AttributeUpdateSchema, AttributeListSchema, ProductAutocompleteSchema
+from ..utils.cache import build_tag, build_versioned_key, get_payload_tags, get_tagged, get_tagged_entry, set_tagged
+from ..utils.conditional import get_instance_validators, get_not_modified_response, set_validators
 from ..utils.constants import CacheKeys, Timeouts
+from ..utils.helpers import build_cache_key, build_selection_cache_key, qdict_to_dict
 from ..utils.pagination import CustomPageNumberPagination
-from ..utils.views import BaseViewSet
+from ..utils.renderers import ORJSONResponse
+from ..utils.responses import encode_body, encoded_response
+from ..utils.views import BaseViewSet, get_cached_response
+
+FACET_MODELS = (("category", Category), ("tag", Tag), ("supplier", Supplier), ("collection", Collection))
 
 
 class CategoryViewSet(BaseViewSet):
@@ -30,6 +35,7 @@ class CategoryViewSet(BaseViewSet):
     list_schema = CategoryListSchema
     cache_key_retrieve = CacheKeys.CATEGORY_DETAILS_BY_PK
     cache_key_list = CacheKeys.CATEGORY_LIST
+    cache_stampede_protection = True
 
     @extend_schema(
         description="Create a new Category",
@@ -75,7 +81,9 @@ class CategoryViewSet(BaseViewSet):
         parameters=[
             OpenApiParameter(name='parent', type=int),
             OpenApiParameter(name='name', type=str),
-            OpenApiParameter(name='active', type=bool)]
+            OpenApiParameter(name='active', type=bool),
+            OpenApiParameter(name='ancestor', type=int,
+                             description="The category and all its subcategories, parents before their children")]
 
     )
     def list(self, request, **kwargs):
@@ -95,6 +103,21 @@ class CategoryViewSet(BaseViewSet):
     def retrieve(self, request, pk, *args, **kwargs):
         return super().retrieve(request, pk, *args, **kwargs)
 
+    @extend_schema(
+        description="The whole active category tree, nested in `sub_categories`, and the active collections, each "
+                    "with its number of published products (a category's including its subcategories')",
+    )
+    @action(detail=False, methods=['get'], url_path='navigation')
+    def navigation(self, request):
+        # Category, collection and product-category link changes bump the version. Product writes that change a
+        # count (publishing, moving collection, deleting) evict it through its tag, see app/products/signals.py.
+        cache_key = build_versioned_key(CacheKeys.CATEGORY_NAVIGATION.value, [Category, Collection])
+        body = get_tagged(cache_key)
+        if body is None:
+            body = encode_body(self.controller.get_navigation())
+            set_tagged(cache_key, body, {CacheKeys.CATEGORY_NAVIGATION.value}, timeout=Timeouts.HOUR_24)
+        return encoded_response(body, request)
+
     @extend_schema(
         description="Make a Category inactive",
         parameters=[
@@ -115,6 +138,7 @@ class CollectionViewSet(BaseViewSet):
     list_schema = CollectionListSchema
     cache_key_retrieve = CacheKeys.COLLECTION_DETAILS_BY_PK  # Update as needed
     cache_key_list = CacheKeys.COLLECTION_LIST  # Update as needed
+    cache_stampede_protection = True
 
     @extend_schema(
         description="Create a new Collection",
@@ -426,6 +450,9 @@ class ProductViewSet(BaseViewSet):
     list_schema = ProductListSchema
     cache_key_retrieve = CacheKeys.PRODUCT_DETAILS_BY_SLUG
     cache_key_list = CacheKeys.PRODUCT_LIST
+    cache_stampede_protection = True
+    approximate_count = True
+    cache_timeout = Timeouts.HOUR_6
     lookup_field = 'slug'
 
     @extend_schema(
@@ -482,69 +509,128 @@ class ProductViewSet(BaseViewSet):
         description="List and filter Products",
         responses={200: ProductSerializer(many=True)},
         parameters=[
+            OpenApiParameter(name="q", type=str,
+                             description="Full-text search over name, descriptions, tags and categories, the last "
+                                         "word as a prefix. Results are ordered by relevance unless `ordering` is "
+                                         "given"),
             OpenApiParameter(name="slug", type=str, description="Filter by product slug"),
-            OpenApiParameter(name="name", type=str, description="Filter by product name"),
+            OpenApiParameter(name="name", type=str, description="Filter by product name (substring, prefer `q`)"),
             OpenApiParameter(name="sku", type=str, description="Filter by product SKU"),
             OpenApiParameter(name="min_price", type=str, description="Filter by product price"),
             OpenApiParameter(name="max_price", type=str, description="Filter by product price"),
             OpenApiParameter(name="published", type=bool, description="Filter by published status"),
             OpenApiParameter(name="collection_id", type=int, description="Filter by collection ID"),
-            OpenApiParameter(name="category_id", type=int, description="Filter by categories IDs"),
+            OpenApiParameter(name="category_id", type=int,
+                             description="Filter by categories IDs, their subcategories included"),
             OpenApiParameter(name="tag_id", type=int, description="Filter by tags IDs"),
             OpenApiParameter(name="supplier_id", type=int, description="Filter by suppliers IDs"),
             OpenApiParameter(name="coupon_id", type=int, description="Filter by coupons IDs"),
             OpenApiParameter(name="ordering", type=str, description="sort by ordering"),
+            OpenApiParameter(name="facets", type=bool,
+                             description="Add `facets` to the page: product counts per category, tag, supplier, "
+                                         "collection and price bucket, each counted with the other filters applied"),
+            OpenApiParameter(name="fields", type=str,
+                             description="Comma separated fields to return, dotted for nested ones (variants.images)"),
+            OpenApiParameter(name="expand", type=str,
+                             description="Nested fields listed in `fields` to return in full instead of as IDs"),
         ]
     )
     def list(self, request, **kwargs):
         return super().list(request, **kwargs)
 
+    def get_list_extra(self, data):
+        if not data.facets:
+            return super().get_list_extra(data)
+        facets = self.controller.get_facet_counts(**data.dict())
+        # Facet values carry names, evict the page when one is renamed.
+        tags = [build_tag(model, row["id"]) for facet, model in FACET_MODELS for row in facets[facet]]
+        return {"facets": facets}, tags
+
     @extend_schema(
         description="Retrieve a specific Product by Slug",
         responses={200: ProductSerializer}
     )
     def retrieve(self, request, *args, slug=None):
-        instance, cache_key = None, ""
+        errors, selection = self.get_field_selection(request)
+        if errors:
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+        cache_key = ""
         if self.cache_key_retrieve.value:
-            cache_key = self.cache_key_retrieve.value.format(slug=slug)
-            instance = cache.get(cache_key)
-        if instance:
-            data = instance
-        else:
-            instance = self.controller.get_product_by_slug(slug=slug)
-            if not instance:
-                return JsonResponse({"error": "Instance with this slug does not exist"}, status=status.HTTP_404_NOT_FOUND)
-            data = self.controller.serialize_one(instance, self.serializer)
-            if self.cache_key_retrieve:
-                cache.set(cache_key, data, timeout=Timeouts.MINUTES_10)
-        return JsonResponse(data=data, status=status.HTTP_200_OK)
+            cache_key = build_selection_cache_key(self.cache_key_retrieve.value.format(slug=slug), selection)
+            entry = get_tagged_entry(cache_key)
+            if entry is not None:
+                return get_cached_response(request, entry)
+
+        validators = None
+        if self.conditional_requests:
+            validators = get_instance_validators(request, self.controller.get_valid_qs().filter(slug=slug),
+                                                 self.serializer)
+            not_modified = get_not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+        instance = self.controller.get_optimized_instance(self.controller.get_valid_qs().filter(slug=slug),
+                                                          self.serializer, selection)
+        if not instance:
+            return ORJSONResponse({"error": "Instance with this slug does not exist"}, status=status.HTTP_404_NOT_FOUND)
+        data = self.controller.serialize_one(instance, self.serializer, selection)
+        if cache_key:
+            body = encode_body(data)
+            set_tagged(cache_key, body, get_payload_tags(self.serializer, data), timeout=self.cache_timeout,
+                       validators=validators)
+            return set_validators(encoded_response(body, request), validators)
+        return set_validators(ORJSONResponse(data=data, status=status.HTTP_200_OK), validators)
 
     @action(detail=True, methods=['post'], url_path='add-to-favorites')
     def add_to_favorites(self, request, slug=None):
         product = self.controller.get_product_by_slug(slug=slug)
         if not product:
-            return JsonResponse({"error": "Product with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
+            return ORJSONResponse({"error": "Product with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
         request.user.favorites.add(product)
-        return JsonResponse({'status': 'product added to favorites'}, status=status.HTTP_200_OK)
+        return ORJSONResponse({'status': 'product added to favorites'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='remove-from-favorites')
     def remove_from_favorites(self, request, slug=None):
         product = self.controller.get_product_by_slug(slug=slug)
         if not product:
-            return JsonResponse({"error": "Product with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
+            return ORJSONResponse({"error": "Product with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
         request.user.favorites.remove(product)
-        return JsonResponse({'status': 'product removed from favorites'}, status=status.HTTP_200_OK)
+        return ORJSONResponse({'status': 'product removed from favorites'}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='my-favourites')
     def list_favorites(self, request):
         paginator = CustomPageNumberPagination()
-        queryset = request.user.favorites.all()
+        queryset = self.controller.optimize_queryset(request.user.favorites.all(), self.serializer)
+        if paginator.is_streaming(request):
+            return paginator.get_streaming_response(
+                queryset, lambda rows: self.controller.serialize_queryset(rows, self.serializer)
+            )
         page = paginator.paginate_queryset(queryset, request, view=self)
         if page is not None:
             res = self.controller.serialize_queryset(page, self.serializer)
             return paginator.get_paginated_response(res)
         res = self.controller.serialize_queryset(queryset, self.serializer)
-        return JsonResponse(res, safe=False, status=status.HTTP_200_OK)
+        return ORJSONResponse(res, safe=False, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        description="Suggestions for a search box: the closest product names (prefix or fuzzy match) with a "
+                    "thumbnail, and matching category and tag names",
+        parameters=[
+            OpenApiParameter(name="q", type=str, description="What has been typed so far, at least 2 characters"),
+            OpenApiParameter(name="limit", type=int, description="Suggestions of each kind, 1 to 20 (default 8)"),
+        ]
+    )
+    @action(detail=False, methods=['get'], url_path='autocomplete')
+    def autocomplete(self, request):
+        errors, data = self.controller.parse_request(ProductAutocompleteSchema, qdict_to_dict(request.query_params))
+        if errors:
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+        # Not invalidated on writes: suggestions may lag a catalogue change by the short timeout.
+        cache_key = build_cache_key(CacheKeys.PRODUCT_AUTOCOMPLETE, **data.dict())
+        body = get_tagged(cache_key)
+        if body is None:
+            body = encode_body(self.controller.autocomplete(**data.dict()))
+            set_tagged(cache_key, body, (), timeout=Timeouts.MINUTES_2)
+        return encoded_response(body, request)
 
 
 class ProductVariantViewSet(BaseViewSet):
@@ -630,7 +716,7 @@ class ProductVariantViewSet(BaseViewSet):
     def add_to_cart(self, request, pk, *args, **kwargs):
         errors, instance = self.controller.add_to_cart(pk, request.user)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": "Added to Cart Successfully"}, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -642,7 +728,7 @@ class ProductVariantViewSet(BaseViewSet):
     def remove_from_cart(self, request, pk, *args, **kwargs):
         errors, instance = self.controller.remove_from_cart(pk, request.user)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": "Removed from Cart Successfully"}, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -654,7 +740,7 @@ class ProductVariantViewSet(BaseViewSet):
     def increase_cart_item(self, request, pk, *args, **kwargs):
         errors, instance = self.controller.increase_cart_item(pk, request.user)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": "Increased Cart Item Successfully"}, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -666,7 +752,7 @@ class ProductVariantViewSet(BaseViewSet):
     def decrease_cart_item(self, request, pk, *args, **kwargs):
         errors, instance = self.controller.decrease_cart_item(pk, request.user)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": "Decreased Cart Item Successfully"}, status=status.HTTP_200_OK)
 
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ShippingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app.shippings"
+
+    def ready(self):
+        import app.shippings.signals  # noqa: F401
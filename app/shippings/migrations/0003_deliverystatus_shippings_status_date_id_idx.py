@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shippings", "0002_pincodeavailability_shippingrate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="deliverystatus",
+            index=models.Index(fields=["status_date", "id"], name="shippings_status_date_id_idx"),
+        ),
+    ]
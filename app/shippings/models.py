@@ -34,6 +34,9 @@ class DeliveryStatus(models.Model):
     location = models.CharField(max_length=255, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["status_date", "id"], name="shippings_status_date_id_idx")]
+
     def __str__(self):
         return f"Status {DeliveryStatusStatus(self.status).label} for Shipment {self.shipment.id} on {self.status_date}"
 
@@ -0,0 +1,4 @@
+from app.shippings.models import ShippingProvider, Shipment, DeliveryStatus
+from app.utils.signals import connect_cache_invalidation
+
+connect_cache_invalidation(ShippingProvider, Shipment, DeliveryStatus)
@@ -183,6 +183,7 @@ class DeliveryStatusViewSet(BaseViewSet):
     list_schema = DeliveryStatusListSchema
     cache_key_retrieve = CacheKeys.DELIVERY_STATUS_DETAILS_BY_PK
     cache_key_list = CacheKeys.DELIVERY_STATUS_LIST
+    keyset_ordering = "-status_date"
 
     @extend_schema(
         description="Create a new Delivery Status",
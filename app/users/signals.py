@@ -0,0 +1,4 @@
+from app.users.models import User
+from app.utils.signals import connect_cache_invalidation
+
+connect_cache_invalidation(User)
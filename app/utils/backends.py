@@ -0,0 +1,190 @@
+"""
+Clients for the third-party services the API calls: the payment gateway (Razorpay), SMS (Textlocal) and signed
+invoice URLs (S3). Each one is picked by a dotted path in settings, like ``EMAIL_BACKEND``:
+
+    PAYMENT_BACKEND = "app.utils.backends.RazorpayBackend"
+    SMS_BACKEND = "app.utils.backends.TextlocalBackend"
+    FILE_URL_BACKEND = "app.utils.backends.S3FileURLBackend"
+
+The ``Fake*`` backends never leave the process, so the OTP, cart, create-order, handle-payment and invoice flow
+can run on a machine with no network. They wait ``FAKE_BACKEND_LATENCY`` seconds (+/- 50%) per call and fail with
+:class:`BackendError` on a ``FAKE_BACKEND_FAILURE_RATE`` share of calls, to load test with realistic remote
+latencies and error paths.
+"""
+import hashlib
+import hmac
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from functools import lru_cache
+
+import boto3
+import razorpay
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+from app.utils.constants import SMS
+
+
+class BackendError(Exception):
+    """A third-party service could not be reached or refused the call."""
+
+
+@lru_cache(maxsize=None)
+def _load(path):
+    return import_string(path)()
+
+
+def get_payment_client():
+    """The ``razorpay.Client``-like object of ``PAYMENT_BACKEND``, created once per process."""
+    return _load(settings.PAYMENT_BACKEND)
+
+
+def get_sms_backend():
+    return _load(settings.SMS_BACKEND)
+
+
+def get_file_url_backend():
+    return _load(settings.FILE_URL_BACKEND)
+
+
+def simulate_remote_call():
+    """Latency and failure injection shared by the fake backends."""
+    latency = settings.FAKE_BACKEND_LATENCY
+    if latency > 0:
+        time.sleep(latency * random.uniform(0.5, 1.5))
+    if random.random() < settings.FAKE_BACKEND_FAILURE_RATE:
+        raise BackendError("Injected failure")
+
+
+# Payment gateway
+# ------------------------------------------------------------------------------
+
+class RazorpayBackend(razorpay.Client):
+    def __init__(self):
+        super().__init__(auth=(settings.RAZOR_KEY_ID, settings.RAZOR_KEY_SECRET))
+
+
+class FakeRazorpayClient:
+    """
+    In-memory stand-in for the parts of ``razorpay.Client`` the payments views use. Orders are captured as soon as
+    they are created and signatures are checked like Razorpay does, with ``RAZOR_KEY_SECRET``; use
+    :meth:`sign_payment` to build a valid ``handle-payment`` body.
+    """
+
+    def __init__(self):
+        self.order = _FakeOrders()
+        self.payment = _FakePayments()
+        self.invoice = _FakeInvoices()
+        self.utility = _FakeUtility()
+
+    @staticmethod
+    def sign_payment(order_id, payment_id):
+        message = f"{order_id}|{payment_id}".encode()
+        return hmac.new(settings.RAZOR_KEY_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _fake_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:14]}"
+
+
+class _FakeOrders:
+    def create(self, data, **kwargs):
+        simulate_remote_call()
+        return {"id": _fake_id("order"), "entity": "order", "amount": data["amount"], "amount_paid": 0,
+                "currency": data.get("currency", "INR"), "receipt": data.get("receipt"), "status": "created",
+                "created_at": int(time.time())}
+
+
+class _FakePayments:
+    def fetch(self, payment_id, data=None, **kwargs):
+        simulate_remote_call()
+        return {"id": payment_id, "entity": "payment", "status": "captured", "captured": True}
+
+
+class _FakeInvoices:
+    def create(self, data, **kwargs):
+        simulate_remote_call()
+        return {"id": _fake_id("inv"), "entity": "invoice", "status": "issued", "created_at": int(time.time()),
+                **data}
+
+
+class _FakeUtility:
+    def verify_payment_signature(self, parameters):
+        simulate_remote_call()
+        expected = FakeRazorpayClient.sign_payment(parameters["razorpay_order_id"], parameters["razorpay_payment_id"])
+        if not hmac.compare_digest(expected, parameters["razorpay_signature"]):
+            raise BackendError("Razorpay signature verification failed")
+        return True
+
+
+# SMS
+# ------------------------------------------------------------------------------
+
+class TextlocalBackend:
+    def send(self, numbers, message, sender, test=False):
+        params = {"apikey": settings.TEXT_LOCAL_API_KEY, "numbers": numbers, "message": message, "sender": sender}
+        if test:
+            params["test"] = "true"
+        data = urllib.parse.urlencode(params).encode("utf-8")
+        try:
+            with urllib.request.urlopen(urllib.request.Request(SMS.TEXTLOCAL_HOST, data)) as f:
+                return f.read()
+        except OSError as e:
+            raise BackendError(str(e)) from e
+
+
+class FakeSMSBackend:
+    """Keeps the messages in ``outbox``, like Django's locmem email backend. Only the last 1000 are kept."""
+
+    max_messages = 1000
+
+    def __init__(self):
+        self.outbox = []
+        self._lock = threading.Lock()
+
+    def send(self, numbers, message, sender, test=False):
+        simulate_remote_call()
+        with self._lock:
+            self.outbox.append({"numbers": numbers, "message": message, "sender": sender})
+            del self.outbox[:-self.max_messages]
+        return b'{"status": "success"}'
+
+
+# Invoice URLs
+# ------------------------------------------------------------------------------
+
+class S3FileURLBackend:
+    """Presigned S3 URLs. The boto3 client is built on first use and reused, creating one costs tens of ms."""
+
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client("s3", aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                                        region_name=settings.AWS_S3_REGION_NAME)
+        return self._client
+
+    def get_url(self, name, expires_in=3600):
+        try:
+            return self.client.generate_presigned_url(
+                "get_object", Params={"Bucket": settings.AWS_STORAGE_BUCKET_NAME, "Key": name}, ExpiresIn=expires_in
+            )
+        except (BotoCoreError, ClientError) as e:
+            raise BackendError(str(e)) from e
+
+
+class FakeFileURLBackend:
+    """The default storage's own URL for the file, e.g. under ``MEDIA_URL`` with the file system storage."""
+
+    def get_url(self, name, expires_in=3600):
+        simulate_remote_call()
+        return default_storage.url(name)
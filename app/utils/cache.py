@@ -0,0 +1,245 @@
+import math
+import random
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.core.cache import cache
+from rest_framework import serializers
+
+from app.utils.constants import Timeouts
+from app.utils.instrumentation import record_cache_lookup
+from app.utils.local_cache import get_local_cache, subscriber
+
+NAMESPACE_VERSION_KEY = "cache_version:{namespace}"
+TAG_VERSION_KEY = "cache_tag:{tag}"
+TAG_VERSION_TIMEOUT = Timeouts.ONE_MONTH
+REFRESH_LOCK_KEY = "{cache_key}:lock"
+REFRESH_LOCK_TIMEOUT = Timeouts.SECONDS_10
+
+
+def get_namespace(model):
+    """Cache namespace of a model, e.g. ``products.product``."""
+    return model._meta.label_lower
+
+
+@lru_cache(maxsize=None)
+def get_serializer_models(serializer_class):
+    """Return every model a serializer reads from, including its nested serializers."""
+    models = set()
+    pending = [serializer_class()]
+    while pending:
+        serializer = pending.pop()
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        model = getattr(getattr(serializer, "Meta", None), "model", None)
+        if model is not None:
+            models.add(model)
+        for field in serializer.fields.values():
+            if isinstance(field, serializers.BaseSerializer):
+                pending.append(field)
+    return tuple(sorted(models, key=get_namespace))
+
+
+def _new_version():
+    # Seeded from the clock so a version key lost from the cache never restarts at a number
+    # that older entries were already written with.
+    return int(time.time() * 1000)
+
+
+def _get_many(keys):
+    """Read through the local tier, falling back to the shared cache for the keys it misses."""
+    local = get_local_cache()
+    found = {}
+    for key in keys:
+        value = local.get(key)
+        if value is not None:
+            found[key] = value
+    missing = [key for key in keys if key not in found]
+    if missing:
+        shared = cache.get_many(missing)
+        local.set_many(shared)
+        found.update(shared)
+    return found
+
+
+def get_namespace_versions(namespaces):
+    """Return the current version of each namespace, initialising the missing ones."""
+    keys = [NAMESPACE_VERSION_KEY.format(namespace=namespace) for namespace in namespaces]
+    versions = _get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_namespace_version(namespace):
+    """Invalidate every cached entry built from the given namespace."""
+    key = NAMESPACE_VERSION_KEY.format(namespace=namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+    subscriber.publish([key])
+
+
+def build_versioned_key(cache_key, models):
+    """Suffix a cache key with the versions of the models its payload was built from."""
+    namespaces = [get_namespace(model) for model in models]
+    versions = get_namespace_versions(namespaces)
+    return f"{cache_key}:v{'.'.join(map(str, versions))}"
+
+
+def build_tag(model, pk):
+    """Dependency tag of a single row, e.g. ``products.productvariant:12``."""
+    return f"{get_namespace(model)}:{pk}"
+
+
+def _build_tag_plan(serializer):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    nested = tuple(
+        (name, _build_tag_plan(field))
+        for name, field in serializer.fields.items()
+        if isinstance(field, serializers.BaseSerializer)
+    )
+    return serializer.Meta.model, nested
+
+
+@lru_cache(maxsize=None)
+def get_tag_plan(serializer_class):
+    """Map a serializer tree to ``(model, ((field_name, nested_plan), ...))`` once per class."""
+    return _build_tag_plan(serializer_class())
+
+
+def get_payload_tags(serializer_class, payload):
+    """Return the tags of every row a serialized payload (one object or a list of them) was built from."""
+    tags = set()
+    pending = [(get_tag_plan(serializer_class), payload)]
+    while pending:
+        plan, data = pending.pop()
+        if isinstance(data, list):
+            pending.extend((plan, item) for item in data)
+        elif isinstance(data, dict):
+            model, nested = plan
+            if data.get("id") is not None:
+                tags.add(build_tag(model, data["id"]))
+            pending.extend((nested_plan, data.get(name)) for name, nested_plan in nested)
+    return tags
+
+
+def get_tag_versions(tags):
+    """Return ``{tag: version}`` for the given tags, initialising the missing ones."""
+    keys = {TAG_VERSION_KEY.format(tag=tag): tag for tag in tags}
+    versions = _get_many(list(keys))
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _new_version(), timeout=TAG_VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return {tag: versions.get(key) for key, tag in keys.items()}
+
+
+def invalidate_tags(tags):
+    """Evict every tagged entry that depends on one of ``tags``."""
+    keys = [TAG_VERSION_KEY.format(tag=tag) for tag in tags]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=TAG_VERSION_TIMEOUT)
+    if keys:
+        subscriber.publish(keys)
+
+
+class CacheEntry(NamedTuple):
+    tag_versions: dict
+    value: object
+    expires_at: float
+    compute_time: float
+    # ETag of ``value``, so conditional GETs on a hit need no query.
+    validators: object = None
+
+    def should_refresh(self, beta=1.0):
+        """
+        Probabilistic early expiry: the closer the entry is to ``expires_at`` and the longer it took to build,
+        the more likely a request volunteers to rebuild it, so refreshes of a hot key spread out over time.
+        """
+        return time.time() - self.compute_time * beta * math.log(1.0 - random.random()) >= self.expires_at
+
+
+def set_tagged(cache_key, value, tags, timeout, stale_timeout=0, compute_time=0.0, validators=None):
+    """
+    Cache ``value`` together with the current version of each tag it depends on. The entry is fresh for
+    ``timeout`` seconds and may then be served stale for ``stale_timeout`` more while it is being rebuilt.
+    """
+    entry = CacheEntry(get_tag_versions(tags), value, time.time() + timeout, compute_time, validators)
+    cache.set(cache_key, entry, timeout=timeout + stale_timeout)
+    get_local_cache().set(cache_key, entry, timeout=timeout + stale_timeout)
+
+
+def _is_current(entry):
+    if not entry.tag_versions:
+        return True
+    current = _get_many([TAG_VERSION_KEY.format(tag=tag) for tag in entry.tag_versions])
+    return all(
+        current.get(TAG_VERSION_KEY.format(tag=tag)) == version for tag, version in entry.tag_versions.items()
+    )
+
+
+def get_tagged_entry(cache_key):
+    """Return the :class:`CacheEntry` stored by :func:`set_tagged`, or ``None`` if any of its tags changed since."""
+    entry = _get_tagged_entry(cache_key)
+    record_cache_lookup(entry is not None)
+    return entry
+
+
+def _get_tagged_entry(cache_key):
+    local = get_local_cache()
+    entry = local.get(cache_key)
+    if entry is not None:
+        if _is_current(entry):
+            return entry
+        # The shared cache may already hold a copy another worker rebuilt after the write.
+        local.delete_many([cache_key])
+    entry = cache.get(cache_key)
+    if not isinstance(entry, CacheEntry):
+        return None
+    if not _is_current(entry):
+        cache.delete(cache_key)
+        return None
+    local.set(cache_key, entry)
+    return entry
+
+
+def get_tagged(cache_key):
+    """Return a value stored by :func:`set_tagged`, or ``None`` if any of its tags changed since."""
+    entry = get_tagged_entry(cache_key)
+    return entry.value if entry is not None else None
+
+
+def acquire_refresh_lock(cache_key):
+    """Let exactly one request rebuild ``cache_key``; ``add`` is atomic on Redis."""
+    return cache.add(REFRESH_LOCK_KEY.format(cache_key=cache_key), 1, timeout=REFRESH_LOCK_TIMEOUT)
+
+
+def release_refresh_lock(cache_key):
+    cache.delete(REFRESH_LOCK_KEY.format(cache_key=cache_key))
+
+
+def wait_for_tagged_entry(cache_key, timeout=REFRESH_LOCK_TIMEOUT, interval=0.05):
+    """
+    Wait for the request holding the refresh lock to store ``cache_key``. Returns ``None`` if the lock is
+    released or times out without an entry, in which case the caller builds the value itself.
+    """
+    deadline = time.monotonic() + timeout
+    lock_key = REFRESH_LOCK_KEY.format(cache_key=cache_key)
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        entry = get_tagged_entry(cache_key)
+        if entry is not None:
+            return entry
+        if cache.get(lock_key) is None:
+            return None
+    return None
@@ -0,0 +1,75 @@
+import hashlib
+from typing import NamedTuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from app.utils.cache import get_namespace, get_namespace_versions, get_serializer_models
+
+UPDATED_AT_FIELD = "updated_at"
+
+
+class Validators(NamedTuple):
+    # No Last-Modified: ``updated_at`` of the root rows does not move on nested writes or deletes, so a client
+    # revalidating with If-Modified-Since alone would be sent 304 for a changed body.
+    etag: str
+
+
+def has_updated_at(model):
+    try:
+        model._meta.get_field(UPDATED_AT_FIELD)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _build_validators(request, serializer_class, *parts):
+    # Nested rows are covered by the namespace versions of every model in the serializer tree, which the cache
+    # invalidation signals bump on each write; ``updated_at`` covers the root rows.
+    namespaces = [get_namespace(model) for model in get_serializer_models(serializer_class)]
+    source = "|".join(map(str, (request.get_full_path(), *parts, *get_namespace_versions(namespaces))))
+    # Weak, as the same representation may be sent gzipped or not.
+    etag = "W/" + quote_etag(hashlib.md5(source.encode(), usedforsecurity=False).hexdigest())
+    return Validators(etag)
+
+
+def get_list_validators(request, queryset, serializer_class, count=True):
+    """
+    ETag of a filtered list, from ``max(updated_at)`` and the row count in a single query. Without ``count``,
+    deletions are only caught through the namespace version of the root model.
+    """
+    if not has_updated_at(queryset.model):
+        return None
+    aggregates = {"last_modified": Max(UPDATED_AT_FIELD)}
+    if count:
+        aggregates["count"] = Count("pk", distinct=True)
+    stats = queryset.order_by().aggregate(**aggregates)
+    return _build_validators(request, serializer_class, stats.get("count"), stats["last_modified"])
+
+
+def get_instance_validators(request, queryset, serializer_class):
+    """ETag of the single row matched by ``queryset``, or ``None`` if there is none."""
+    if not has_updated_at(queryset.model):
+        return None
+    row = queryset.order_by().values_list("pk", UPDATED_AT_FIELD).first()
+    if row is None:
+        return None
+    return _build_validators(request, serializer_class, *row)
+
+
+def get_not_modified_response(request, validators):
+    """Return a 304 (or 412) response if the client already holds the current representation."""
+    if validators is None:
+        return None
+    response = get_conditional_response(request, etag=validators.etag)
+    if response is not None:
+        set_validators(response, validators)
+    return response
+
+
+def set_validators(response, validators):
+    if validators is not None and (200 <= response.status_code < 300 or response.status_code == 304):
+        response.headers.setdefault("ETag", validators.etag)
+    return response
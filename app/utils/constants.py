@@ -15,61 +15,66 @@ class Timeouts:
 
 class CacheKeys(Enum):
     # LIST
-    USER_DETAILS_BY_PK = None
-    REVIEW_LIST = None
-    REVIEW_DETAILS_BY_PK = None
-    USER_LIST = None
-    DELIVERY_STATUS_LIST = None
-    DELIVERY_STATUS_DETAILS_BY_PK = None
-    SHIPMENT_LIST = None
-    SHIPMENT_DETAILS_BY_PK = None
-    SHIPPING_PROVIDER_LIST = None
-    SHIPPING_PROVIDER_DETAILS_BY_PK = None
-    RETURN_ITEM_LIST = None
-    RETURN_ITEM_DETAILS_BY_PK = None
-    REFUND_LIST = None
-    REFUND_DETAILS_BY_PK = None
-    RETURN_LIST = None
-    RETURN_DETAILS_BY_PK = None
-    ORDER_LIST = None
-    ORDER_DETAILS_BY_PK = None
-    ORDER_ITEM_LIST = None
-    ORDER_ITEM_DETAILS_BY_PK = None
-    PAYMENT_LIST = None
-    PAYMENT_DETAILS_BY_PK = None
-    CART_ITEM_LIST = None
-    CART_ITEM_DETAILS_BY_PK = None
-    WISHLIST_ITEM_LIST = None
-    WISHLIST_ITEM_DETAILS_BY_PK = None
-    WISHLIST_LIST = None
-    WISHLIST_DETAILS_BY_PK = None
-    ADDRESS_LIST = None
-    ADDRESS_DETAILS_BY_PK = None
-    CUSTOMER_LIST = None
-    CUSTOMER_DETAILS_BY_PK = None
-    ATTRIBUTE_LIST = None
-    ATTRIBUTE_DETAILS_BY_PK = None
-    ATTRIBUTE_VALUE_LIST = None
-    ATTRIBUTE_VALUE_DETAILS_BY_PK = None
-    CATEGORY_LIST = None
-    COLLECTION_LIST = None
-    SUPPLIER_LIST = None
-    TAG_LIST = None
-    COUPON_LIST = None
-    PRODUCT_LIST = None
-    PRODUCT_VARIANT_LIST = None
-    PRODUCT_IMAGE_LIST = None
+    USER_DETAILS_BY_PK = "user_details:{pk}"
+    REVIEW_LIST = "review_list:{user_id}:{product_id}:{rating}:{page}"
+    REVIEW_DETAILS_BY_PK = "review_details:{pk}"
+    USER_LIST = "user_list:{name}:{email}:{mobile_no}:{user_type}:{page}"
+    DELIVERY_STATUS_LIST = "delivery_status_list:{shipment_id}:{status}:{page}"
+    DELIVERY_STATUS_DETAILS_BY_PK = "delivery_status_details:{pk}"
+    SHIPMENT_LIST = "shipment_list:{order_id}:{provider_id}:{status}:{page}"
+    SHIPMENT_DETAILS_BY_PK = "shipment_details:{pk}"
+    SHIPPING_PROVIDER_LIST = "shipping_provider_list:{name}:{page}"
+    SHIPPING_PROVIDER_DETAILS_BY_PK = "shipping_provider_details:{pk}"
+    RETURN_ITEM_LIST = "return_item_list:{return_obj_id}:{product_variant_id}:{page}"
+    RETURN_ITEM_DETAILS_BY_PK = "return_item_details:{pk}"
+    REFUND_LIST = "refund_list:{return_obj_id}:{payment_id}:{refund_type}:{status}:{page}"
+    REFUND_DETAILS_BY_PK = "refund_details:{pk}"
+    RETURN_LIST = "return_list:{order_id}:{status}:{page}"
+    RETURN_DETAILS_BY_PK = "return_details:{pk}"
+    ORDER_LIST = "order_list:{user_id}:{coupon_id}:{status}:{page}"
+    ORDER_DETAILS_BY_PK = "order_details:{pk}"
+    ORDER_ITEM_LIST = "order_item_list:{order_id}:{product_variant_id}:{page}"
+    ORDER_ITEM_DETAILS_BY_PK = "order_item_details:{pk}"
+    PAYMENT_LIST = "payment_list:{order_id}:{payment_method}:{payment_status}:{transaction_id}:{page}"
+    PAYMENT_DETAILS_BY_PK = "payment_details:{pk}"
+    CART_ITEM_LIST = "cart_item_list:{user_id}:{product_variant_id}:{page}"
+    CART_ITEM_DETAILS_BY_PK = "cart_item_details:{pk}"
+    WISHLIST_ITEM_LIST = "wishlist_item_list:{wishlist_id}:{product_variant_id}:{page}"
+    WISHLIST_ITEM_DETAILS_BY_PK = "wishlist_item_details:{pk}"
+    WISHLIST_LIST = "wishlist_list:{user_id}:{name}:{page}"
+    WISHLIST_DETAILS_BY_PK = "wishlist_details:{pk}"
+    ADDRESS_LIST = "address_list:{user_id}:{address_type}:{page}"
+    ADDRESS_DETAILS_BY_PK = "address_details:{pk}"
+    CUSTOMER_LIST = "customer_list:{user_id}:{page}"
+    CUSTOMER_DETAILS_BY_PK = "customer_details:{pk}"
+    ATTRIBUTE_LIST = "attribute_list:{name}:{page}"
+    ATTRIBUTE_DETAILS_BY_PK = "attribute_details:{pk}"
+    ATTRIBUTE_VALUE_LIST = "attribute_value_list:{attribute_id}:{page}"
+    ATTRIBUTE_VALUE_DETAILS_BY_PK = "attribute_value_details:{pk}"
+    CATEGORY_LIST = "category_list:{parent}:{name}:{active}:{ancestor}:{page}"
+    CATEGORY_NAVIGATION = "category_navigation"
+    COLLECTION_LIST = "collection_list:{name}:{active}:{page}"
+    SUPPLIER_LIST = "supplier_list:{name}:{company}:{phone_number}:{city}:{page}"
+    TAG_LIST = "tag_list:{name}:{page}"
+    COUPON_LIST = "coupon_list:{code}:{discount_type}:{active}:{page}"
+    PRODUCT_LIST = (
+        "product_list:{q}:{slug}:{name}:{sku}:{min_price}:{max_price}:{published}:{collection_id}:"
+        "{category_id}:{tag_id}:{supplier_id}:{coupon_id}:{ordering}:{facets}:{page}"
+    )
+    PRODUCT_AUTOCOMPLETE = "product_autocomplete:{q}:{limit}"
+    PRODUCT_VARIANT_LIST = "product_variant_list:{product_id}:{page}"
+    PRODUCT_IMAGE_LIST = "product_image_list:{product_id}:{product_variant_id}:{is_thumbnail}:{is_primary}:{page}"
     SITE_VISIT_LIST = None
 
     # DETAILS
-    CATEGORY_DETAILS_BY_PK = None
-    COLLECTION_DETAILS_BY_PK = None
-    SUPPLIER_DETAILS_BY_PK = None
-    TAG_DETAILS_BY_PK = None
-    COUPON_DETAILS_BY_PK = None
-    PRODUCT_DETAILS_BY_SLUG = None
-    PRODUCT_VARIANT_DETAILS_BY_PK = None
-    PRODUCT_IMAGE_DETAILS_BY_PK = None
+    CATEGORY_DETAILS_BY_PK = "category_details:{pk}"
+    COLLECTION_DETAILS_BY_PK = "collection_details:{pk}"
+    SUPPLIER_DETAILS_BY_PK = "supplier_details:{pk}"
+    TAG_DETAILS_BY_PK = "tag_details:{pk}"
+    COUPON_DETAILS_BY_PK = "coupon_details:{pk}"
+    PRODUCT_DETAILS_BY_SLUG = "product_details:{slug}"
+    PRODUCT_VARIANT_DETAILS_BY_PK = "product_variant_details:{pk}"
+    PRODUCT_IMAGE_DETAILS_BY_PK = "product_image_details:{pk}"
     SITE_VISIT_DETAILS_BY_PK = None
 
 
@@ -1,6 +1,123 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from django.db.utils import IntegrityError
 from pydantic import ValidationError
+from rest_framework import serializers
+
 from app.utils.helpers import get_serialized_exception
+from app.utils.instrumentation import measure
+from app.utils.serialization import COLLAPSED, get_serialization_plan, parse_field_selection
+
+
+class QueryPlan(NamedTuple):
+    select_related: tuple
+    # ``(lookup, related_model, nested QueryPlan)``; the nested plan is applied to the prefetch queryset.
+    prefetch_related: tuple
+    # Columns to load with ``.only()``, ``None`` to load them all.
+    only: tuple = None
+
+
+def _get_relation(model, source):
+    if not source or source == "*" or "." in source:
+        return None
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _get_column(model, source):
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+    return field.name if field.concrete else None
+
+
+def _build_pk_plan(relation):
+    """Plan of a relation rendered as primary keys only."""
+    only = (relation.related_model._meta.pk.name,)
+    if relation.one_to_many:
+        # Prefetched rows are matched back to their parent through the foreign key.
+        only += (relation.field.name,)
+    return QueryPlan((), (), only)
+
+
+def _build_query_plan(serializer, selection=None):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    if selection is None:
+        items, only = [(field, None) for field in serializer.fields.values()], None
+    else:
+        items, only = [(serializer.fields[name], sub) for name, sub in selection], [model._meta.pk.name]
+    select_related, prefetch_related = [], []
+    for field, sub in items:
+        relation = _get_relation(model, field.source)
+        if relation is None:
+            column = _get_column(model, field.source)
+            if column is None:
+                # Method fields and properties may read any column.
+                only = None
+            elif only is not None:
+                only.append(column)
+            continue
+        single = relation.many_to_one or relation.one_to_one
+        if single and relation.concrete and only is not None:
+            only.append(relation.name)
+        if isinstance(field, serializers.BaseSerializer) and sub == COLLAPSED:
+            if not single:
+                prefetch_related.append((field.source, relation.related_model, _build_pk_plan(relation)))
+            elif not relation.concrete:
+                select_related.append(field.source)
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = _build_query_plan(field, sub)
+            if single:
+                # Joined in the same query; whatever the nested serializer needs is loaded through the join.
+                select_related.append(field.source)
+                select_related.extend(f"{field.source}__{path}" for path in nested.select_related)
+                prefetch_related.extend(
+                    (f"{field.source}__{lookup}", related_model, plan)
+                    for lookup, related_model, plan in nested.prefetch_related
+                )
+                if only is not None and nested.only is not None:
+                    only.extend(f"{field.source}__{column}" for column in nested.only)
+            else:
+                if nested.only is not None and relation.one_to_many:
+                    nested = nested._replace(only=nested.only + (relation.field.name,))
+                prefetch_related.append((field.source, relation.related_model, nested))
+        elif isinstance(field, serializers.ManyRelatedField):
+            pk_only = isinstance(field.child_relation, serializers.PrimaryKeyRelatedField)
+            prefetch_related.append((field.source, relation.related_model,
+                                     _build_pk_plan(relation) if pk_only else QueryPlan((), ())))
+        elif single and not isinstance(field, serializers.PrimaryKeyRelatedField):
+            # Primary keys are read from the ``<field>_id`` column; any other representation needs the row.
+            select_related.append(field.source)
+    only = None if only is None else tuple(dict.fromkeys(only))
+    return QueryPlan(tuple(select_related), tuple(prefetch_related), only)
+
+
+@lru_cache(maxsize=1024)
+def get_query_plan(serializer_class, selection=None):
+    """Work out once per serializer class (and field selection) which relations and columns it reads."""
+    return _build_query_plan(serializer_class(), selection)
+
+
+def apply_query_plan(queryset, plan):
+    if plan.select_related:
+        queryset = queryset.select_related(*plan.select_related)
+    if plan.prefetch_related:
+        queryset = queryset.prefetch_related(*(
+            Prefetch(lookup, queryset=apply_query_plan(related_model._default_manager.all(), nested))
+            for lookup, related_model, nested in plan.prefetch_related
+        ))
+    if plan.only is not None:
+        queryset = queryset.only(*plan.only)
+    return queryset
 
 
 class Controller:
@@ -59,17 +176,32 @@ class Controller:
         except self.model.DoesNotExist as e:
             return None
 
-    def serialize_one(self, obj, serializer_override=None):
+    def parse_field_selection(self, serializer_class, fields, expand=None):
+        try:
+            return None, parse_field_selection(serializer_class, fields, expand)
+        except ValueError as e:
+            return {"errors": str(e)}, None
+
+    def optimize_queryset(self, queryset, serializer_class, selection=None):
+        """
+        Join or prefetch every relation ``serializer_class`` renders, so serializing a page costs a fixed
+        number of queries whatever its size. With a field selection, only the selected columns are loaded.
+        """
+        return apply_query_plan(queryset, get_query_plan(serializer_class, selection))
+
+    def get_optimized_instance(self, queryset, serializer_class, selection=None):
+        return self.optimize_queryset(queryset, serializer_class, selection).first()
+
+    def serialize_one(self, obj, serializer_override=None, selection=None):
         serializer_class = serializer_override
 
-        data = serializer_class(obj).data
+        with measure("serialize"):
+            data = get_serialization_plan(serializer_class, selection).serialize(obj)
         return data
 
-    def serialize_queryset(self, obj_list, serializer_override=None):
-        data = []
-        for obj in obj_list:
-            data.append(self.serialize_one(obj, serializer_override))
-        return data
+    def serialize_queryset(self, obj_list, serializer_override=None, selection=None):
+        with measure("serialize"):
+            return get_serialization_plan(serializer_override, selection).serialize_many(obj_list)
 
     def make_inactive(self, obj):
         try:
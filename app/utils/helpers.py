@@ -3,12 +3,13 @@ import re
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from urllib import request, parse
 from django.conf import settings
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 
-from app.utils.constants import CacheKeys, SMS
+from app.utils.backends import get_sms_backend
+from app.utils.constants import CacheKeys
+from app.utils.serialization import format_field_selection
 from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -155,16 +156,7 @@ def trim_mobile_no(x):
 
 def send_sms(numbers, message):
     """Send SMS to given numbers with the specified message."""
-    data = parse.urlencode({
-        'apikey': settings.TEXT_LOCAL_API_KEY,
-        'numbers': numbers,
-        'message': message,
-        'sender': settings.SMS_SENDER,
-        'test': settings.DEBUG
-    }).encode('utf-8')
-
-    with request.urlopen(request.Request(SMS.TEXTLOCAL_HOST), data) as f:
-        return f.read()
+    return get_sms_backend().send(numbers, message, settings.SMS_SENDER, test=settings.DEBUG)
 
 
 def qdict_to_dict(qdict):
@@ -226,6 +218,15 @@ def build_cache_key(template_type: CacheKeys, **kwargs) -> str:
     return template_type.value.format(**formatted_args)
 
 
+def build_selection_cache_key(cache_key: str, selection) -> str:
+    """
+    Suffix a cache key with a ``?fields=``/``?expand=`` selection, so each sparse variant is cached on its own.
+    """
+    if not selection:
+        return cache_key
+    return f"{cache_key}:fields={format_field_selection(selection)}"
+
+
 def build_user_filter_cache_key(
     search_queries: list[str] or None,
     organization_id: int or None,
@@ -0,0 +1,146 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from app.utils.renderers import dumps
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_metrics", default=None)
+
+# ``IN (%s, %s, ...)`` lists differ in length from one call to the next but are the same query shape.
+re_placeholder_list = re.compile(r"\((?:%s, )+%s\)")
+
+
+class RequestMetrics:
+    """Counters collected for one sampled request."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # ``connection.execute_wrapper`` hook, the SQL still holds its placeholders so equal shapes compare equal.
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started_at
+            self.queries += 1
+            self.shapes[sql] += 1
+
+    def get_repeated_queries(self, threshold):
+        shapes = Counter()
+        for sql, count in self.shapes.items():
+            shapes[re_placeholder_list.sub("(%s)", sql)] += count
+        return [{"sql": sql, "count": count} for sql, count in shapes.most_common() if count >= threshold]
+
+
+def get_current_metrics():
+    return _current.get()
+
+
+def record_cache_lookup(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+@contextmanager
+def measure(name):
+    """Add the time spent in the block to the current request's ``name`` timing, if it is sampled."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started_at
+
+
+def get_view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view = getattr(match.func, "cls", None)
+    actions = getattr(match.func, "actions", None) or {}
+    if view is None:
+        return match.view_name
+    action = actions.get(request.method.lower())
+    return f"{view.__name__}.{action}" if action else view.__name__
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, database time, repeated query shapes (N+1 patterns), cache hits and misses and
+    serialization time for a sample of requests, and report them as one structured log line and a
+    ``Server-Timing`` header. Unsampled requests only pay for a ``random()`` call.
+
+    ``API_INSTRUMENTATION_SAMPLE_RATE`` is the share of requests recorded, ``API_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD``
+    the number of runs of the same query shape that gets a request logged as a warning.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.API_INSTRUMENTATION_SAMPLE_RATE
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, metrics)
+        return response
+
+    def report(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started_at
+        repeated = metrics.get_repeated_queries(settings.API_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": get_view_name(request),
+            "status": response.status_code,
+            "duration_ms": round(total * 1000, 2),
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db_time * 1000, 2),
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            **{f"{name}_ms": round(elapsed * 1000, 2) for name, elapsed in metrics.timings.items()},
+        }
+        if repeated:
+            record["repeated_queries"] = repeated
+        logger.log(logging.WARNING if repeated else logging.INFO, dumps(record).decode(), extra={"metrics": record})
+
+        if settings.API_INSTRUMENTATION_SERVER_TIMING:
+            timings = [
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"',
+                f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+                *(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in metrics.timings.items()),
+                f"total;dur={total * 1000:.2f}",
+            ]
+            response["Server-Timing"] = ", ".join(timings)
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCache:
+    """Size-bounded LRU with per-entry TTL, private to one worker process."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.timeout > 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        if not self.enabled or value is None:
+            return
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def set_many(self, data, timeout=None):
+        for key, value in data.items():
+            self.set(key, value, timeout=timeout)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class InvalidationSubscriber:
+    """
+    Keeps the local tiers of every worker coherent: invalidated keys are published on a Redis channel
+    and each worker drops them from its own :class:`LocalCache`.
+    """
+
+    def __init__(self, local_cache, channel):
+        self.local_cache = local_cache
+        self.channel = channel
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return settings.CACHES["default"]["BACKEND"].startswith("django_redis")
+
+    def ensure_started(self):
+        if not self.available or (self._pid == os.getpid() and self._thread and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            # Either the first use in this worker, a fork that inherited the parent's entries, or a lost
+            # connection during which messages may have been missed: start from an empty local tier.
+            self.local_cache.clear()
+            try:
+                from django_redis import get_redis_connection
+
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self.handle_message})
+                self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self.handle_error)
+                self._pid = os.getpid()
+            except Exception as e:
+                logger.warning("Local API cache subscriber could not start: %s", e)
+                self._thread = None
+
+    def handle_message(self, message):
+        self.local_cache.delete_many(json.loads(message["data"]))
+
+    def handle_error(self, exception, pubsub, thread):
+        logger.warning("Local API cache subscriber stopped: %s", exception)
+        self.local_cache.clear()
+        thread.stop()
+        pubsub.close()
+
+    def publish(self, keys):
+        self.local_cache.delete_many(keys)
+        if not self.available:
+            return
+        try:
+            from django_redis import get_redis_connection
+
+            get_redis_connection("default").publish(self.channel, json.dumps(list(keys)))
+        except Exception as e:
+            # Peers fall back to the local TTL, which bounds how long they can serve the old version.
+            logger.warning("Local API cache invalidation could not be published: %s", e)
+
+
+local_cache = LocalCache(settings.API_LOCAL_CACHE_MAX_ENTRIES, settings.API_LOCAL_CACHE_TIMEOUT)
+subscriber = InvalidationSubscriber(local_cache, settings.API_CACHE_INVALIDATION_CHANNEL)
+
+
+def get_local_cache():
+    """Return this worker's local tier, making sure it is subscribed to invalidations."""
+    if local_cache.enabled:
+        subscriber.ensure_started()
+    return local_cache
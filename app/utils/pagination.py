@@ -1,30 +1,249 @@
+import base64
+import binascii
+import json
 from collections import OrderedDict
+from functools import reduce
+from itertools import islice
+from typing import NamedTuple
 
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.response import Response
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from app.utils.renderers import ORJSONResponse, dumps
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    # Rows read from the database cursor, serialized and written out per chunk when streaming ``page=all``.
+    stream_chunk_size = 500
+
+    def get_page_key(self, request):
+        return request.query_params.get(self.page_query_param)
+
+    def is_streaming(self, request):
+        return request.query_params.get(self.page_query_param, '').lower() == 'all'
+
+    def get_streaming_response(self, queryset, serialize, extra=None):
+        """
+        Send the whole of ``queryset`` as ``{"count", "next", "previous", "page_size", **extra, "results"}``,
+        written out one chunk at a time: rows come from a server-side cursor (``iterator()`` keeps the queryset's
+        prefetches, per chunk) and ``serialize`` turns each chunk into a list of dicts, so memory stays flat
+        however many rows there are.
+        """
+        count = queryset.count()
+        head = dumps(OrderedDict([
+            ('count', count),
+            ('next', ''),
+            ('previous', ''),
+            ('page_size', self.page_size),
+            *(extra or {}).items(),
+            ('results', []),
+        ]))
+        # Everything up to and including the opening bracket of ``results``.
+        return StreamingHttpResponse(self.stream_results(queryset, serialize, head[:-2]),
+                                     content_type='application/json')
+
+    def stream_results(self, queryset, serialize, head):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        yield head
+        separator = b''
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            # Splice each chunk's array items into the single results array.
+            yield separator + dumps(serialize(chunk))[1:-1]
+            separator = b','
+        yield b']}'
+
+    def get_paginated_response(self, data):
+        return ORJSONResponse(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class ApproximatePage(Page):
+    """A page whose successor is known from an extra row fetched with it, not from the estimated page count."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator reporting the Postgres planner's row estimate for the query instead of running ``COUNT(*)``, once
+    that estimate reaches ``settings.API_APPROXIMATE_COUNT_THRESHOLD``. Smaller results are counted exactly,
+    where the count is cheap and an estimate would be noticeably off. With an estimate, the pages past
+    ``num_pages`` stay reachable and a page has a next one when a row follows it.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self.get_estimate()
+        if estimate is not None and estimate >= settings.API_APPROXIMATE_COUNT_THRESHOLD:
+            self.is_approximate = True
+            return estimate
+        self.is_approximate = False
+        return super().count
+
+    def get_estimate(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'explain') or connections[queryset.db].vendor != 'postgresql' or \
+                queryset.query.is_empty():
+            return None
+        # The top plan node's estimate; for unfiltered tables it comes straight from pg_class.reltuples.
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past the estimated page count: the estimate may fall short, page() finds out from the rows.
+            if self.is_approximate and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.is_approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return ApproximatePage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+class ApproximateCountPagination(CustomPageNumberPagination):
+    """Page numbers over :class:`ApproximateCountPaginator`, with ``count_is_approximate`` in each page."""
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        return ORJSONResponse(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_approximate', self.page.paginator.is_approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class Cursor(NamedTuple):
+    value: object
+    pk: object
+    reverse: bool
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over an indexed ``(ordering_field, pk)`` pair. Every page is an index range scan starting
+    right after the previous one, so deep pages cost the same as the first, and no ``COUNT(*)`` is run.
+
+    The ordering is the queryset's own (e.g. the ``ordering`` list parameter), else the view's
+    ``keyset_ordering``, else the model's default ordering, else ``-pk``. Only its first field is used.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_key(self, request):
+        return f"cursor:{request.query_params.get(self.cursor_query_param, '')}"
+
+    def get_ordering(self, queryset, view=None):
+        candidates = queryset.query.order_by or (getattr(view, 'keyset_ordering', None),
+                                                 *queryset.model._meta.ordering)
+        ordering = next((term for term in candidates if isinstance(term, str) and term != '?'), '-pk')
+        field = ordering.lstrip('-')
+        return (None if field in ('pk', queryset.model._meta.pk.name) else field), ordering.startswith('-')
+
     def paginate_queryset(self, queryset, request, view=None):
-        # Check if 'page' query parameter is set to 'all'
-        if request.query_params.get('page', '').lower() == 'all':
-            # Indicate that all items should be returned
-            self.return_all = True
-            return list(queryset)  # Return a list to bypass further pagination processing
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        self.field, self.descending = self.get_ordering(queryset, view)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor.reverse
+        descending = self.descending != reverse
+
+        queryset = queryset.order_by(*self.get_order_by(descending))
+        if cursor is not None:
+            queryset = queryset.filter(self.get_after(cursor, descending, queryset.model))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
         else:
-            self.return_all = False  # Normal pagination path
-            return super().paginate_queryset(queryset, request, view=view)
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_order_by(self, descending):
+        pk = '-pk' if descending else 'pk'
+        if self.field is None:
+            return (pk,)
+        # Postgres' own NULL placement, so a plain (field, id) index serves both directions.
+        field = F(self.field).desc(nulls_first=True) if descending else F(self.field).asc(nulls_last=True)
+        return field, pk
+
+    def get_after(self, cursor, descending, model):
+        op = 'lt' if descending else 'gt'
+        after_pk = Q(**{f'pk__{op}': cursor.pk})
+        if self.field is None:
+            return after_pk
+        field, value = self.field, cursor.value
+        if value is None:
+            after = Q(**{f'{field}__isnull': True}) & after_pk
+            # NULLs come first in descending order, every non-NULL row is still ahead.
+            return after | Q(**{f'{field}__isnull': False}) if descending else after
+        # The leading ``>=`` is the index range, the OR breaks ties on the primary key.
+        after = Q(**{f'{field}__{op}e': value}) & (Q(**{f'{field}__{op}': value}) | (Q(**{field: value}) & after_pk))
+        if not descending:
+            after |= Q(**{f'{field}__isnull': True})
+        return after
+
+    def get_position(self, row):
+        value = reduce(getattr, self.field.split('__'), row) if self.field else None
+        return value, row.pk
+
+    def encode_cursor(self, row, reverse=False):
+        value, pk = self.get_position(row)
+        # orjson keeps microseconds, the stdlib encoder would round datetimes to milliseconds.
+        token = base64.urlsafe_b64encode(dumps({'v': value, 'p': pk, 'r': int(reverse)})).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            return Cursor(payload['v'], payload['p'], bool(payload['r']))
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        return self.encode_cursor(self.page[-1]) if self.has_next and self.page else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.page[0], reverse=True) if self.has_previous and self.page else None
 
     def get_paginated_response(self, data):
-        # If all items are being returned, don't include pagination details
-        if getattr(self, 'return_all', False):
-            return Response(OrderedDict([
-                ('count', len(data)),
-                ('next', ''),
-                ('previous', ''),
-                ('page_size', self.page_size),
-                ('results', data)
-            ]))
-        else:
-            # Normal paginated response
-            return super().get_paginated_response(data)
+        return ORJSONResponse(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('page_size', self.page_size),
+            ('results', data)
+        ]))
@@ -0,0 +1,41 @@
+import gzip
+from typing import NamedTuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from rest_framework import status
+
+from app.utils.renderers import ORJSONRenderer
+
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+
+
+class EncodedBody(NamedTuple):
+    """A response body encoded once, so cache hits can be written to the socket without re-serializing."""
+    content: bytes
+    gzipped: bool
+
+
+def encode_body(data):
+    """Render ``data`` to JSON bytes, gzipped when it is large enough for compression to pay off."""
+    content = ORJSONRenderer().render(data)
+    if settings.API_CACHE_COMPRESS and len(content) >= settings.API_CACHE_COMPRESS_MIN_BYTES:
+        # A fixed mtime keeps the compressed bytes identical for identical payloads.
+        return EncodedBody(gzip.compress(content, compresslevel=settings.API_CACHE_COMPRESS_LEVEL, mtime=0), True)
+    return EncodedBody(content, False)
+
+
+def encoded_response(body, request, status=status.HTTP_200_OK):
+    """Send an :class:`EncodedBody` as is, only decompressing it for clients that do not accept gzip."""
+    content = body.content
+    gzipped = body.gzipped and re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if body.gzipped and not gzipped:
+        content = gzip.decompress(content)
+    response = HttpResponse(content, content_type="application/json", status=status)
+    if gzipped:
+        response["Content-Encoding"] = "gzip"
+    if body.gzipped:
+        patch_vary_headers(response, ("Accept-Encoding",))
+    return response
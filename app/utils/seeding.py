@@ -0,0 +1,311 @@
+"""
+Deterministic bulk generation of catalogue and customer rows for load tests, see the ``seed_data`` command.
+
+Every row apart from M2M links gets an explicit primary key derived from its index, starting after the current
+maximum of its table, and every chunk draws from its own ``random.Random`` seeded with ``(seed, kind, chunk start)``.
+The same seed therefore produces the same rows whatever the number of workers, and chunks can be inserted by separate
+processes in any order: products only point to the small shared tables created up front, customers only to products.
+"""
+import multiprocessing
+import random
+import time
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from app.customers.enums import AddressType
+from app.customers.models import Address, CartItem, Customer
+from app.orders.enums import OrderStatus
+from app.orders.models import Order, OrderItem
+from app.payments.enums import PaymentMethod, PaymentStatus
+from app.payments.models import Payment
+from app.products.models import Attribute, AttributeValue, Category, Collection, Product, ProductImage, \
+    ProductVariant, Supplier, Tag
+from app.products.search import refresh_search_documents
+from app.shippings.enums import DeliveryStatusStatus, ShipmentStatus
+from app.shippings.models import DeliveryStatus, Shipment, ShippingProvider
+from app.users.models import User
+from app.utils.cache import bump_namespace_version, get_namespace
+
+WORDS = ("cotton", "silk", "linen", "handloom", "kanchi", "organic", "indigo", "block-print", "ikat", "khadi",
+         "saree", "dhoti", "kurta", "shawl", "stole", "towel", "bedsheet", "runner", "cushion", "napkin")
+CITIES = ("Chennai", "Coimbatore", "Madurai", "Salem", "Erode", "Tiruppur", "Karur", "Kanchipuram")
+
+# Tables whose primary keys are assigned here, in creation order.
+SEEDED_MODELS = (
+    Collection, Category, Tag, Supplier, Attribute, AttributeValue, ShippingProvider,
+    Product, ProductVariant, ProductImage,
+    User, Customer, Address, CartItem, Order, OrderItem, Payment, Shipment, DeliveryStatus,
+)
+
+
+class SeedPlan(NamedTuple):
+    seed: int
+    products: int
+    users: int
+    categories: int = 200
+    category_roots: int = 8
+    category_branching: int = 4
+    collections: int = 20
+    tags: int = 50
+    suppliers: int = 30
+    attributes: int = 6
+    values_per_attribute: int = 8
+    providers: int = 4
+    variants_per_product: int = 3
+    categories_per_product: int = 2
+    tags_per_product: int = 2
+    cart_items_per_user: int = 2
+    orders_per_user: int = 3
+    items_per_order: int = 3
+    statuses_per_shipment: int = 2
+    chunk_size: int = 5000
+    batch_size: int = 2000
+    # First primary key of every table in SEEDED_MODELS, filled in by ``get_first_pks``.
+    first_pks: dict = None
+
+    def pk(self, model, index):
+        return self.first_pks[model._meta.label] + index
+
+    @property
+    def variants(self):
+        return self.products * self.variants_per_product
+
+    def get_chunks(self, kind, total):
+        return [(kind, start, min(start + self.chunk_size, total)) for start in range(0, total, self.chunk_size)]
+
+    def get_row_count(self):
+        shared = self.collections + self.categories + self.tags + self.suppliers + self.attributes * (
+            1 + self.values_per_attribute) + self.providers
+        per_variant = 2 + min(2, self.attributes * self.values_per_attribute)
+        per_product = 3 + self.categories_per_product + self.tags_per_product + self.variants_per_product * per_variant
+        per_order = 1 + self.items_per_order + 1 + 1 + self.statuses_per_shipment
+        per_user = 3 + self.cart_items_per_user + self.orders_per_user * per_order
+        return shared + self.products * per_product + self.users * per_user
+
+
+def get_first_pks():
+    return {
+        model._meta.label: (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1 for model in SEEDED_MODELS
+    }
+
+
+def get_rng(plan, kind, start):
+    return random.Random(f"{plan.seed}:{kind}:{start}")
+
+
+def get_price(rng, low=200, high=20000):
+    return Decimal(rng.randrange(low, high)) + Decimal("0.99")
+
+
+def get_buying_price(price):
+    return (price * Decimal("0.7")).quantize(Decimal("0.01"))
+
+
+def build_shared(plan):
+    """Rows every chunk points to: collections, the category tree, tags, suppliers, attributes, providers."""
+    rng = get_rng(plan, "shared", 0)
+    rows = {
+        Collection: [Collection(pk=plan.pk(Collection, n), name=f"Collection {plan.pk(Collection, n)}")
+                     for n in range(plan.collections)],
+        Tag: [Tag(pk=plan.pk(Tag, n), name=rng.choice(WORDS)) for n in range(plan.tags)],
+        Supplier: [Supplier(pk=plan.pk(Supplier, n), name=f"Weaver {plan.pk(Supplier, n)}",
+                            city=rng.choice(CITIES)) for n in range(plan.suppliers)],
+        Attribute: [Attribute(pk=plan.pk(Attribute, n), name=f"Attribute {plan.pk(Attribute, n)}")
+                    for n in range(plan.attributes)],
+        AttributeValue: [
+            AttributeValue(pk=plan.pk(AttributeValue, n), value=f"{rng.choice(WORDS)} {n % plan.values_per_attribute}",
+                           attribute_id=plan.pk(Attribute, n // plan.values_per_attribute))
+            for n in range(plan.attributes * plan.values_per_attribute)
+        ],
+        ShippingProvider: [ShippingProvider(pk=plan.pk(ShippingProvider, n), name=f"Courier {n}")
+                           for n in range(plan.providers)],
+    }
+    # The first ``category_roots`` categories are roots, every parent then gets ``category_branching`` children
+    # in order, which makes a tree a few levels deep.
+    categories = []
+    for n in range(plan.categories):
+        parent = None if n < plan.category_roots else (n - plan.category_roots) // plan.category_branching
+        # Parents come first, their paths are known.
+        path = ([] if parent is None else categories[parent].path) + [plan.pk(Category, n)]
+        categories.append(Category(pk=plan.pk(Category, n), name=f"Category {plan.pk(Category, n)}",
+                                   parent_id=None if parent is None else plan.pk(Category, parent),
+                                   path=path, depth=len(path) - 1))
+    rows[Category] = categories
+    return rows
+
+
+def build_products(plan, start, stop):
+    rng = get_rng(plan, "products", start)
+    rows = {model: [] for model in (Product, Product.categories.through, Product.tags.through,
+                                    Product.suppliers.through, ProductVariant, ProductVariant.attribute_values.through,
+                                    ProductImage)}
+    values = plan.attributes * plan.values_per_attribute
+    for index in range(start, stop):
+        pk = plan.pk(Product, index)
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {pk}"
+        price = get_price(rng)
+        rows[Product].append(Product(
+            pk=pk, slug=f"seed-product-{pk}", name=name, sku=f"SKU-{pk}", buying_price=get_buying_price(price),
+            sale_price=price, short_description=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)}",
+            description=" ".join(rng.choice(WORDS) for _ in range(30)), published=rng.random() < 0.9,
+            collection_id=plan.pk(Collection, rng.randrange(plan.collections)),
+        ))
+        for category in rng.sample(range(plan.categories), plan.categories_per_product):
+            rows[Product.categories.through].append(
+                Product.categories.through(product_id=pk, category_id=plan.pk(Category, category)))
+        for tag in rng.sample(range(plan.tags), plan.tags_per_product):
+            rows[Product.tags.through].append(Product.tags.through(product_id=pk, tag_id=plan.pk(Tag, tag)))
+        rows[Product.suppliers.through].append(
+            Product.suppliers.through(product_id=pk, supplier_id=plan.pk(Supplier, rng.randrange(plan.suppliers))))
+        rows[ProductImage].append(ProductImage(
+            pk=plan.pk(ProductImage, index * (plan.variants_per_product + 1)), product_id=pk, is_primary=True,
+            image=f"merchandise/product_images/seed-{pk}.jpg",
+        ))
+        for position in range(plan.variants_per_product):
+            variant_index = index * plan.variants_per_product + position
+            variant_pk = plan.pk(ProductVariant, variant_index)
+            rows[ProductVariant].append(ProductVariant(
+                pk=variant_pk, product_id=pk, name=f"{name} {position + 1}", sku=f"SKU-{pk}-{position + 1}",
+                buying_price=get_buying_price(price), sale_price=price, stock_quantity=rng.randrange(0, 500),
+                low_stock_threshold=5, published=True,
+            ))
+            for value in rng.sample(range(values), min(2, values)):
+                rows[ProductVariant.attribute_values.through].append(ProductVariant.attribute_values.through(
+                    productvariant_id=variant_pk, attributevalue_id=plan.pk(AttributeValue, value)))
+            rows[ProductImage].append(ProductImage(
+                pk=plan.pk(ProductImage, index * (plan.variants_per_product + 1) + position + 1),
+                product_variant_id=variant_pk, image=f"merchandise/product_images/seed-{pk}-{position + 1}.jpg",
+            ))
+    return rows
+
+
+def build_users(plan, start, stop):
+    rng = get_rng(plan, "users", start)
+    rows = {model: [] for model in (User, Customer, Address, CartItem, Order, OrderItem, Payment, Shipment,
+                                    DeliveryStatus)}
+    per_order = plan.items_per_order
+    for index in range(start, stop):
+        pk = plan.pk(User, index)
+        rows[User].append(User(
+            pk=pk, username=f"seed-user-{pk}", email=f"seed-user-{pk}@example.com", name=f"Customer {pk}",
+            mobile_no=f"{6000000000 + pk}", password=f"{UNUSABLE_PASSWORD_PREFIX}seed",
+        ))
+        rows[Customer].append(Customer(pk=plan.pk(Customer, index), user_id=pk))
+        address_pk = plan.pk(Address, index)
+        rows[Address].append(Address(
+            pk=address_pk, user_id=pk, address_type=AddressType.HOME, line1=f"{rng.randrange(1, 300)} Main Road",
+            city=rng.choice(CITIES), pincode=f"6{rng.randrange(0, 100000):05d}",
+        ))
+        for position in range(plan.cart_items_per_user):
+            rows[CartItem].append(CartItem(
+                pk=plan.pk(CartItem, index * plan.cart_items_per_user + position), user_id=pk,
+                product_variant_id=plan.pk(ProductVariant, rng.randrange(plan.variants)),
+                quantity=rng.randrange(1, 4),
+            ))
+        for position in range(plan.orders_per_user):
+            order_index = index * plan.orders_per_user + position
+            order_pk = plan.pk(Order, order_index)
+            status = rng.choice(OrderStatus.values)
+            total = Decimal(0)
+            for item in range(per_order):
+                price = get_price(rng)
+                quantity = rng.randrange(1, 3)
+                total += price * quantity
+                rows[OrderItem].append(OrderItem(
+                    pk=plan.pk(OrderItem, order_index * per_order + item), order_id=order_pk, quantity=quantity,
+                    product_variant_id=plan.pk(ProductVariant, rng.randrange(plan.variants)), price=price,
+                ))
+            paid = status != OrderStatus.PENDING
+            rows[Order].append(Order(
+                pk=order_pk, user_id=pk, shipping_address_id=address_pk, billing_address_id=address_pk,
+                total_amount=total, status=status, payment_status=paid, razorpay_order_id=f"order_seed_{order_pk}",
+            ))
+            rows[Payment].append(Payment(
+                pk=plan.pk(Payment, order_index), order_id=order_pk, amount=total,
+                payment_method=rng.choice(PaymentMethod.values), transaction_id=f"pay_seed_{order_pk}",
+                payment_status=PaymentStatus.COMPLETED if paid else PaymentStatus.PENDING,
+            ))
+            shipment_pk = plan.pk(Shipment, order_index)
+            rows[Shipment].append(Shipment(
+                pk=shipment_pk, order_id=order_pk, tracking_number=f"TRK{order_pk}",
+                provider_id=plan.pk(ShippingProvider, rng.randrange(plan.providers)),
+                status=ShipmentStatus.DELIVERED if status == OrderStatus.DELIVERED else ShipmentStatus.PENDING,
+            ))
+            for step in range(plan.statuses_per_shipment):
+                rows[DeliveryStatus].append(DeliveryStatus(
+                    pk=plan.pk(DeliveryStatus, order_index * plan.statuses_per_shipment + step),
+                    shipment_id=shipment_pk, status=DeliveryStatusStatus.values[step % len(DeliveryStatusStatus)],
+                    location=rng.choice(CITIES),
+                ))
+    return rows
+
+
+BUILDERS = {"products": build_products, "users": build_users}
+
+
+def insert(rows, batch_size):
+    count = 0
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # Losing the last chunks in a crash is fine for generated data; waiting on each WAL flush is not.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit TO OFF")
+        for model, objects in rows.items():
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            count += len(objects)
+    return count
+
+
+def seed_chunk(plan, kind, start, stop):
+    count = insert(BUILDERS[kind](plan, start, stop), plan.batch_size)
+    if kind == "products":
+        # Search documents are built from the links, variants and images, so they are filled once the chunk is in.
+        refresh_search_documents(
+            Product.objects.filter(pk__range=(plan.pk(Product, start), plan.pk(Product, stop - 1)))
+        )
+    return count
+
+
+def _run_task(task):
+    plan, kind, start, stop = task
+    try:
+        return seed_chunk(plan, kind, start, stop)
+    finally:
+        connections.close_all()
+
+
+def reset_sequences():
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), SEEDED_MODELS):
+            cursor.execute(sql)
+
+
+def seed(plan, workers=1, log=print):
+    """Insert ``plan``'s rows, chunks spread over ``workers`` processes. Returns the number of rows inserted."""
+    plan = plan._replace(first_pks=plan.first_pks or get_first_pks())
+    started_at = time.monotonic()
+    count = insert(build_shared(plan), plan.batch_size)
+    for kind, total in (("products", plan.products), ("users", plan.users)):
+        tasks = [(plan, *chunk) for chunk in plan.get_chunks(kind, total)]
+        if workers > 1:
+            # Forked workers must open their own connections.
+            connections.close_all()
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                results = pool.imap_unordered(_run_task, tasks)
+                for done, inserted in enumerate(results, 1):
+                    count += inserted
+                    log(f"{kind}: {done}/{len(tasks)} chunks, {count} rows, {time.monotonic() - started_at:.0f}s")
+        else:
+            for done, task in enumerate(tasks, 1):
+                count += seed_chunk(*task)
+                log(f"{kind}: {done}/{len(tasks)} chunks, {count} rows, {time.monotonic() - started_at:.0f}s")
+    reset_sequences()
+    # bulk_create sends no signals, drop the cached API responses in one go instead.
+    for model in SEEDED_MODELS:
+        bump_namespace_version(get_namespace(model))
+    return count
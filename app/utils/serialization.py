@@ -0,0 +1,248 @@
+import inspect
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import Field, SkipField
+from rest_framework.relations import PKOnlyObject, RelatedField
+
+_SKIP = object()
+# A nested relation listed in ``?fields=`` without being expanded is rendered as its primary key(s).
+COLLAPSED = "pk"
+
+
+def _parse_paths(value):
+    return [path.strip().split(".") for path in (value or "").split(",") if path.strip()]
+
+
+def _build_selection(serializer, tree, expand, prefix=""):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    fields = serializer.fields
+    # The primary key is always kept, cache tags and clients both rely on it.
+    names = set(tree) | ({"id"} & set(fields))
+    selection = []
+    for name, field in fields.items():
+        if name not in names:
+            continue
+        path, subtree = f"{prefix}{name}", tree.get(name)
+        if isinstance(field, serializers.BaseSerializer):
+            if subtree:
+                selection.append((name, _build_selection(field, subtree, expand, prefix=f"{path}.")))
+            else:
+                selection.append((name, None if path in expand else COLLAPSED))
+        elif subtree:
+            raise ValueError(f"'{path}' is not a nested field")
+        else:
+            selection.append((name, None))
+    unknown = set(tree) - set(fields)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(prefix + name for name in unknown))}")
+    return tuple(selection)
+
+
+def parse_field_selection(serializer_class, fields, expand=None):
+    """
+    Turn ``?fields=name,slug,variants.images&expand=categories`` into a hashable selection: a tuple of
+    ``(field_name, sub_selection)`` where ``sub_selection`` is ``None`` for the field in full, :data:`COLLAPSED`
+    for a nested relation rendered as primary keys, or the selection of a nested serializer. ``None`` when
+    ``fields`` is empty, i.e. the serializer is used as is.
+    """
+    paths = _parse_paths(fields)
+    if not paths:
+        return None
+    tree = {}
+    for parts in paths:
+        node = tree
+        for part in parts:
+            node = node.setdefault(part, {})
+    selection = _build_selection(serializer_class(), tree, {".".join(parts) for parts in _parse_paths(expand)})
+    get_serialization_plan(serializer_class, selection)
+    return selection
+
+
+def format_field_selection(selection):
+    """Canonical string of a selection, for cache keys."""
+    return ",".join(
+        name if sub is None else f"{name}:{sub}" if sub == COLLAPSED else f"{name}({format_field_selection(sub)})"
+        for name, sub in selection
+    )
+
+
+class SerializationPlan:
+    """
+    A serializer class compiled into a flat list of ``(field_name, extractor)`` pairs.
+
+    The serializer and its fields are instantiated once, when the plan is built; serializing a row then only
+    reads attributes and calls the leaf fields' ``to_representation``. Fields the plan cannot reason about
+    fall back to DRF's own ``get_attribute``/``to_representation``, so the output matches ``serializer.data``.
+    """
+
+    def __init__(self, serializer, selection=None):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        self.serializer = serializer
+        if selection is None and type(serializer).to_representation is not serializers.Serializer.to_representation:
+            # A custom to_representation may do anything, let the serializer handle its own rows.
+            self.fields = None
+            return
+        model = getattr(getattr(serializer, "Meta", None), "model", None)
+        if selection is None:
+            self.fields = tuple(
+                (field.field_name, _compile_field(field, model))
+                for field in serializer.fields.values() if not field.write_only
+            )
+        else:
+            fields = serializer.fields
+            self.fields = tuple(
+                (name, _compile_field(fields[name], model, sub)) for name, sub in selection
+            )
+
+    def serialize(self, instance):
+        if self.fields is None:
+            return self.serializer.to_representation(instance)
+        ret = {}
+        for name, extract in self.fields:
+            value = extract(instance)
+            if value is not _SKIP:
+                ret[name] = value
+        return ret
+
+    def serialize_many(self, instances):
+        serialize = self.serialize
+        return [serialize(instance) for instance in instances]
+
+
+@lru_cache(maxsize=1024)
+def get_serialization_plan(serializer_class, selection=None):
+    return SerializationPlan(serializer_class(), selection)
+
+
+def _generic_extractor(field):
+    """DRF's own per-field path from ``Serializer.to_representation``."""
+    def extract(instance):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return _SKIP
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return extract
+
+
+def _get_model_field(model, attr):
+    try:
+        return model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        return None
+
+
+def _is_plain_attribute(field, model):
+    """Whether ``get_attribute`` boils down to ``getattr(instance, source)`` for this field."""
+    if model is None or len(field.source_attrs) != 1:
+        return False
+    # Model methods are called by DRF, leave them to the generic path.
+    return not inspect.isfunction(getattr(model, field.source_attrs[0], None))
+
+
+def _is_plain_pk_relation(field):
+    return type(field) is serializers.PrimaryKeyRelatedField and field.pk_field is None
+
+
+def _compile_collapsed(field, model):
+    attr = field.source_attrs[0]
+    if isinstance(field, serializers.ListSerializer):
+        def extract(instance):
+            value = getattr(instance, attr)
+            return [item.pk for item in (value.all() if isinstance(value, models.Manager) else value)]
+        return extract
+
+    model_field = _get_model_field(model, attr)
+    if model_field is not None and model_field.concrete:
+        attname = model_field.attname
+        return lambda instance: getattr(instance, attname)
+
+    def extract(instance):
+        try:
+            value = getattr(instance, attr)
+        except ObjectDoesNotExist:
+            return None
+        return None if value is None else value.pk
+    return extract
+
+
+def _compile_field(field, model, selection=None):
+    generic = _generic_extractor(field)
+
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+
+    if not _is_plain_attribute(field, model):
+        if selection is not None:
+            raise ValueError(f"'{field.field_name}' cannot be collapsed or narrowed")
+        return generic
+    attr = field.source_attrs[0]
+
+    if selection == COLLAPSED:
+        return _compile_collapsed(field, model)
+
+    if isinstance(field, serializers.ListSerializer):
+        if selection is None and type(field).to_representation is not serializers.ListSerializer.to_representation:
+            return generic
+        child = SerializationPlan(field.child, selection).serialize
+
+        def extract(instance):
+            try:
+                value = getattr(instance, attr)
+            except ObjectDoesNotExist:
+                return None
+            except AttributeError:
+                return generic(instance)
+            if value is None:
+                return None
+            return [child(item) for item in (value.all() if isinstance(value, models.Manager) else value)]
+        return extract
+
+    if isinstance(field, serializers.BaseSerializer):
+        nested = SerializationPlan(field, selection).serialize
+
+        def extract(instance):
+            try:
+                value = getattr(instance, attr)
+            except ObjectDoesNotExist:
+                return None
+            except AttributeError:
+                return generic(instance)
+            return None if value is None else nested(value)
+        return extract
+
+    if isinstance(field, serializers.ManyRelatedField):
+        if not _is_plain_pk_relation(field.child_relation):
+            return generic
+
+        def extract(instance):
+            if instance.pk is None:
+                return []
+            return [item.pk for item in getattr(instance, attr).all()]
+        return extract
+
+    if isinstance(field, RelatedField):
+        model_field = _get_model_field(model, attr)
+        if not (_is_plain_pk_relation(field) and model_field is not None and model_field.concrete):
+            return generic
+        attname = model_field.attname
+        # The primary key is read straight from the ``<field>_id`` column, like DRF's pk-only optimization.
+        return lambda instance: getattr(instance, attname)
+
+    if type(field).get_attribute is not Field.get_attribute:
+        return generic
+    represent = field.to_representation
+
+    def extract(instance):
+        try:
+            value = getattr(instance, attr)
+        except (AttributeError, ObjectDoesNotExist):
+            return generic(instance)
+        return None if value is None else represent(value)
+    return extract
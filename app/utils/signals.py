@@ -0,0 +1,55 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from app.utils.cache import build_tag, bump_namespace_version, get_namespace, invalidate_tags
+
+M2M_WRITE_ACTIONS = ("post_add", "post_remove", "post_clear")
+
+
+def get_instance_tags(instance):
+    """Tags of the row itself and of every row it points to, so parents embedding it are evicted too."""
+    tags = {build_tag(instance.__class__, instance.pk)}
+    for field in instance._meta.concrete_fields:
+        if field.is_relation and (field.many_to_one or field.one_to_one):
+            value = getattr(instance, field.attname)
+            if value is not None:
+                tags.add(build_tag(field.related_model, value))
+    return tags
+
+
+def invalidate(namespaces, tags):
+    for namespace in namespaces:
+        bump_namespace_version(namespace)
+    invalidate_tags(tags)
+
+
+def invalidate_model_cache(sender, instance, **kwargs):
+    # Invalidate after commit so a concurrent reader cannot re-cache the pre-write rows under the new version.
+    transaction.on_commit(partial(invalidate, [get_namespace(sender)], get_instance_tags(instance)))
+
+
+def invalidate_m2m_cache(sender, instance, action, model, pk_set, **kwargs):
+    if action not in M2M_WRITE_ACTIONS:
+        return
+    namespaces = {get_namespace(instance.__class__), get_namespace(model)}
+    tags = {build_tag(instance.__class__, instance.pk)} | {build_tag(model, pk) for pk in pk_set or ()}
+    transaction.on_commit(partial(invalidate, namespaces, tags))
+
+
+def invalidate_bulk_created(model, instances):
+    """``bulk_create`` sends no ``post_save``, call this after it to evict what the rows' signals would have."""
+    tags = set().union(*(get_instance_tags(instance) for instance in instances))
+    transaction.on_commit(partial(invalidate, [get_namespace(model)], tags))
+
+
+def connect_cache_invalidation(*models):
+    """Evict cached API responses built from ``models`` whenever one of their rows or M2M links changes."""
+    for model in models:
+        uid = f"cache_invalidation:{get_namespace(model)}"
+        post_save.connect(invalidate_model_cache, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_model_cache, sender=model, dispatch_uid=uid)
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(invalidate_m2m_cache, sender=field.remote_field.through,
+                                dispatch_uid=f"{uid}:{field.name}")
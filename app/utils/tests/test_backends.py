@@ -0,0 +1,65 @@
+import re
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.customers.models import Address
+from app.orders.models import Order
+from app.products.models import Collection, Product, ProductVariant
+from app.utils.backends import BackendError, FakeRazorpayClient, get_payment_client, get_sms_backend, \
+    simulate_remote_call
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def test_checkout_flow_runs_offline(media_root):
+    client = APIClient()
+    client.post(reverse("api:otp-generate"), {"mobile_no": "9876543210"}, format="json")
+    message = get_sms_backend().outbox[-1]
+    assert message["numbers"] == "9876543210"
+    otp = re.search(r"\d{6}", message["message"]).group()
+    response = client.post(reverse("api:otp-verify"), {"mobile_no": "9876543210", "otp": otp}, format="json")
+    client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+
+    product = Product.objects.create(name="Saree", slug="saree", collection=Collection.objects.create(name="Silk"))
+    variant = ProductVariant.objects.create(product=product, name="Free size", buying_price=Decimal("500"),
+                                            sale_price=Decimal("700"))
+    client.post(reverse("api:product-variants-add-to-cart", kwargs={"pk": variant.pk}))
+    address = Address.objects.create(user_id=response.json()["user"]["id"], address_type=1, line1="1 Main Road",
+                                     pincode="600001")
+    response = client.post(reverse("api:payments-create-order"),
+                           {"shipping_address_id": address.pk, "billing_address_id": address.pk}, format="json")
+    assert response.status_code == 201
+    order_id = response.json()["order_id"]
+
+    payment = {"razorpay_order_id": order_id, "razorpay_payment_id": "pay_test",
+               "razorpay_signature": FakeRazorpayClient.sign_payment(order_id, "pay_test")}
+    response = client.post(reverse("api:payments-handle-payment"), payment, format="json")
+    assert response.status_code == 200
+
+    order = Order.objects.get(razorpay_order_id=order_id)
+    assert order.payment_status and order.invoice_file
+    response = client.get(reverse("api:orders-invoice", kwargs={"pk": order.pk}))
+    assert response.status_code == 302
+    assert response["Location"].endswith(order.invoice_file.name)
+
+
+def test_forged_signature_is_rejected():
+    payment = {"razorpay_order_id": "order_1", "razorpay_payment_id": "pay_1", "razorpay_signature": "0" * 64}
+    with pytest.raises(BackendError):
+        get_payment_client().utility.verify_payment_signature(payment)
+
+
+def test_failure_injection(settings):
+    settings.FAKE_BACKEND_FAILURE_RATE = 1
+    with pytest.raises(BackendError):
+        simulate_remote_call()
+    with pytest.raises(BackendError):
+        get_payment_client().order.create(data={"amount": 100})
@@ -0,0 +1,195 @@
+import gzip
+import json
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app.products.models import Attribute, AttributeValue, Category, Collection, Product, ProductVariant
+from app.products.schemas import ProductListSchema
+from app.products.serializers import ProductSerializer
+from app.utils.cache import CacheEntry, acquire_refresh_lock, build_versioned_key, get_payload_tags, \
+    get_serializer_models, release_refresh_lock, set_tagged
+from app.utils.constants import CacheKeys
+from app.utils.helpers import build_cache_key
+from app.utils.local_cache import LocalCache, local_cache
+from app.utils.responses import encode_body
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+    yield
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def api_client() -> APIClient:
+    return APIClient()
+
+
+@pytest.fixture
+def product() -> Product:
+    collection = Collection.objects.create(name="Summer")
+    product = Product.objects.create(name="Linen Shirt", short_description="Shirt", sale_price="10.00",
+                                     published=True, collection=collection)
+    product.categories.add(Category.objects.create(name="Shirts"))
+    ProductVariant.objects.create(product=product, name="M", sale_price="10.00")
+    return product
+
+
+def test_serializer_models_include_nested_serializers():
+    labels = {model._meta.label for model in get_serializer_models(ProductSerializer)}
+
+    assert labels == {
+        "products.Product", "products.Category", "products.Supplier", "products.Tag", "products.ProductVariant",
+        "products.AttributeValue", "products.Attribute", "products.ProductImage",
+    }
+
+
+def test_write_changes_versioned_key(django_capture_on_commit_callbacks):
+    key = build_versioned_key("category_details:1", [Category])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Category.objects.create(name="Shoes")
+
+    assert build_versioned_key("category_details:1", [Category]) != key
+    assert build_versioned_key("collection_details:1", [Collection]) == \
+        build_versioned_key("collection_details:1", [Collection])
+
+
+def test_nested_write_evicts_cached_product(api_client, product, django_capture_on_commit_callbacks):
+    url = f"/hht/api/products/{product.slug}/"
+    assert api_client.get(url).json()["variants"][0]["sale_price"] == "10.00"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ProductVariant.objects.filter(product=product).update(sale_price="12.00")
+        product.variants.first().save()
+
+    assert api_client.get(url).json()["variants"][0]["sale_price"] == "12.00"
+
+
+def test_m2m_write_evicts_cached_list(api_client, product, django_capture_on_commit_callbacks):
+    response = api_client.get("/hht/api/products/", {"page": 1})
+    assert [category["name"] for category in response.json()["results"][0]["categories"]] == ["Shirts"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.categories.add(Category.objects.create(name="Linen"))
+
+    response = api_client.get("/hht/api/products/", {"page": 1})
+    assert sorted(category["name"] for category in response.json()["results"][0]["categories"]) == \
+        ["Linen", "Shirts"]
+
+
+def test_payload_tags_cover_nested_rows(product):
+    variant = product.variants.get()
+    data = ProductSerializer(product).data
+
+    assert get_payload_tags(ProductSerializer, data) == {
+        f"products.product:{product.pk}",
+        f"products.category:{product.categories.get().pk}",
+        f"products.productvariant:{variant.pk}",
+    }
+
+
+def test_attribute_value_write_evicts_cached_product(api_client, product, django_capture_on_commit_callbacks):
+    url = f"/hht/api/products/{product.slug}/"
+    value = AttributeValue.objects.create(attribute=Attribute.objects.create(name="Colour"), value="Red")
+    with django_capture_on_commit_callbacks(execute=True):
+        product.variants.get().attribute_values.add(value)
+    assert api_client.get(url).json()["variants"][0]["attribute_values"][0]["value"] == "Red"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        value.value = "Blue"
+        value.save()
+
+    assert api_client.get(url).json()["variants"][0]["attribute_values"][0]["value"] == "Blue"
+
+
+def test_local_cache_evicts_least_recently_used():
+    lru = LocalCache(max_entries=2, timeout=30)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+
+def test_local_cache_serves_hits_without_shared_cache(api_client, product):
+    url = f"/hht/api/products/{product.slug}/"
+    api_client.get(url)
+    # The local tier keeps answering even once the shared cache has lost every key.
+    cache.clear()
+
+    assert api_client.get(url).json()["slug"] == product.slug
+
+
+def test_expired_list_page_served_stale_while_another_request_refreshes(api_client, product):
+    cache_key = build_versioned_key(build_cache_key(CacheKeys.PRODUCT_LIST, page="1", **ProductListSchema().dict()),
+                                    [Product])
+    # Expired as if its fresh window had passed, while its stale window is still open.
+    set_tagged(cache_key, encode_body({"results": "stale"}), set(), timeout=-1, stale_timeout=60)
+    assert acquire_refresh_lock(cache_key)
+
+    assert api_client.get("/hht/api/products/", {"page": 1}).json() == {"results": "stale"}
+
+    release_refresh_lock(cache_key)
+    assert api_client.get("/hht/api/products/", {"page": 1}).json()["results"][0]["slug"] == product.slug
+
+
+def test_entry_refreshes_early_only_near_expiry():
+    fresh = CacheEntry({}, None, expires_at=time.time() + 3600, compute_time=0.01)
+    expired = CacheEntry({}, None, expires_at=time.time() - 1, compute_time=0.01)
+
+    assert not fresh.should_refresh()
+    assert expired.should_refresh()
+
+
+def test_cached_body_is_sent_gzipped_only_to_clients_accepting_it(api_client, product, settings):
+    settings.API_CACHE_COMPRESS_MIN_BYTES = 0
+    url = f"/hht/api/products/{product.slug}/"
+    plain = api_client.get(url)
+    compressed = api_client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+    assert "Content-Encoding" not in plain
+    assert compressed["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.content)) == plain.json()
+
+
+def test_conditional_get_returns_not_modified_until_product_changes(api_client, product,
+                                                                    django_capture_on_commit_callbacks):
+    for url, params in ((f"/hht/api/products/{product.slug}/", {}), ("/hht/api/products/", {"page": 1})):
+        response = api_client.get(url, params)
+        assert response.status_code == 200 and "Last-Modified" not in response
+
+        not_modified = api_client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert (not_modified.status_code, not_modified.content) == (304, b"")
+        # Only the ETag follows nested writes and deletes.
+        assert api_client.get(url, params, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT").status_code == 200
+
+        with django_capture_on_commit_callbacks(execute=True):
+            variant = product.variants.get()
+            variant.stock_quantity += 1
+            variant.save()
+
+        assert api_client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
+
+
+def test_cached_validators_answer_conditional_gets_without_queries(api_client, product):
+    for url, params in ((f"/hht/api/products/{product.slug}/", {}), ("/hht/api/products/", {"page": 1})):
+        response = api_client.get(url, params)
+
+        with CaptureQueriesContext(connection) as context:
+            assert api_client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+            hit = api_client.get(url, params)
+        # The requests' own SAVEPOINT and RELEASE aside.
+        assert [query["sql"] for query in context.captured_queries if "SAVEPOINT" not in query["sql"]] == []
+        assert hit["ETag"] == response["ETag"]
@@ -0,0 +1,52 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from app.orders.serializers import OrderSerializer
+from app.products.controllers import ProductController
+from app.products.models import Attribute, AttributeValue, Category, Collection, Product, ProductImage, \
+    ProductVariant, Tag
+from app.products.serializers import ProductSerializer
+from app.utils.controllers import get_query_plan
+
+pytestmark = pytest.mark.django_db
+
+
+def create_products(count):
+    collection = Collection.objects.create(name="Summer")
+    category, tag = Category.objects.create(name="Shirts"), Tag.objects.create(name="linen")
+    value = AttributeValue.objects.create(attribute=Attribute.objects.create(name="Colour"), value="Red")
+    for index in range(count):
+        product = Product.objects.create(name=f"Shirt {index}", short_description="Shirt", published=True,
+                                         collection=collection)
+        product.categories.add(category)
+        product.tags.add(tag)
+        for size in ("S", "M"):
+            variant = ProductVariant.objects.create(product=product, name=size)
+            variant.attribute_values.add(value)
+            ProductImage.objects.create(product_variant=variant)
+
+
+def count_serialize_queries(controller, size):
+    with CaptureQueriesContext(connection) as context:
+        queryset = controller.optimize_queryset(Product.objects.order_by("id")[:size], ProductSerializer)
+        controller.serialize_queryset(queryset, ProductSerializer)
+    return len(context)
+
+
+def test_optimized_queryset_uses_constant_queries_per_page():
+    create_products(6)
+    controller = ProductController()
+
+    assert count_serialize_queries(controller, 2) == count_serialize_queries(controller, 6) == 8
+
+
+def test_query_plan_follows_serializer_sources():
+    plan = get_query_plan(OrderSerializer)
+
+    assert plan.select_related == ("coupon",)
+    lookup, _, items_plan = next(prefetch for prefetch in plan.prefetch_related if prefetch[0] == "items")
+    assert items_plan.select_related == ("product_variant",)
+    assert {lookup for lookup, _, _ in items_plan.prefetch_related} == {
+        "product_variant__attribute_values", "product_variant__images",
+    }
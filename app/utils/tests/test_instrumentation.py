@@ -0,0 +1,56 @@
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient
+
+from app.products.models import Collection, Product
+from app.utils.instrumentation import RequestMetrics
+from app.utils.local_cache import local_cache
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client(settings):
+    settings.API_INSTRUMENTATION_SAMPLE_RATE = 1
+    cache.clear()
+    local_cache.clear()
+    yield APIClient()
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def products():
+    collection = Collection.objects.create(name="Summer")
+    return [Product.objects.create(name=f"Shirt {index}", slug=f"shirt-{index}", short_description="Shirt",
+                                   published=True, collection=collection) for index in range(3)]
+
+
+def test_sampled_request_is_logged_with_server_timing(api_client, products, caplog):
+    with caplog.at_level(logging.INFO, logger="app.utils.instrumentation"):
+        first = api_client.get("/hht/api/products/")
+        second = api_client.get("/hht/api/products/")
+
+    assert first["Server-Timing"].startswith("db;dur=") and "serialize;dur=" in first["Server-Timing"]
+    miss, hit = (record.metrics for record in caplog.records)
+    assert miss["view"] == hit["view"] == "ProductViewSet.list"
+    assert miss["queries"] > 0 and miss["cache_misses"] == 1 and "serialize_ms" in miss
+    assert hit["cache_hits"] == 1 and "serialize_ms" not in hit
+    assert "repeated_queries" not in miss and second.status_code == 200
+
+
+def test_repeated_query_shapes_are_flagged(products):
+    metrics = RequestMetrics()
+    with connection.execute_wrapper(metrics):
+        for product in Product.objects.order_by("id"):
+            # Lazy loads, one query per row.
+            product.collection
+        list(Product.objects.filter(pk__in=[1, 2]))
+        list(Product.objects.filter(pk__in=[1, 2, 3]))
+
+    repeated = metrics.get_repeated_queries(threshold=2)
+    assert [item["count"] for item in repeated] == [3, 2]
+    assert '"products_collection"' in repeated[0]["sql"] and "IN (%s)" in repeated[1]["sql"]
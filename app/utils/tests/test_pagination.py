@@ -0,0 +1,108 @@
+import orjson
+import pytest
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from app.customers.models import Review
+from app.products.models import Collection, Product
+from app.utils.local_cache import local_cache
+from app.utils.pagination import ApproximateCountPaginator, CustomPageNumberPagination
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_client():
+    cache.clear()
+    local_cache.clear()
+    yield APIClient()
+    cache.clear()
+    local_cache.clear()
+
+
+@pytest.fixture
+def products():
+    collection = Collection.objects.create(name="Summer")
+    # Repeated names exercise the primary key tie-break.
+    return [
+        Product.objects.create(name=name, slug=f"product-{index}", short_description="Shirt", published=True,
+                               collection=collection)
+        for index, name in enumerate(("Cap", "Apron", "Belt", "Belt", "Belt", "Dhoti", "Apron"))
+    ]
+
+
+def test_keyset_pages_follow_ordering_without_count(api_client, products):
+    expected = [product.slug for product in sorted(products, key=lambda product: (product.name, product.pk))]
+
+    with CaptureQueriesContext(connection) as context:
+        first = api_client.get("/hht/api/products/", {"pagination": "cursor"}).json()
+    assert not any("COUNT(" in query["sql"] for query in context.captured_queries)
+    assert "count" not in first and first["previous"] is None
+
+    second = api_client.get(first["next"]).json()
+    assert [item["slug"] for item in first["results"] + second["results"]] == expected
+    assert second["next"] is None
+
+    back = api_client.get(second["previous"]).json()
+    assert back["results"] == first["results"] and back["previous"] is None
+
+
+def test_invalid_cursor_is_rejected(api_client, products):
+    assert api_client.get("/hht/api/products/", {"cursor": "not-a-cursor"}).status_code == 404
+
+
+def test_keyset_uses_view_ordering_over_timestamps(api_client, products):
+    reviews = [Review.objects.create(product=products[0], rating=rating) for rating in range(1, 8)]
+    # Equal timestamps down to the microsecond are still split by the primary key.
+    Review.objects.filter(pk__in=[review.pk for review in reviews[2:5]]).update(created_at=reviews[2].created_at)
+
+    ids, url = [], "/hht/api/reviews/?pagination=cursor"
+    while url:
+        page = api_client.get(url).json()
+        ids += [review["id"] for review in page["results"]]
+        url = page["next"]
+
+    expected = Review.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+    assert ids == list(expected)
+
+
+def test_page_all_streams_in_chunks(api_client, products, monkeypatch):
+    monkeypatch.setattr(CustomPageNumberPagination, "stream_chunk_size", 3)
+    response = api_client.get("/hht/api/products/", {"page": "all"})
+    assert response.streaming
+
+    chunks = list(response.streaming_content)
+    # Opening, three chunks of at most three rows, closing.
+    assert len(chunks) == 5
+    body = orjson.loads(b"".join(chunks))
+    assert body["count"] == len(products) and body["next"] == ""
+    assert sorted(item["slug"] for item in body["results"]) == sorted(product.slug for product in products)
+    assert body["results"][0]["variants"] == []
+
+
+def test_counts_are_approximate_above_threshold(api_client, products, settings):
+    response = api_client.get("/hht/api/products/", {"page": 1}).json()
+    assert response["count"] == len(products) and response["count_is_approximate"] is False
+
+    settings.API_APPROXIMATE_COUNT_THRESHOLD = 0
+    paginator = ApproximateCountPaginator(Product.objects.filter(published=True).distinct(), 5)
+    with CaptureQueriesContext(connection) as context:
+        assert paginator.count >= 0
+    assert paginator.is_approximate
+    assert [query["sql"].startswith("EXPLAIN") for query in context.captured_queries] == [True]
+
+
+def test_pages_past_an_underestimate_stay_reachable(products, settings, monkeypatch):
+    settings.API_APPROXIMATE_COUNT_THRESHOLD = 1
+    monkeypatch.setattr(ApproximateCountPaginator, "get_estimate", lambda paginator: 1)
+    queryset = Product.objects.order_by("pk")
+
+    first = ApproximateCountPaginator(queryset, 3).page(1)
+    assert first.paginator.num_pages == 1 and first.has_next()
+    last = ApproximateCountPaginator(queryset, 3).page(3)
+    assert [product.slug for product in last] == [products[-1].slug] and not last.has_next()
+    with pytest.raises(EmptyPage):
+        ApproximateCountPaginator(queryset, 3).page(4)
@@ -0,0 +1,25 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+
+from app.products.enums import DiscountType
+from app.utils.renderers import ORJSONRenderer, ORJSONResponse
+
+
+def test_renderer_encodes_like_django_json_encoder():
+    data = {"price": Decimal("149.99"), "on": datetime.date(2024, 3, 1), "ttl": datetime.timedelta(minutes=5),
+            "discount_type": DiscountType.PERCENTAGE, 1: "int key"}
+
+    expected = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    assert json.loads(ORJSONRenderer().render(data)) == expected
+
+
+def test_response_requires_safe_flag_for_non_dict():
+    with pytest.raises(TypeError):
+        ORJSONResponse([1, 2])
+
+    response = ORJSONResponse([1, 2], safe=False, status=201)
+    assert (response.status_code, response["Content-Type"], response.content) == (201, "application/json", b"[1,2]")
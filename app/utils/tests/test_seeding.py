@@ -0,0 +1,44 @@
+import pytest
+
+from app.orders.models import Order
+from app.products.models import Category, Product, ProductVariant
+from app.users.models import User
+from app.utils.seeding import SeedPlan, build_products, build_users, get_first_pks, seed
+
+pytestmark = pytest.mark.django_db
+
+PLAN = SeedPlan(seed=7, products=12, users=6, categories=60, chunk_size=5, batch_size=10)
+
+
+def get_values(rows):
+    return {
+        model._meta.label: [
+            # Timestamps defaulting to now() are the only values allowed to differ.
+            tuple(getattr(obj, field.attname) for field in model._meta.concrete_fields if not callable(field.default))
+            for obj in objects
+        ]
+        for model, objects in rows.items()
+    }
+
+
+def test_chunks_are_deterministic():
+    plan = PLAN._replace(first_pks=get_first_pks())
+
+    assert get_values(build_products(plan, 5, 10)) == get_values(build_products(plan, 5, 10))
+    assert get_values(build_users(plan, 0, 5)) == get_values(build_users(plan, 0, 5))
+    assert get_values(build_products(plan, 0, 5)) != get_values(build_products(plan._replace(seed=8), 0, 5))
+
+
+def test_seed():
+    count = seed(PLAN, log=lambda message: None)
+
+    assert count == PLAN.get_row_count()
+    assert Product.objects.count() == PLAN.products
+    assert ProductVariant.objects.count() == PLAN.variants
+    assert User.objects.count() == PLAN.users
+    assert Order.objects.count() == PLAN.users * PLAN.orders_per_user
+    assert Category.objects.filter(parent=None).count() == PLAN.category_roots
+    assert Category.objects.filter(parent__parent__isnull=False).exists()
+    # Sequences were moved past the explicit primary keys.
+    last = Product.objects.order_by("pk").last()
+    assert Product.objects.create(name="Extra", slug="extra", collection=last.collection).pk == last.pk + 1
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+import pytest
+
+from app.customers.models import Address, CartItem, Review
+from app.customers.serializers import AddressSerializer, CartItemSerializer, ReviewSerializer
+from app.orders.models import Order, OrderItem
+from app.orders.serializers import OrderSerializer
+from app.payments.models import Payment
+from app.payments.serializers import PaymentSerializer
+from app.products.models import Attribute, AttributeValue, Category, Collection, Coupon, Product, ProductImage, \
+    ProductVariant, Supplier, Tag
+from app.products.serializers import ProductSerializer
+from app.users.models import User
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from app.utils.controllers import Controller, get_query_plan
+from app.utils.local_cache import local_cache
+from app.utils.serialization import COLLAPSED, get_serialization_plan, parse_field_selection
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def order():
+    user = User.objects.create(username="asha", name="Asha", email="asha@example.com", mobile_no="9876543210")
+    coupon = Coupon.objects.create(code="SUMMER10", discount_value=Decimal("10.00"), max_usage=5)
+    product = Product.objects.create(name="Linen Shirt", short_description="Shirt", sale_price=Decimal("10.50"),
+                                     published=True, collection=Collection.objects.create(name="Summer"))
+    product.categories.add(Category.objects.create(name="Shirts"))
+    product.tags.add(Tag.objects.create(name="linen"))
+    product.suppliers.add(Supplier.objects.create(name="Weavers Co"))
+    product.coupons.add(coupon)
+    variant = ProductVariant.objects.create(product=product, name="M", sale_price=Decimal("10.50"))
+    variant.attribute_values.add(AttributeValue.objects.create(attribute=Attribute.objects.create(name="Size"),
+                                                               value="M"))
+    ProductImage.objects.create(product_variant=variant, image="merchandise/product_images/shirt.jpg")
+    address = Address.objects.create(user=user, address_type=1, line1="12 Main Road", pincode="600001")
+    CartItem.objects.create(user=user, product_variant=variant, quantity=2)
+    Review.objects.create(user=user, product=product, rating=5)
+    order = Order.objects.create(user=user, coupon=coupon, shipping_address=address, total_amount=Decimal("21.00"))
+    OrderItem.objects.create(order=order, product_variant=variant, quantity=2, price=Decimal("21.00"))
+    Payment.objects.create(order=order, amount=Decimal("21.00"), payment_method=1, payment_status=2,
+                           metadata={"source": "app"})
+    return order
+
+
+@pytest.mark.parametrize("serializer_class", [
+    ProductSerializer, OrderSerializer, CartItemSerializer, ReviewSerializer, AddressSerializer, PaymentSerializer,
+])
+def test_compiled_plan_matches_serializer_output(order, serializer_class):
+    model = serializer_class.Meta.model
+    queryset = Controller(model).optimize_queryset(model.objects.order_by("pk"), serializer_class)
+
+    expected = [serializer_class(instance).data for instance in model.objects.order_by("pk")]
+    assert get_serialization_plan(serializer_class).serialize_many(queryset) == expected
+
+
+@pytest.fixture
+def api_client():
+    cache.clear()
+    local_cache.clear()
+    yield APIClient()
+    cache.clear()
+    local_cache.clear()
+
+
+def test_sparse_fieldset_narrows_columns_and_collapses_relations():
+    selection = parse_field_selection(ProductSerializer, "name,slug,sale_price,categories,variants.images",
+                                      expand="variants.images")
+
+    assert selection == (("id", None), ("categories", COLLAPSED), ("variants", (("id", None), ("images", None))),
+                         ("slug", None), ("name", None), ("sale_price", None))
+    plan = get_query_plan(ProductSerializer, selection)
+    assert set(plan.only) == {"id", "slug", "name", "sale_price"}
+    prefetches = {lookup: nested for lookup, _, nested in plan.prefetch_related}
+    assert (prefetches["categories"].only, prefetches["variants"].only) == (("id",), ("id", "product"))
+    assert [lookup for lookup, _, _ in prefetches["variants"].prefetch_related] == ["images"]
+
+
+def test_fields_and_expand_query_params(api_client, order):
+    url = f"/hht/api/products/{order.items.get().product_variant.product.slug}/"
+
+    data = api_client.get(url, {"fields": "name,categories,variants.sale_price"}).json()
+    assert set(data) == {"id", "name", "categories", "variants"}
+    assert isinstance(data["categories"][0], int)
+    assert set(data["variants"][0]) == {"id", "sale_price"}
+
+    expanded = api_client.get(url, {"fields": "name,categories", "expand": "categories"}).json()
+    assert expanded["categories"][0]["name"] == "Shirts"
+
+    response = api_client.get(url, {"fields": "name,colour"})
+    assert response.status_code == 400 and "colour" in response.json()["errors"]
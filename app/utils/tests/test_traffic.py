@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+from app.products.models import Collection, Product, ProductVariant
+from app.users.tests.factories import UserFactory
+from app.utils.traffic import get_shape
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def capture_file(settings, tmp_path):
+    settings.API_TRAFFIC_CAPTURE_SAMPLE_RATE = 1
+    settings.API_TRAFFIC_CAPTURE_FILE = str(tmp_path / "traffic.jsonl")
+    return tmp_path / "traffic.jsonl"
+
+
+def read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_requests_are_captured(capture_file):
+    collection = Collection.objects.create(name="Summer")
+    product = Product.objects.create(name="Shirt", slug="shirt", published=True, collection=collection)
+    variant = ProductVariant.objects.create(product=product, name="M")
+    client = APIClient()
+    client.get("/hht/api/products/", {"page": 2, "category_ids": [1, 2]})
+    client.force_authenticate(UserFactory())
+    client.post(f"/hht/api/product-variants/{variant.pk}/add-to-cart/", {"quantity": 2, "note": "gift"},
+                format="json")
+
+    listed, added = read(capture_file)
+    assert listed["route"] == "api:products-list" and listed["auth"] == "anonymous"
+    assert listed["query"] == {"page": ["2"], "category_ids": ["1", "2"]} and "body" not in listed
+    assert added["route"] == "api:product-variants-add-to-cart" and added["auth"] == "user"
+    assert added["method"] == "POST" and added["status"] < 400 and added["duration_ms"] > 0
+    assert added["body"] == {"quantity": 2, "note": "<str:4>"}
+
+
+def test_capture_is_off_by_default(settings, tmp_path):
+    settings.API_TRAFFIC_CAPTURE_FILE = str(tmp_path / "traffic.jsonl")
+    APIClient().get("/hht/api/products/")
+    assert not (tmp_path / "traffic.jsonl").exists()
+
+
+def test_shape_keeps_numbers_and_hides_strings():
+    assert get_shape({"ids": [1, 2], "otp": "123456", "nested": {"ok": True, "none": None}}) == {
+        "ids": [1, 2], "otp": "<str:6>", "nested": {"ok": True, "none": None},
+    }
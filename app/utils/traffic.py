@@ -0,0 +1,117 @@
+"""
+Capture of sampled API traffic to a JSONL file, replayed against a local instance by ``benchmarks/replay.py``.
+
+Each line holds one request: when it came in, method, path, route name, query parameters, the shape of its JSON
+body, who made it (``anonymous``, ``user`` or ``staff``), response status and duration. String values in bodies are
+replaced by their length so phone numbers, OTPs and addresses never reach the file; numbers and booleans (ids,
+quantities) are kept since cart and checkout calls need them to be replayed.
+"""
+import json
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from app.utils.renderers import dumps
+
+# Bodies larger than this are recorded without their shape.
+MAX_BODY_BYTES = 64 * 1024
+MAX_LIST_ITEMS = 50
+STRING_PLACEHOLDER = "<str:{}>"
+
+
+def get_shape(value):
+    if isinstance(value, dict):
+        return {str(key): get_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [get_shape(item) for item in value[:MAX_LIST_ITEMS]]
+    if isinstance(value, str):
+        return STRING_PLACEHOLDER.format(len(value))
+    return value
+
+
+def get_auth_class(request):
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return "anonymous"
+    return "staff" if user.is_staff else "user"
+
+
+class TrafficWriter:
+    """Appends lines to ``path``, one ``write`` each on an ``O_APPEND`` descriptor so workers do not interleave."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = dumps(record) + b"\n"
+        with self._lock:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+            os.write(self._fd, line)
+
+
+_writers = {}
+
+
+def get_writer(path):
+    writer = _writers.get(path)
+    if writer is None:
+        writer = _writers.setdefault(path, TrafficWriter(path))
+    return writer
+
+
+class TrafficCaptureMiddleware:
+    """
+    Record a ``API_TRAFFIC_CAPTURE_SAMPLE_RATE`` share of API requests to ``API_TRAFFIC_CAPTURE_FILE``. Either one
+    unset turns capture off; unsampled requests only pay for a ``random()`` call.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.API_TRAFFIC_CAPTURE_SAMPLE_RATE
+        path = settings.API_TRAFFIC_CAPTURE_FILE
+        if not path or sample_rate <= 0 or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        # Read before the view does, DRF consumes the stream and ``request.body`` is gone afterwards.
+        body = self.get_body_shape(request)
+        at = time.time()
+        started_at = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        match = getattr(request, "resolver_match", None)
+        if match is None or not match.view_name.startswith("api:"):
+            return response
+        record = {
+            "at": round(at, 3),
+            "method": request.method,
+            "path": request.path,
+            "route": match.view_name,
+            "query": {key: values for key, values in request.GET.lists()},
+            "auth": get_auth_class(request),
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+        }
+        if body is not None:
+            record["body"] = body
+        get_writer(path).write(record)
+        return response
+
+    @staticmethod
+    def get_body_shape(request):
+        if request.method in ("GET", "HEAD", "OPTIONS") or request.content_type != "application/json":
+            return None
+        try:
+            if int(request.META.get("CONTENT_LENGTH") or 0) > MAX_BODY_BYTES:
+                return None
+            return get_shape(json.loads(request.body or b"null"))
+        except ValueError:
+            return None
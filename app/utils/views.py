@@ -1,10 +1,24 @@
-from django.core.cache import cache
-from django.http import JsonResponse
+import time
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from app.utils.cache import acquire_refresh_lock, build_versioned_key, get_payload_tags, get_tagged_entry, \
+    release_refresh_lock, set_tagged, wait_for_tagged_entry
+from app.utils.conditional import get_instance_validators, get_list_validators, get_not_modified_response, \
+    set_validators
 from app.utils.constants import Timeouts
-from app.utils.helpers import build_cache_key, qdict_to_dict
-from app.utils.pagination import CustomPageNumberPagination
+from app.utils.helpers import build_cache_key, build_selection_cache_key, qdict_to_dict
+from app.utils.pagination import ApproximateCountPagination, CustomPageNumberPagination, KeysetPagination
+from app.utils.renderers import ORJSONResponse
+from app.utils.responses import encode_body, encoded_response
+
+
+def get_cached_response(request, entry):
+    """Send a cached body, or a 304 if the client holds it already, from the validators stored with it."""
+    not_modified = get_not_modified_response(request, entry.validators)
+    if not_modified is not None:
+        return not_modified
+    return set_validators(encoded_response(entry.value, request), entry.validators)
 
 
 class BaseViewSet(viewsets.ViewSet):
@@ -15,89 +29,186 @@ class BaseViewSet(viewsets.ViewSet):
     list_schema = None
     cache_key_retrieve = None
     cache_key_list = None
+    cache_timeout = Timeouts.MINUTES_10
+    # Stampede protection for cached list pages: single-flight rebuilds, stale-while-revalidate for up to
+    # ``cache_stale_timeout`` seconds and probabilistic early expiry (higher beta refreshes earlier).
+    cache_stampede_protection = False
+    cache_stale_timeout = Timeouts.MINUTES_2
+    cache_early_expiry_beta = 1.0
+    # Emit an ETag on list and retrieve and answer matching conditional GETs with 304. The validators
+    # are computed when a response is built and cached with it, cache hits do not query them.
+    conditional_requests = True
+    # Keyset (cursor) pagination: used when the client sends ``?cursor=`` or ``?pagination=cursor``, or by default
+    # (unless ``?page=`` is sent) when ``keyset_pagination`` is set. ``keyset_ordering`` should match an index
+    # on ``(field, id)``; it applies when the list is not otherwise ordered.
+    keyset_pagination = False
+    keyset_ordering = None
+    # Report the planner's estimate instead of an exact COUNT(*) for large page-numbered lists.
+    approximate_count = False
 
     def create(self, request, *args, **kwargs):
         errors, data = self.controller.parse_request(self.create_schema, request.data)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
 
         errors, instance = self.controller.create(**data.dict())
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
 
-        return JsonResponse(data={"id": instance.pk}, status=status.HTTP_201_CREATED)
+        return ORJSONResponse(data={"id": instance.pk}, status=status.HTTP_201_CREATED)
 
     def partial_update(self, request, pk, *args, **kwargs):
         errors, data = self.controller.parse_request(self.update_schema, request.data)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
 
         instance = self.controller.get_instance_by_pk(pk=pk)
         if not instance:
-            return JsonResponse({"error": "Instance with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
+            return ORJSONResponse({"error": "Instance with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
 
         errors, instance = self.controller.edit(instance_id=pk, **data.dict())
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
 
-        return JsonResponse(data={"id": instance.pk, "message": "Instance updated"}, status=status.HTTP_200_OK)
+        return ORJSONResponse(data={"id": instance.pk, "message": "Instance updated"}, status=status.HTTP_200_OK)
 
     def list(self, request, **kwargs):
         errors, data = self.controller.parse_request(self.list_schema, qdict_to_dict(request.query_params))
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+        errors, queryset = self.controller.filter(**data.dict())
+        if errors:
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+        errors, selection = self.get_field_selection(request)
+        if errors:
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = self.get_paginator(request)
+        queryset = self.controller.optimize_queryset(queryset, self.serializer, selection)
+        return self.get_list_response(request, data, queryset, paginator, selection)
+
+    def get_field_selection(self, request):
+        """Parse ``?fields=`` (sparse fieldset, dotted for nested fields) and ``?expand=`` (nested relations
+        to render in full rather than as primary keys)."""
+        return self.controller.parse_field_selection(self.serializer, request.query_params.get('fields'),
+                                                     request.query_params.get('expand'))
 
-        paginator = CustomPageNumberPagination()
-        page_key = request.query_params.get('page')
-        instance, cache_key = None, ""
+    def get_paginator(self, request):
+        params = request.query_params
+        if KeysetPagination.cursor_query_param in params or params.get('pagination') == 'cursor' or \
+                (self.keyset_pagination and 'page' not in params):
+            return KeysetPagination()
+        if self.approximate_count:
+            return ApproximateCountPagination()
+        return CustomPageNumberPagination()
+
+    def get_list_validators(self, request, queryset, paginator):
+        # The validators need a COUNT(*), which keyset pagination exists to avoid.
+        if not self.conditional_requests or isinstance(paginator, KeysetPagination):
+            return None
+        return get_list_validators(request, queryset, self.serializer, count=not self.approximate_count)
+
+    def get_list_response(self, request, data, queryset, paginator, selection=None):
+        if isinstance(paginator, CustomPageNumberPagination) and paginator.is_streaming(request):
+            # ``page=all`` is streamed straight from the database and never cached.
+            validators = self.get_list_validators(request, queryset, paginator)
+            not_modified = get_not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+            extra, _ = self.get_list_extra(data)
+            return set_validators(paginator.get_streaming_response(
+                queryset, lambda rows: self.controller.serialize_queryset(rows, self.serializer, selection), extra
+            ), validators)
+        page_key = paginator.get_page_key(request)
+        cache_key, refreshing = "", False
         if self.cache_key_list.value:
-            cache_key = build_cache_key(
-                self.cache_key_list,
-                page=page_key,
-                **data.dict()
+            # Nested rows are covered by the payload tags, only list membership depends on the root model.
+            cache_key = build_versioned_key(
+                build_selection_cache_key(build_cache_key(self.cache_key_list, page=page_key, **data.dict()),
+                                          selection),
+                [self.controller.model]
             )
-            instance = cache.get(cache_key)
-
-        if instance:
-            res = instance
-        else:
-            a = data.dict()
-            errors, data = self.controller.filter(**data.dict())
-            if errors:
-                return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
-            queryset = data  # Assuming data is a queryset here
+            entry = get_tagged_entry(cache_key)
+            if entry is not None and not (
+                self.cache_stampede_protection and entry.should_refresh(self.cache_early_expiry_beta)
+            ):
+                return get_cached_response(request, entry)
+            if self.cache_stampede_protection:
+                # Single flight: one request rebuilds the page, the others keep serving the stale copy
+                # or, when there is none yet, wait for the rebuilt one.
+                refreshing = acquire_refresh_lock(cache_key)
+                if not refreshing:
+                    entry = entry if entry is not None else wait_for_tagged_entry(cache_key)
+                    if entry is not None:
+                        return get_cached_response(request, entry)
+
+        try:
+            started_at = time.monotonic()
+            validators = self.get_list_validators(request, queryset, paginator)
+            not_modified = get_not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
             page = paginator.paginate_queryset(queryset, request, view=self)
             if page is not None:
-                res = self.controller.serialize_queryset(page, self.serializer)
-                if self.cache_key_list.value:
-                    cache.set(cache_key, res, timeout=Timeouts.MINUTES_10)
-                return paginator.get_paginated_response(res)
-            res = self.controller.serialize_queryset(queryset, self.serializer)
+                res = self.controller.serialize_queryset(page, self.serializer, selection)
+                response = paginator.get_paginated_response(res)
+                extra, extra_tags = self.get_list_extra(data)
+                if extra:
+                    response = ORJSONResponse({**response.data, **extra})
+                if cache_key:
+                    body = encode_body(response.data)
+                    set_tagged(cache_key, body, get_payload_tags(self.serializer, res) | set(extra_tags),
+                               timeout=self.cache_timeout,
+                               stale_timeout=self.cache_stale_timeout if self.cache_stampede_protection else 0,
+                               compute_time=time.monotonic() - started_at, validators=validators)
+                    return set_validators(encoded_response(body, request), validators)
+                return set_validators(response, validators)
+            res = self.controller.serialize_queryset(queryset, self.serializer, selection)
+            return set_validators(ORJSONResponse(res, safe=False, status=status.HTTP_200_OK), validators)
+        finally:
+            if refreshing:
+                release_refresh_lock(cache_key)
 
-        return JsonResponse(res, safe=False, status=status.HTTP_200_OK)
+    def get_list_extra(self, data):
+        """Keys to add next to ``results`` on a list page, and the cache tags of the rows they were built from."""
+        return None, ()
 
     def retrieve(self, request, pk, *args, **kwargs):
-        instance, cache_key = None, ""
+        errors, selection = self.get_field_selection(request)
+        if errors:
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+        cache_key = ""
         if self.cache_key_retrieve.value:
-            cache_key = self.cache_key_retrieve.value.format(pk=pk)
-            instance = cache.get(cache_key)
-        if instance:
-            data = instance
-        else:
-            instance = self.controller.get_instance_by_pk(pk=pk)
-            if not instance:
-                return JsonResponse({"error": "Instance with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
-            data = self.controller.serialize_one(instance, self.serializer)
-            if self.cache_key_retrieve:
-                cache.set(cache_key, data, timeout=Timeouts.MINUTES_10)
-        return JsonResponse(data=data, status=status.HTTP_200_OK)
+            cache_key = build_selection_cache_key(self.cache_key_retrieve.value.format(pk=pk), selection)
+            entry = get_tagged_entry(cache_key)
+            if entry is not None:
+                return get_cached_response(request, entry)
+
+        validators = None
+        if self.conditional_requests:
+            validators = get_instance_validators(request, self.controller.model.objects.filter(pk=pk),
+                                                 self.serializer)
+            not_modified = get_not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+        instance = self.controller.get_optimized_instance(self.controller.model.objects.filter(pk=pk),
+                                                          self.serializer, selection)
+        if not instance:
+            return ORJSONResponse({"error": "Instance with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
+        data = self.controller.serialize_one(instance, self.serializer, selection)
+        if cache_key:
+            body = encode_body(data)
+            set_tagged(cache_key, body, get_payload_tags(self.serializer, data), timeout=self.cache_timeout,
+                       validators=validators)
+            return set_validators(encoded_response(body, request), validators)
+        return set_validators(ORJSONResponse(data=data, status=status.HTTP_200_OK), validators)
 
     @action(methods=['POST'], detail=True)
     def make_inactive(self, request, pk, *args, **kwargs):
         instance = self.controller.get_instance_by_pk(pk=pk)
         if not instance:
-            return JsonResponse({"error": "Instance with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
+            return ORJSONResponse({"error": "Instance with this ID does not exist"}, status=status.HTTP_404_NOT_FOUND)
         errors, _ = self.controller.make_inactive(instance)
         if errors:
-            return JsonResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
-        return JsonResponse(data={"message": "Successfully inactivated."}, status=status.HTTP_200_OK)
+            return ORJSONResponse(data=errors, status=status.HTTP_400_BAD_REQUEST)
+        return ORJSONResponse(data={"message": "Successfully inactivated."}, status=status.HTTP_200_OK)
@@ -0,0 +1,108 @@
+"""
+Compare JSON encode times on product list payloads shaped like ``ProductSerializer`` output.
+
+    python -m benchmarks.json_encoding [--products 50] [--variants 4] [--repeat 200]
+"""
+import argparse
+import datetime
+import json
+import os
+import timeit
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+django.setup()
+
+from django.core.serializers.json import DjangoJSONEncoder  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from app.utils.renderers import ORJSONRenderer  # noqa: E402
+
+NOW = datetime.datetime(2024, 3, 1, 10, 30, tzinfo=datetime.timezone.utc)
+
+
+def build_variant(product_id, index):
+    return {
+        "id": product_id * 100 + index,
+        "attribute_values": [
+            {"id": index * 10 + n, "attribute": {"id": n, "name": f"Attribute {n}"}, "value": f"Value {n}"}
+            for n in range(2)
+        ],
+        "images": [
+            {"id": index, "image": f"/media/merchandise/product_images/{product_id}-{index}.jpg",
+             "placeholder": None, "is_thumbnail": index == 0, "is_primary": index == 0,
+             "created_at": NOW, "updated_at": NOW, "product": None, "product_variant": product_id * 100 + index}
+        ],
+        "sku": f"SKU-{product_id}-{index}",
+        "buying_price": Decimal("120.50") + index,
+        "sale_price": Decimal("149.99") + index,
+        "stock_quantity": 25,
+        "low_stock_threshold": 5,
+        "name": f"Variant {index}",
+        "short_description": "Hand-woven cotton",
+        "description": "Hand-woven cotton, naturally dyed. " * 4,
+        "published": True,
+        "note": None,
+        "created_at": NOW,
+        "updated_at": NOW,
+        "product": product_id,
+    }
+
+
+def build_product(product_id, variants):
+    return {
+        "id": product_id,
+        "categories": [{"id": n, "name": f"Category {n}", "description": None, "icon": None, "image": None,
+                        "placeholder": None, "active": True, "created_at": NOW, "updated_at": NOW, "parent": None}
+                       for n in range(2)],
+        "suppliers": [],
+        "tags": [{"id": 1, "name": "handloom", "created_at": NOW, "updated_at": NOW}],
+        "variants": [build_variant(product_id, index) for index in range(variants)],
+        "slug": f"product-{product_id}",
+        "name": f"Product {product_id}",
+        "sku": f"SKU-{product_id}",
+        "buying_price": Decimal("120.50"),
+        "sale_price": Decimal("149.99"),
+        "short_description": "Hand-woven cotton",
+        "description": "Hand-woven cotton, naturally dyed. " * 10,
+        "published": True,
+        "note": None,
+        "created_at": NOW,
+        "updated_at": NOW,
+        "collection": 1,
+    }
+
+
+def build_page(products, variants):
+    return {"count": products, "next": None, "previous": None,
+            "results": [build_product(product_id, variants) for product_id in range(1, products + 1)]}
+
+
+ENCODERS = {
+    "json + DjangoJSONEncoder": lambda data: json.dumps(data, cls=DjangoJSONEncoder).encode(),
+    "DRF JSONRenderer": JSONRenderer().render,
+    "ORJSONRenderer": ORJSONRenderer().render,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    page = build_page(args.products, args.variants)
+    baseline = None
+    print(f"{args.products} products x {args.variants} variants, {args.repeat} runs")
+    for name, encode in ENCODERS.items():
+        size = len(encode(page))
+        elapsed = min(timeit.repeat(lambda: encode(page), number=args.repeat, repeat=3)) / args.repeat
+        baseline = baseline or elapsed
+        print(f"{name:<28} {elapsed * 1000:8.3f} ms  {size / 1024:8.1f} KiB  x{baseline / elapsed:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
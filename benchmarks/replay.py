@@ -0,0 +1,198 @@
+"""
+Replay traffic captured by ``app.utils.traffic.TrafficCaptureMiddleware`` against a running instance and report
+latency percentiles per route (the route names of ``config/api_router.py``).
+
+Requests are sent on the captured schedule divided by ``--speedup`` (0 sends them back to back), by up to
+``--concurrency`` threads. Authenticated requests use the token given for their auth class, e.g.
+``--token user=<key> --token staff=<key>``; requests of a class without a token are skipped. Bodies are rebuilt from
+their recorded shape, strings as ``x`` repeated to their length. Paths and ids are sent as captured, so replay
+against a copy of the database they came from, or expect 404s in the status counts.
+
+    python -m benchmarks.replay traffic.jsonl --base-url http://localhost:8000 [--concurrency 16] [--speedup 4] \\
+        [--token user=<key>] [--output run.json] [--compare baseline.json --threshold 15]
+
+With ``--compare``, routes whose p50 or p90 grew by more than ``--threshold`` percent over the baseline run are
+listed as regressions and the exit status is 1.
+"""
+import argparse
+import json
+import math
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+re_string_placeholder = re.compile(r"^<str:(\d+)>$")
+# Routes with fewer requests than this are reported but not compared, their percentiles are noise.
+MIN_COMPARED_REQUESTS = 20
+
+
+def load(path, limit=None):
+    records = []
+    with open(path) as capture_file:
+        for line in capture_file:
+            if line.strip():
+                records.append(json.loads(line))
+            if limit and len(records) >= limit:
+                break
+    records.sort(key=lambda record: record["at"])
+    return records
+
+
+def fill(shape):
+    if isinstance(shape, dict):
+        return {key: fill(value) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [fill(value) for value in shape]
+    if isinstance(shape, str):
+        match = re_string_placeholder.match(shape)
+        return "x" * int(match.group(1)) if match else shape
+    return shape
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+def send(base_url, record, tokens, timeout):
+    url = base_url.rstrip("/") + record["path"]
+    if record.get("query"):
+        url += "?" + urllib.parse.urlencode(record["query"], doseq=True)
+    headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+    if record["auth"] != "anonymous":
+        headers["Authorization"] = f"Token {tokens[record['auth']]}"
+    data = None
+    if "body" in record:
+        data = json.dumps(fill(record["body"])).encode()
+        headers["Content-Type"] = "application/json"
+    request = urllib.request.Request(url, data=data, headers=headers, method=record["method"])
+    started_at = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except OSError:
+        status = None
+    return status, (time.perf_counter() - started_at) * 1000
+
+
+def replay(records, base_url, tokens, concurrency, speedup, timeout):
+    """Send ``records`` on their captured schedule; returns ``{route: [(status, ms, lateness_ms), ...]}``."""
+    results = defaultdict(list)
+    lock = threading.Lock()
+    first_at = records[0]["at"] if records else 0
+    started_at = time.perf_counter()
+
+    def run(record, due):
+        lateness = max(0.0, time.perf_counter() - due) * 1000
+        status, elapsed = send(base_url, record, tokens, timeout)
+        with lock:
+            results[record["route"]].append((status, elapsed, lateness))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            due = started_at + ((record["at"] - first_at) / speedup if speedup else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, record, due)
+    return results
+
+
+def summarize(results, recorded):
+    summary = {}
+    for route, samples in sorted(results.items()):
+        elapsed = [ms for _, ms, _ in samples]
+        statuses = Counter("error" if status is None else str(status) for status, _, _ in samples)
+        summary[route] = {
+            "requests": len(samples),
+            "errors": sum(1 for status, _, _ in samples if status is None or status >= 500),
+            "statuses": dict(statuses),
+            "p50_ms": round(percentile(elapsed, 50), 2),
+            "p90_ms": round(percentile(elapsed, 90), 2),
+            "p99_ms": round(percentile(elapsed, 99), 2),
+            "max_ms": round(max(elapsed), 2),
+            # Time spent waiting for a free thread: large values mean --concurrency is too low for the speed-up.
+            "p90_lateness_ms": round(percentile([lateness for _, _, lateness in samples], 90), 2),
+            "recorded_p50_ms": round(percentile(recorded[route], 50), 2) if recorded.get(route) else None,
+        }
+    return summary
+
+
+def compare(summary, baseline_path, threshold):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["routes"]
+    regressions = []
+    print(f"\nCompared with {baseline_path}")
+    for route, result in summary.items():
+        before = baseline.get(route)
+        if before is None or min(result["requests"], before["requests"]) < MIN_COMPARED_REQUESTS:
+            continue
+        changes = {
+            key: (result[key] - before[key]) / before[key] * 100 if before[key] else 0 for key in ("p50_ms", "p90_ms")
+        }
+        regressed = any(change > threshold for change in changes.values())
+        if regressed:
+            regressions.append(route)
+        print(f"{route:<48} p50 {before['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms {changes['p50_ms']:+7.1f}%"
+              f"  p90 {before['p90_ms']:9.2f} -> {result['p90_ms']:9.2f} ms {changes['p90_ms']:+7.1f}%"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="JSONL file written by TrafficCaptureMiddleware")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--speedup", type=float, default=1.0, help="Replay this many times faster, 0 for no pauses")
+    parser.add_argument("--token", action="append", default=[], metavar="AUTH=KEY",
+                        help="DRF token for the 'user' or 'staff' auth class")
+    parser.add_argument("--limit", type=int, help="Replay the first N captured requests only")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write the per-route results to this JSON file")
+    parser.add_argument("--compare", help="Flag regressions against a previous --output file")
+    parser.add_argument("--threshold", type=float, default=15, help="Allowed p50/p90 growth in percent")
+    args = parser.parse_args()
+
+    tokens = dict(token.split("=", 1) for token in args.token)
+    records = [record for record in load(args.capture, args.limit)
+               if record["auth"] == "anonymous" or record["auth"] in tokens]
+    recorded = defaultdict(list)
+    for record in records:
+        recorded[record["route"]].append(record["duration_ms"])
+
+    print(f"Replaying {len(records)} requests against {args.base_url}, concurrency {args.concurrency}, "
+          f"speed-up {args.speedup or 'unlimited'}")
+    started_at = time.perf_counter()
+    summary = summarize(replay(records, args.base_url, tokens, args.concurrency, args.speedup, args.timeout),
+                        recorded)
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{'route':<48} {'requests':>8} {'errors':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'recorded p50':>13}")
+    for route, result in summary.items():
+        recorded_p50 = "-" if result["recorded_p50_ms"] is None else f"{result['recorded_p50_ms']:.2f}"
+        print(f"{route:<48} {result['requests']:8} {result['errors']:7} {result['p50_ms']:9.2f}"
+              f" {result['p90_ms']:9.2f} {result['p99_ms']:9.2f} {recorded_p50:>13}")
+    print(f"{len(records) / elapsed:.1f} requests/s over {elapsed:.1f}s")
+
+    if args.output:
+        report = {"meta": {"args": vars(args), "requests": len(records), "elapsed_s": round(elapsed, 2)},
+                  "routes": summary}
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare and compare(summary, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare per-object ``ModelSerializer`` instantiation with the compiled serialization plan.
+
+Rows are created inside a transaction that is rolled back at the end, so any configured database will do:
+
+    python -m benchmarks.serialization [--products 200] [--variants 4] [--repeat 5]
+"""
+import argparse
+import os
+import timeit
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+django.setup()
+
+from django.db import transaction  # noqa: E402
+
+from app.products.controllers import ProductController  # noqa: E402
+from app.products.models import Attribute, AttributeValue, Category, Collection, Product, ProductImage, \
+    ProductVariant, Tag  # noqa: E402
+from app.products.serializers import ProductSerializer  # noqa: E402
+from app.utils.serialization import get_serialization_plan  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(products, variants):
+    collection = Collection.objects.create(name="Benchmark collection")
+    categories = [Category.objects.create(name=f"Benchmark category {n}") for n in range(3)]
+    tag = Tag.objects.create(name="benchmark")
+    values = [AttributeValue.objects.create(attribute=Attribute.objects.create(name=f"Benchmark {n}"), value="x")
+              for n in range(2)]
+    for index in range(products):
+        product = Product.objects.create(name=f"Benchmark product {index}", short_description="Benchmark",
+                                         sale_price=Decimal("149.99"), published=True, collection=collection)
+        product.categories.add(*categories)
+        product.tags.add(tag)
+        for size in range(variants):
+            variant = ProductVariant.objects.create(product=product, name=f"Size {size}", sale_price=Decimal("9.5"))
+            variant.attribute_values.add(*values)
+            ProductImage.objects.create(product_variant=variant, image=f"merchandise/product_images/{index}.jpg")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            seed(args.products, args.variants)
+            controller = ProductController()
+            # Load once so only serialization is timed.
+            instances = list(controller.optimize_queryset(Product.objects.order_by("id"), ProductSerializer))
+            plan = get_serialization_plan(ProductSerializer)
+            assert plan.serialize_many(instances) == [ProductSerializer(instance).data for instance in instances]
+
+            runs = {
+                "ModelSerializer per object": lambda: [ProductSerializer(instance).data for instance in instances],
+                "compiled plan": lambda: plan.serialize_many(instances),
+            }
+            baseline = None
+            print(f"{len(instances)} products x {args.variants} variants, best of {args.repeat}")
+            for name, run in runs.items():
+                elapsed = min(timeit.repeat(run, number=1, repeat=args.repeat))
+                baseline = baseline or elapsed
+                print(f"{name:<28} {elapsed * 1000:9.2f} ms  x{baseline / elapsed:5.1f}")
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main()
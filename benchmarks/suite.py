@@ -0,0 +1,327 @@
+"""
+Latency percentiles, throughput and queries per call for the API hot paths: list and retrieve of products, variants,
+orders and cart items (cold and cached), ``ProductController.filter``, ``serialize_queryset`` at 20/100/1000 rows,
+``generate_invoice_pdf`` and the checkout/create-order flow.
+
+Rows are created inside a transaction that is rolled back at the end. It defaults to ``config.settings.test``, which
+has no debug toolbar and a local-memory cache in place of Redis; point ``DATABASE_URL`` at a scratch Postgres
+database and keep the JSON to compare later runs with:
+
+    python -m benchmarks.suite [--products 1000] [--iterations 50] [--only products] \\
+        [--output results.json] [--compare previous.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import warnings
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.test")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.paginator import UnorderedObjectListWarning  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from app.customers.models import Address, CartItem  # noqa: E402
+from app.orders.models import Order, OrderItem  # noqa: E402
+from app.products.controllers import ProductController  # noqa: E402
+from app.products.models import AttributeValue, Attribute, Category, Collection, Product, ProductImage, \
+    ProductVariant, Tag  # noqa: E402
+from app.products.serializers import ProductSerializer  # noqa: E402
+from app.products.schemas import ProductListSchema  # noqa: E402
+from app.shippings.models import PincodeAvailability, ShippingRate  # noqa: E402
+from app.users.models import User  # noqa: E402
+from app.utils.helpers import generate_invoice_pdf  # noqa: E402
+from app.utils.local_cache import local_cache  # noqa: E402
+
+PINCODE = "600001"
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook; the test client resets ``connection.queries`` on every request."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def seed(products, orders):
+    collection = Collection.objects.create(name="Benchmark collection")
+    categories = [Category.objects.create(name=f"Benchmark category {n}") for n in range(5)]
+    tags = [Tag.objects.create(name=f"benchmark {n}") for n in range(3)]
+    values = [AttributeValue.objects.create(attribute=Attribute.objects.create(name=f"Benchmark {n}"), value="x")
+              for n in range(2)]
+    rows = Product.objects.bulk_create(
+        Product(name=f"Benchmark product {index}", slug=f"benchmark-product-{index}", short_description="Benchmark",
+                sku=f"BENCH-{index}", sale_price=Decimal(100 + index % 900), published=True, collection=collection)
+        for index in range(products)
+    )
+    Product.categories.through.objects.bulk_create(
+        Product.categories.through(product=product, category=categories[index % len(categories)])
+        for index, product in enumerate(rows)
+    )
+    Product.tags.through.objects.bulk_create(
+        Product.tags.through(product=product, tag=tags[index % len(tags)]) for index, product in enumerate(rows)
+    )
+    variants = ProductVariant.objects.bulk_create(
+        ProductVariant(product=product, name=f"Size {size}", published=True, buying_price=Decimal("80"),
+                       sale_price=product.sale_price)
+        for product in rows for size in range(2)
+    )
+    ProductVariant.attribute_values.through.objects.bulk_create(
+        ProductVariant.attribute_values.through(productvariant=variant, attributevalue=value)
+        for variant in variants for value in values
+    )
+    ProductImage.objects.bulk_create(
+        ProductImage(product_variant=variant, image=f"merchandise/product_images/{variant.product_id}.jpg")
+        for variant in variants
+    )
+
+    user = User.objects.create(username="benchmark", email="benchmark@example.com", mobile_no="9999999999",
+                               name="Benchmark")
+    address = Address.objects.create(user=user, address_type=1, line1="1 Benchmark Road", city="Chennai",
+                                     pincode=PINCODE)
+    PincodeAvailability.objects.get_or_create(pincode=PINCODE)
+    ShippingRate.objects.get_or_create(pincode=PINCODE, defaults={"rate": Decimal("50"), "estimated_delivery_days": 3})
+    CartItem.objects.bulk_create(CartItem(user=user, product_variant=variant, quantity=2) for variant in variants[:10])
+    order_rows = Order.objects.bulk_create(
+        Order(user=user, shipping_address=address, billing_address=address, total_amount=Decimal("300"))
+        for _ in range(orders)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product_variant=variant, quantity=1, price=Decimal("150"))
+        for order in order_rows for variant in variants[:3]
+    )
+    return user, address
+
+
+def percentile(samples, value):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[value - 1]
+
+
+def measure(name, run, iterations, warmup, setup=None):
+    """Time ``iterations`` calls of ``run`` after ``warmup`` untimed ones; ``setup`` runs untimed before each."""
+    for _ in range(warmup):
+        setup and setup()
+        run()
+    setup and setup()
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        run()
+    samples = []
+    for _ in range(iterations):
+        setup and setup()
+        started_at = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p90_ms": round(percentile(samples, 90), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "ops_per_sec": round(len(samples) / (sum(samples) / 1000), 1),
+        "queries": queries.count,
+    }
+
+
+def check(response):
+    # An error response would be timed as if it were the real thing.
+    assert response.status_code < 400, (response.status_code, response.content[:300])
+
+
+def clear_cache():
+    cache.clear()
+    local_cache.clear()
+
+
+def get_view_cases(client):
+    cases = {}
+    routes = {
+        "products": ("api:products-list", "api:products-detail",
+                     lambda: {"slug": Product.objects.order_by("id").values_list("slug", flat=True).first()}),
+        "product-variants": ("api:product-variants-list", "api:product-variants-detail",
+                             lambda: {"pk": ProductVariant.objects.order_by("id").values_list("pk", flat=True)[0]}),
+        "orders": ("api:orders-list", "api:orders-detail",
+                   lambda: {"pk": Order.objects.order_by("id").values_list("pk", flat=True)[0]}),
+        "cart-items": ("api:cart-items-list", "api:cart-items-detail",
+                       lambda: {"pk": CartItem.objects.order_by("id").values_list("pk", flat=True)[0]}),
+    }
+    for name, (list_route, detail_route, detail_kwargs) in routes.items():
+        list_url, detail_url = reverse(list_route), reverse(detail_route, kwargs=detail_kwargs())
+        for action, url in (("list", list_url), ("retrieve", detail_url)):
+            call = (lambda url: lambda: check(client.get(url)))(url)
+            cases[f"view {name} {action} cold"] = (call, clear_cache)
+            cases[f"view {name} {action} cached"] = (call, None)
+    return cases
+
+
+def get_filter_cases():
+    controller = ProductController()
+    category = Category.objects.order_by("id").values_list("id", flat=True).first()
+    tag = Tag.objects.order_by("id").values_list("id", flat=True).first()
+    filters = {
+        "published": {},
+        "name": {"name": "product 1"},
+        "price range": {"min_price": "200", "max_price": "600"},
+        "category": {"category_id": category},
+        "category + tag + price": {"category_id": category, "tag_id": tag, "min_price": "200", "ordering": "-name"},
+    }
+    cases = {}
+    for name, params in filters.items():
+        def run(params=params):
+            _, queryset = controller.filter(**ProductListSchema(**params).dict())
+            # What a page costs: the count and the first page of rows.
+            queryset.count()
+            list(queryset[:settings.REST_FRAMEWORK["PAGE_SIZE"]])
+        cases[f"ProductController.filter {name}"] = (run, None)
+    return cases
+
+
+def get_serialize_cases():
+    controller = ProductController()
+    cases = {}
+    for rows in (20, 100, 1000):
+        # Loaded once so only serialization is timed.
+        instances = list(controller.optimize_queryset(Product.objects.order_by("id")[:rows], ProductSerializer))
+        cases[f"serialize_queryset {rows} products"] = (
+            (lambda instances: lambda: controller.serialize_queryset(instances, ProductSerializer))(instances), None
+        )
+    return cases
+
+
+def get_invoice_cases():
+    invoice = {
+        "invoice_number": "INV-0001",
+        "date": int(datetime.datetime(2024, 3, 1).timestamp()),
+        "currency_symbol": "Rs.",
+        "amount": "1500.00",
+        "customer_details": {
+            "name": "Benchmark",
+            "billing_address": {"line1": "1 Benchmark Road", "line2": None, "city": "Chennai", "pincode": PINCODE},
+            "shipping_address": None,
+        },
+        "line_items": [{"name": f"Benchmark product {n}", "quantity": 1, "unit_amount": "150.00", "amount": "150.00"}
+                       for n in range(10)],
+    }
+    return {"generate_invoice_pdf 10 items": (lambda: generate_invoice_pdf(invoice), None)}
+
+
+def get_checkout_cases(client, address):
+    checkout_url, create_order_url = reverse("api:payments-checkout"), reverse("api:payments-create-order")
+    data = {"shipping_address_id": address.pk, "billing_address_id": address.pk}
+    return {
+        "checkout": (lambda: check(client.post(checkout_url, data, format="json")), None),
+        "create-order": (lambda: check(client.post(create_order_url, data, format="json")), None),
+    }
+
+
+def compare(results, previous_path):
+    with open(previous_path) as previous_file:
+        previous = {result["name"]: result for result in json.load(previous_file)["results"]}
+    print(f"\nCompared with {previous_path}")
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        print(f"{result['name']:<48} p50 {before['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms {change:+7.1f}%"
+              f"  queries {before['queries']} -> {result['queries']}")
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Run the cases whose name contains this text")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Print the p50 change against a previous JSON file")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    warnings.filterwarnings("ignore", category=UnorderedObjectListWarning)
+    # Sampled instrumentation would add its own overhead to a share of the timed calls.
+    settings.API_INSTRUMENTATION_SAMPLE_RATE = 0
+    # create-order must not leave the process.
+    settings.PAYMENT_BACKEND = "app.utils.backends.FakeRazorpayClient"
+    started_at = datetime.datetime.now(datetime.timezone.utc)
+    results = []
+    try:
+        with transaction.atomic():
+            user, address = seed(args.products, args.orders)
+            client = APIClient()
+            client.force_authenticate(user)
+            cases = {
+                **get_view_cases(client),
+                **get_filter_cases(),
+                **get_serialize_cases(),
+                **get_invoice_cases(),
+                **get_checkout_cases(client, address),
+            }
+            print(f"{args.products} products, {args.orders} orders, {args.iterations} iterations")
+            print(f"{'case':<48} {'p50':>9} {'p90':>9} {'p99':>9} {'ops/s':>9} {'queries':>8}")
+            for name, (run, setup) in cases.items():
+                if args.only and args.only not in name:
+                    continue
+                result = measure(name, run, args.iterations, args.warmup, setup)
+                results.append(result)
+                print(f"{name:<48} {result['p50_ms']:9.3f} {result['p90_ms']:9.3f} {result['p99_ms']:9.3f}"
+                      f" {result['ops_per_sec']:9.1f} {result['queries']:8}")
+            clear_cache()
+            raise Rollback
+    except Rollback:
+        pass
+
+    if args.output:
+        report = {
+            "meta": {
+                "started_at": started_at.isoformat(),
+                "git_revision": get_git_revision(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "cache": settings.CACHES["default"]["BACKEND"],
+                "args": vars(args),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -76,6 +76,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -154,6 +155,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "app.utils.instrumentation.InstrumentationMiddleware",
+    "app.utils.traffic.TrafficCaptureMiddleware",
 ]
 
 # STATIC
@@ -331,6 +334,10 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'app.utils.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': (
         'rest_framework.pagination.PageNumberPagination',
     ),
@@ -356,3 +363,37 @@ RAZOR_KEY_ID = env("RAZOR_KEY_ID")
 RAZOR_KEY_SECRET = env("RAZOR_KEY_SECRET")
 
 TEXT_LOCAL_API_KEY = env("TEXT_LOCAL_API_KEY")
+
+# Third-party services, see app/utils/backends.py. Point these at the Fake* backends to run without network.
+PAYMENT_BACKEND = env("PAYMENT_BACKEND", default="app.utils.backends.RazorpayBackend")
+SMS_BACKEND = env("SMS_BACKEND", default="app.utils.backends.TextlocalBackend")
+FILE_URL_BACKEND = env("FILE_URL_BACKEND", default="app.utils.backends.S3FileURLBackend")
+# Seconds each fake backend call takes (+/- 50%) and the share of calls failing, for load tests.
+FAKE_BACKEND_LATENCY = env.float("FAKE_BACKEND_LATENCY", default=0)
+FAKE_BACKEND_FAILURE_RATE = env.float("FAKE_BACKEND_FAILURE_RATE", default=0)
+
+# API response cache
+# ------------------------------------------------------------------------------
+# Per-process LRU tier in front of the shared cache, kept coherent over Redis pub/sub.
+# Set API_LOCAL_CACHE_MAX_ENTRIES to 0 to disable it.
+API_LOCAL_CACHE_MAX_ENTRIES = env.int("API_LOCAL_CACHE_MAX_ENTRIES", default=2048)
+# Upper bound in seconds on how long a worker can serve an entry if an invalidation message is lost.
+API_LOCAL_CACHE_TIMEOUT = env.int("API_LOCAL_CACHE_TIMEOUT", default=30)
+API_CACHE_INVALIDATION_CHANNEL = "hht:api_cache_invalidation"
+# Cached response bodies are stored gzipped above this size and sent as is to clients accepting gzip.
+API_CACHE_COMPRESS = env.bool("API_CACHE_COMPRESS", default=True)
+API_CACHE_COMPRESS_MIN_BYTES = env.int("API_CACHE_COMPRESS_MIN_BYTES", default=1024)
+API_CACHE_COMPRESS_LEVEL = env.int("API_CACHE_COMPRESS_LEVEL", default=6)
+# Paginators with approximate counts report the planner's row estimate at or above this many rows.
+API_APPROXIMATE_COUNT_THRESHOLD = env.int("API_APPROXIMATE_COUNT_THRESHOLD", default=10000)
+
+# Request instrumentation
+# ------------------------------------------------------------------------------
+# Share of requests whose queries, cache lookups and serialization time are recorded, 0 turns it off.
+API_INSTRUMENTATION_SAMPLE_RATE = env.float("API_INSTRUMENTATION_SAMPLE_RATE", default=0.01)
+# Runs of one query shape in a request that get it logged as a likely N+1.
+API_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = env.int("API_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD", default=10)
+API_INSTRUMENTATION_SERVER_TIMING = env.bool("API_INSTRUMENTATION_SERVER_TIMING", default=True)
+# Share of API requests appended to API_TRAFFIC_CAPTURE_FILE (JSONL) for benchmarks/replay.py, 0 turns it off.
+API_TRAFFIC_CAPTURE_SAMPLE_RATE = env.float("API_TRAFFIC_CAPTURE_SAMPLE_RATE", default=0)
+API_TRAFFIC_CAPTURE_FILE = env("API_TRAFFIC_CAPTURE_FILE", default="")
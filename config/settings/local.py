@@ -70,3 +70,6 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Record every request locally, see app.utils.instrumentation.
+API_INSTRUMENTATION_SAMPLE_RATE = env.float("API_INSTRUMENTATION_SAMPLE_RATE", default=1.0)
@@ -33,5 +33,17 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore # noqa: F405
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "http://media.testserver"
+
+# INSTRUMENTATION
+# ------------------------------------------------------------------------------
+API_INSTRUMENTATION_SAMPLE_RATE = 0
+
+# THIRD-PARTY SERVICES
+# ------------------------------------------------------------------------------
+PAYMENT_BACKEND = "app.utils.backends.FakeRazorpayClient"
+SMS_BACKEND = "app.utils.backends.FakeSMSBackend"
+FILE_URL_BACKEND = "app.utils.backends.FakeFileURLBackend"
+FAKE_BACKEND_LATENCY = 0
+FAKE_BACKEND_FAILURE_RATE = 0
 # Your stuff...
 # ------------------------------------------------------------------------------